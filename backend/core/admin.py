@@ -1,7 +1,8 @@
 from django.contrib import admin
 
-from .models import (BirthdayMessageLog, BulkProfileCart, Congregation,
-                     Guilder, Role, SundayAttendance, Notification, SystemSettings, Quiz, QuizSubmission, UserProfile, LoginAttempt)
+from .models import (Backup, BirthdayMessageLog, BulkProfileCart, Congregation, HomeStatsSnapshot, RequestMetric,
+                     Guilder, OutboundMessage, ReportJob, Role, SundayAttendance, Notification, SystemSettings, Quiz,
+                     QuizSubmission, UserProfile, LoginAttempt)
 
 
 @admin.register(Congregation)
@@ -211,3 +212,56 @@ class QuizSubmissionAdmin(admin.ModelAdmin):
     def has_add_permission(self, request):
         # Disable manual addition of submissions - they should only be created via API
         return False
+
+
+@admin.register(ReportJob)
+class ReportJobAdmin(admin.ModelAdmin):
+    list_display = ("report_type", "congregation", "status", "row_count", "attempts", "created_at", "finished_at")
+    list_filter = ("status", "report_type", "created_at")
+    readonly_fields = ("data_version", "file_path", "row_count", "attempts", "error", "created_at", "started_at", "finished_at")
+
+    def has_add_permission(self, request):
+        # Jobs are queued through the export views and API
+        return False
+
+
+@admin.register(Backup)
+class BackupAdmin(admin.ModelAdmin):
+    list_display = ("created_at", "backup_type", "status", "size_bytes", "created_by", "restored_at")
+    list_filter = ("status", "backup_type", "created_at")
+    readonly_fields = ("file_path", "size_bytes", "checksum", "counts", "checksums", "error", "created_at", "completed_at", "restored_at")
+
+    def has_add_permission(self, request):
+        # Backups are written by the backup command and API
+        return False
+
+
+@admin.register(HomeStatsSnapshot)
+class HomeStatsSnapshotAdmin(admin.ModelAdmin):
+    list_display = ("generated_at", "stale", "etag")
+    readonly_fields = ("payload", "etag", "stale", "generated_at")
+
+    def has_add_permission(self, request):
+        # Written by api_home_stats and the refresh_home_stats command
+        return False
+
+
+@admin.register(RequestMetric)
+class RequestMetricAdmin(admin.ModelAdmin):
+    list_display = ("created_at", "method", "url_name", "status", "queries", "db_ms", "python_ms", "response_bytes")
+    list_filter = ("url_name", "method", "status")
+
+    def has_add_permission(self, request):
+        # Written by core.metrics.ProfilingMiddleware
+        return False
+
+
+@admin.register(OutboundMessage)
+class OutboundMessageAdmin(admin.ModelAdmin):
+    list_display = ("created_at", "kind", "recipient", "provider", "status", "attempts", "sent_at")
+    list_filter = ("status", "kind", "provider")
+    search_fields = ("recipient", "idempotency_key")
+
+    def has_add_permission(self, request):
+        # Queued through core.messaging
+        return False
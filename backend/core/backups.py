@@ -0,0 +1,258 @@
+"""
+Snapshot backup and restore.
+
+An archive is a single gzip-compressed NDJSON file: a header line, one
+``{"model": ..., "fields": ...}`` line per row, and a footer with the row
+count and SHA-256 of each model's lines, so a truncated or edited archive is
+rejected before a restore commits.
+"""
+import gzip
+import hashlib
+import json
+import os
+from collections import defaultdict
+from datetime import date
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.utils import timezone
+
+from .caching import bump_on_commit
+from .home_stats import mark_stale as mark_home_stats_stale
+from .models import (Backup, BirthdayMessageLog, Congregation, Guilder, Role, SundayAttendance,
+                     month_day)
+from .rollups import rebuild_rollups
+from .search import member_index
+
+ARCHIVE_FORMAT = "ypg-backup"
+ARCHIVE_VERSION = 1
+
+BATCH_SIZE = 1000
+
+# Archive order; parents come first so restore can remap foreign keys
+BACKUP_MODELS = [
+    ("congregations", Congregation),
+    ("members", Guilder),
+    ("attendance", SundayAttendance),
+    # Kept so a restore on someone's birthday does not message them again
+    ("birthday_messages", BirthdayMessageLog),
+]
+
+
+class BackupError(Exception):
+    pass
+
+
+def write_archive(path):
+    """Stream every BACKUP_MODELS row into ``path``; returns (counts, checksums)"""
+    counts = {}
+    checksums = {}
+    with gzip.open(path, "wt", encoding="utf-8", compresslevel=6) as fh:
+        fh.write(
+            json.dumps(
+                {
+                    "backup": ARCHIVE_FORMAT,
+                    "version": ARCHIVE_VERSION,
+                    "created_at": timezone.now().isoformat(),
+                }
+            )
+            + "\n"
+        )
+        for name, model in BACKUP_MODELS:
+            digest = hashlib.sha256()
+            count = 0
+            rows = model.objects.order_by("pk").values().iterator(chunk_size=BATCH_SIZE)
+            for row in rows:
+                line = json.dumps({"model": name, "fields": row}, cls=DjangoJSONEncoder)
+                digest.update(line.encode())
+                fh.write(line + "\n")
+                count += 1
+            counts[name] = count
+            checksums[name] = digest.hexdigest()
+        fh.write(json.dumps({"counts": counts, "checksums": checksums}) + "\n")
+    return counts, checksums
+
+
+def read_archive(path):
+    """
+    Yield ``(model_name, fields)`` for each archived row. Raises BackupError
+    once the stream ends if the footer is missing or a checksum differs.
+    """
+    digests = defaultdict(hashlib.sha256)
+    counts = defaultdict(int)
+    footer = None
+    with gzip.open(path, "rt", encoding="utf-8") as fh:
+        header = json.loads(fh.readline() or "{}")
+        if header.get("backup") != ARCHIVE_FORMAT:
+            raise BackupError(f"{path} is not a backup archive")
+        for line in fh:
+            line = line.rstrip("\n")
+            record = json.loads(line)
+            if "model" not in record:
+                footer = record
+                break
+            digests[record["model"]].update(line.encode())
+            counts[record["model"]] += 1
+            yield record["model"], record["fields"]
+
+    if footer is None:
+        raise BackupError(f"{path} is truncated")
+    for name, checksum in footer["checksums"].items():
+        if counts[name] != footer["counts"][name] or digests[name].hexdigest() != checksum:
+            raise BackupError(f"Checksum mismatch for {name} in {path}")
+
+
+def verify_archive(path):
+    """Read the whole archive and return its row counts"""
+    counts = defaultdict(int)
+    for name, _ in read_archive(path):
+        counts[name] += 1
+    return dict(counts)
+
+
+def file_checksum(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for block in iter(lambda: fh.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def create_backup(backup_type="manual", created_by=""):
+    """Write a new archive under BACKUP_ROOT and record its Backup manifest"""
+    backup = Backup.objects.create(backup_type=backup_type, created_by=created_by)
+    directory = Path(settings.BACKUP_ROOT)
+    path = directory / f"backup_{timezone.now():%Y%m%d_%H%M%S}_{backup.pk}.ndjson.gz"
+    partial = path.with_suffix(".tmp")
+    try:
+        directory.mkdir(parents=True, exist_ok=True)
+        backup.counts, backup.checksums = write_archive(partial)
+        os.replace(partial, path)
+    except Exception as e:
+        backup.status = "failed"
+        backup.error = str(e)
+        backup.save()
+        if partial.exists():
+            partial.unlink()
+        raise
+
+    backup.file_path = str(path)
+    backup.size_bytes = path.stat().st_size
+    backup.checksum = file_checksum(path)
+    backup.status = "complete"
+    backup.completed_at = timezone.now()
+    backup.save()
+    return backup
+
+
+def _timestamp_fields(model):
+    return [
+        field.attname
+        for field in model._meta.concrete_fields
+        if getattr(field, "auto_now", False) or getattr(field, "auto_now_add", False)
+    ]
+
+
+def _insert(model, pending):
+    """
+    bulk_create one batch of ``(archived_pk, fields)`` and return
+    ``{archived_pk: new_pk}``. auto_now/auto_now_add would stamp the restore
+    time, so the archived timestamps are written back with bulk_update.
+    """
+    objs = model.objects.bulk_create([model(**fields) for _, fields in pending])
+    stamps = _timestamp_fields(model)
+    if stamps:
+        for obj, (_, fields) in zip(objs, pending):
+            for name in stamps:
+                setattr(obj, name, fields[name])
+        model.objects.bulk_update(objs, stamps)
+    return {old_pk: obj.pk for obj, (old_pk, _) in zip(objs, pending)}
+
+
+@transaction.atomic
+def restore_archive(path):
+    """
+    Replace members, attendance and birthday message logs with the
+    archive's rows.
+
+    Congregations are matched by name and kept as they are (they own the
+    login accounts); archived congregations that no longer exist are
+    recreated. Foreign keys are remapped to the restored primary keys.
+    Returns the number of rows restored per model.
+    """
+    # One DELETE per table, children first; the caches and stats the delete
+    # signals would refresh row by row are invalidated once below
+    for model in (SundayAttendance, BirthdayMessageLog, Guilder):
+        model.objects.all()._raw_delete(model.objects.db)
+
+    congregation_ids = dict(Congregation.objects.values_list("name", "id"))
+    linked_users = set(
+        Congregation.objects.exclude(user=None).values_list("user_id", flat=True)
+    )
+    user_ids = set(User.objects.values_list("id", flat=True))
+    role_ids = set(Role.objects.values_list("id", flat=True))
+    models = dict(BACKUP_MODELS)
+
+    remapped = {"congregations": {}}
+    restored = defaultdict(int)
+    pending = []
+    pending_model = None
+
+    def flush():
+        if pending:
+            remapped.setdefault(pending_model, {}).update(_insert(models[pending_model], pending))
+            restored[pending_model] += len(pending)
+            pending.clear()
+
+    for name, fields in read_archive(path):
+        if name != pending_model:
+            flush()
+            pending_model = name
+        old_pk = fields.pop("id")
+
+        if name == "congregations":
+            if fields["name"] in congregation_ids:
+                remapped["congregations"][old_pk] = congregation_ids[fields["name"]]
+                continue
+            if fields["user_id"] not in user_ids or fields["user_id"] in linked_users:
+                fields["user_id"] = None
+        elif name == "birthday_messages":
+            fields["guilder_id"] = remapped["members"][fields["guilder_id"]]
+        else:
+            fields["congregation_id"] = remapped["congregations"][fields["congregation_id"]]
+            if name == "members":
+                if fields["role_id"] not in role_ids:
+                    fields["role_id"] = None
+                # Archives from before the column existed do not carry it
+                fields["birth_month_day"] = month_day(date.fromisoformat(fields["date_of_birth"]))
+
+        pending.append((old_pk, fields))
+        if len(pending) >= BATCH_SIZE:
+            flush()
+    flush()
+
+    rebuild_rollups()
+    # Raw deletes and bulk_create skip the signals that normally invalidate
+    # cached stats
+    bump_on_commit()
+    mark_home_stats_stale()
+    transaction.on_commit(member_index.invalidate)
+    return dict(restored)
+
+
+def restore_backup(backup):
+    """Verify a Backup's archive file against its manifest, then restore it"""
+    if backup.status != "complete":
+        raise BackupError(f"Backup {backup.pk} is {backup.status}")
+    if not os.path.exists(backup.file_path):
+        raise BackupError(f"Archive {backup.file_path} is missing")
+    if file_checksum(backup.file_path) != backup.checksum:
+        raise BackupError(f"Archive {backup.file_path} does not match its checksum")
+
+    restored = restore_archive(backup.file_path)
+    backup.restored_at = timezone.now()
+    backup.save(update_fields=["restored_at"])
+    return restored
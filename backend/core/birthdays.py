@@ -0,0 +1,130 @@
+"""
+Birthday lookups and the daily birthday SMS run, which queues its
+messages for the message worker (see core.messaging).
+
+Members are matched on Guilder.birth_month_day (month * 100 + day), so a
+day or a run of days is one indexed range; a run past December 31 is two
+ranges OR-ed together. Members born on February 29 have their birthday on
+February 28 in other years.
+"""
+from calendar import isleap
+from datetime import date, timedelta
+
+from django.db import transaction
+from django.db.models import Exists, OuterRef, Q
+from django.utils import timezone
+
+from .messaging import queue_messages
+from .models import BirthdayMessageLog, Guilder, OutboundMessage, month_day
+from .utils import get_formatted_message
+
+BATCH_SIZE = 500
+UPCOMING_DAYS = 7
+UPCOMING_MAX_DAYS = 90
+
+
+def birthday_keys(day):
+    """The birth_month_day values whose birthday falls on ``day``"""
+    if (day.month, day.day) == (2, 28) and not isleap(day.year):
+        return [228, 229]
+    return [month_day(day)]
+
+
+def birthday_filter(start, end):
+    """Q for members whose birthday falls between ``start`` and ``end``, inclusive"""
+    if (end - start).days >= 365:
+        return Q()
+    low = month_day(start)
+    high = max(birthday_keys(end))
+    if low <= high:
+        return Q(birth_month_day__range=(low, high))
+    return Q(birth_month_day__gte=low) | Q(birth_month_day__lte=high)
+
+
+def next_birthday(born, today):
+    """The first birthday of someone born on ``born`` on or after ``today``"""
+    for year in (today.year, today.year + 1):
+        try:
+            day = born.replace(year=year)
+        except ValueError:
+            day = date(year, 2, 28)
+        if day >= today:
+            return day
+
+
+def _sent_on(day):
+    return Exists(BirthdayMessageLog.objects.filter(guilder=OuterRef("pk"), sent_date=day))
+
+
+def upcoming_birthdays(today, days=UPCOMING_DAYS, congregation=None):
+    """Members with a birthday from ``today`` through ``days`` later, soonest first"""
+    members = Guilder.objects.filter(birthday_filter(today, today + timedelta(days=days)))
+    if congregation is not None:
+        members = members.filter(congregation=congregation)
+    # Sorted by upcoming date below, so skip the model's name ordering
+    rows = members.order_by().annotate(sent_today=_sent_on(today)).values(
+        "id", "first_name", "last_name", "phone_number", "date_of_birth", "congregation__name", "sent_today"
+    )
+
+    birthdays = []
+    for row in rows:
+        birthday = next_birthday(row["date_of_birth"], today)
+        birthdays.append({
+            "id": row["id"],
+            "name": f"{row['first_name']} {row['last_name']}",
+            "phone_number": row["phone_number"],
+            "congregation": row["congregation__name"],
+            "date_of_birth": row["date_of_birth"].isoformat(),
+            "birthday": birthday.isoformat(),
+            "days_away": (birthday - today).days,
+            "turning": birthday.year - row["date_of_birth"].year,
+            "sent_today": row["sent_today"],
+        })
+    birthdays.sort(key=lambda entry: (entry["birthday"], entry["name"]))
+    return birthdays
+
+
+def due_today(today):
+    """Members whose birthday is ``today`` and who have no message logged for it"""
+    return Guilder.objects.filter(birth_month_day__in=birthday_keys(today)).filter(~_sent_on(today))
+
+
+def birthday_sms(log):
+    """The OutboundMessage for a BirthdayMessageLog; its key makes it one per member a day"""
+    return OutboundMessage(
+        kind="birthday_message",
+        recipient=log.guilder.phone_number,
+        body=log.message,
+        idempotency_key=f"birthday_message:{log.guilder_id}:{log.sent_date}",
+    )
+
+
+def send_birthday_messages(today=None):
+    """
+    Log and queue a birthday message for every member due one today and
+    return the new BirthdayMessageLog rows. A member logged for the day by
+    a concurrent run or the dashboard in the meantime is skipped by the
+    unique constraint, and so is their message.
+    """
+    today = today or timezone.now().date()
+    # Placeholders are left in when no values are passed
+    template = get_formatted_message("birthday_message")
+    logs = [
+        BirthdayMessageLog(
+            guilder=member, sent_date=today, message=template.replace("{name}", member.first_name)
+        )
+        for member in due_today(today).only("id", "first_name", "last_name", "phone_number")
+    ]
+    messages = {log.guilder_id: birthday_sms(log) for log in logs}
+    with transaction.atomic():
+        BirthdayMessageLog.objects.bulk_create(logs, batch_size=BATCH_SIZE, ignore_conflicts=True)
+        # bulk_create does not say which logs it skipped; those belong to
+        # whoever logged the member first, and their message is queued already
+        queued = set(
+            OutboundMessage.objects.filter(
+                idempotency_key__in=[message.idempotency_key for message in messages.values()]
+            ).values_list("idempotency_key", flat=True)
+        )
+        logs = [log for log in logs if messages[log.guilder_id].idempotency_key not in queued]
+        queue_messages([messages[log.guilder_id] for log in logs])
+    return logs
@@ -0,0 +1,71 @@
+"""
+Portable date bucketing for attendance analytics.
+
+Built on Django's TruncWeek/TruncMonth/TruncYear so the same queries run on
+SQLite and Postgres, and filters stay plain ``date`` range conditions that
+can use the ``(date)`` and ``(congregation, date)`` indexes.
+"""
+from datetime import date, timedelta
+
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncMonth, TruncWeek, TruncYear
+
+PERIODS = ("week", "month", "year")
+
+TRUNC_FUNCTIONS = {
+    "week": TruncWeek,
+    "month": TruncMonth,
+    "year": TruncYear,
+}
+
+
+def period_start(day, period):
+    """First day of the week (Monday), month or year containing ``day``"""
+    if period == "week":
+        return day - timedelta(days=day.weekday())
+    if period == "month":
+        return day.replace(day=1)
+    return day.replace(month=1, day=1)
+
+
+def period_end(start, period):
+    """First day of the period following the one starting at ``start``"""
+    if period == "week":
+        return start + timedelta(days=7)
+    if period == "month":
+        if start.month == 12:
+            return date(start.year + 1, 1, 1)
+        return date(start.year, start.month + 1, 1)
+    return date(start.year + 1, 1, 1)
+
+
+def week_label(start):
+    """Sunday of the week starting at ``start``, the day attendance is taken"""
+    return start + timedelta(days=6)
+
+
+def bucketed(queryset, period, field="date", by_congregation=False):
+    """
+    Group attendance rows into ``period`` buckets.
+
+    Returns a values queryset with ``bucket`` (the period start date),
+    optionally ``congregation_id``, and the ``male``, ``female``, ``total``
+    and ``records`` aggregates, ordered by bucket.
+    """
+    group_by = ["bucket"]
+    if by_congregation:
+        group_by.append("congregation_id")
+
+    return (
+        queryset.order_by()
+        .annotate(bucket=TRUNC_FUNCTIONS[period](field))
+        .values(*group_by)
+        .annotate(
+            male=Sum("male_count"),
+            female=Sum("female_count"),
+            total=Sum("total_count"),
+            records=Count("id"),
+        )
+        .order_by(*group_by)
+    )
+
@@ -0,0 +1,120 @@
+"""
+Shared cache for aggregate-heavy read endpoints.
+
+Values are stored under keys that embed a version number per data
+namespace ("members", "attendance", "congregations"). The model signals
+bump a namespace's version whenever its data changes, so stale entries
+are never read again and simply age out; nothing has to enumerate or
+delete them. With a shared CACHES backend every worker reuses the first
+worker's result.
+
+Per-process hit/miss/latency counters are kept for api_cache_stats.
+"""
+import threading
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+
+NAMESPACES = ("members", "attendance", "congregations")
+VERSION_KEY = "cache-version:{}"
+DEFAULT_TIMEOUT = 5 * 60
+
+
+class CacheStats:
+    """Hit/miss counts and lookup/build times for this worker process"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._entries = {}
+
+    def record(self, name, hit, lookup_seconds, build_seconds=0.0):
+        with self._lock:
+            entry = self._entries.setdefault(
+                name, {"hits": 0, "misses": 0, "lookup_seconds": 0.0, "build_seconds": 0.0}
+            )
+            entry["hits" if hit else "misses"] += 1
+            entry["lookup_seconds"] += lookup_seconds
+            entry["build_seconds"] += build_seconds
+
+    def snapshot(self):
+        with self._lock:
+            entries = {name: dict(entry) for name, entry in self._entries.items()}
+        result = {}
+        for name, entry in sorted(entries.items()):
+            calls = entry["hits"] + entry["misses"]
+            result[name] = {
+                "hits": entry["hits"],
+                "misses": entry["misses"],
+                "hit_rate": round(entry["hits"] / calls, 3) if calls else None,
+                "avg_lookup_ms": round(entry["lookup_seconds"] / calls * 1000, 3) if calls else None,
+                "avg_build_ms": (
+                    round(entry["build_seconds"] / entry["misses"] * 1000, 3)
+                    if entry["misses"]
+                    else None
+                ),
+            }
+        return result
+
+
+stats = CacheStats()
+
+
+def versions(namespaces):
+    """Current version of each namespace, creating missing ones"""
+    keys = {namespace: VERSION_KEY.format(namespace) for namespace in namespaces}
+    found = cache.get_many(keys.values())
+    result = {}
+    for namespace, key in keys.items():
+        if key not in found:
+            # Start from the clock, not 1, so an evicted version can never
+            # line up with entries written under an earlier one
+            cache.add(key, time.time_ns(), None)
+            found[key] = cache.get(key)
+        result[namespace] = found[key]
+    return result
+
+
+def bump(*namespaces):
+    """Invalidate everything cached under ``namespaces``"""
+    for namespace in namespaces or NAMESPACES:
+        key = VERSION_KEY.format(namespace)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.add(key, time.time_ns(), None)
+
+
+def bump_on_commit(*namespaces):
+    """
+    Bump now and again once the current transaction commits, so a request
+    that rebuilt an entry from the old rows in between does not keep it.
+    """
+    bump(*namespaces)
+    transaction.on_commit(lambda: bump(*namespaces))
+
+
+def cached(name, namespaces, build, key="", timeout=DEFAULT_TIMEOUT):
+    """
+    Return ``build()`` cached under ``name``/``key`` until ``timeout`` or
+    until one of ``namespaces`` is bumped.
+    """
+    began = time.perf_counter()
+    current = versions(namespaces)
+    full_key = ":".join(
+        ["cached", name, key] + [f"{namespace}{current[namespace]}" for namespace in namespaces]
+    )
+    value = cache.get(full_key)
+    looked_up = time.perf_counter()
+    if value is not None:
+        stats.record(name, True, looked_up - began)
+        return value
+
+    value = build()
+    cache.set(full_key, value, timeout)
+    stats.record(name, False, looked_up - began, time.perf_counter() - looked_up)
+    return value
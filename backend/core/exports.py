@@ -0,0 +1,186 @@
+import csv
+
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+
+from .models import Congregation, Guilder, SundayAttendance
+
+EXPORT_CHUNK_SIZE = 2000
+
+EXPORT_TYPES = ("members", "attendance", "analytics", "all")
+
+
+class Echo:
+    """Pseudo-buffer whose write() hands the CSV line straight back"""
+
+    def write(self, value):
+        return value
+
+
+def member_rows(members=None):
+    """Header plus one row per guilder, read in chunks from a flat projection"""
+    if members is None:
+        members = Guilder.objects.all()
+    yield [
+        "Name",
+        "Gender",
+        "Date of Birth",
+        "Congregation",
+        "Phone",
+        "Email",
+        "Position",
+        "Membership Status",
+        "Date Added",
+    ]
+    rows = members.values_list(
+        "first_name",
+        "last_name",
+        "gender",
+        "date_of_birth",
+        "congregation__name",
+        "phone_number",
+        "email",
+        "executive_level",
+        "executive_position",
+        "local_executive_position",
+        "district_executive_position",
+        "position",
+        "membership_status",
+        "created_at",
+    )
+    for (
+        first_name,
+        last_name,
+        gender,
+        date_of_birth,
+        congregation,
+        phone_number,
+        email,
+        executive_level,
+        executive_position,
+        local_position,
+        district_position,
+        position,
+        membership_status,
+        created_at,
+    ) in rows.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+        # Same precedence as Guilder.get_primary_executive_position()
+        if executive_level == "local":
+            primary = local_position or executive_position
+        elif executive_level == "district":
+            primary = district_position or executive_position
+        elif executive_level == "both":
+            primary = local_position or district_position or executive_position
+        else:
+            primary = executive_position
+        yield [
+            f"{first_name} {last_name}",
+            gender,
+            date_of_birth,
+            congregation,
+            phone_number,
+            email,
+            primary or position or "Member",
+            membership_status,
+            created_at.strftime("%Y-%m-%d"),
+        ]
+
+
+def member_detail_rows(members):
+    """Column layout of the member list CSV download"""
+    yield [
+        "First Name",
+        "Last Name",
+        "Phone Number",
+        "Email",
+        "Gender",
+        "Date of Birth",
+        "Congregation",
+        "Membership Status",
+        "Position",
+    ]
+    yield from members.values_list(
+        "first_name",
+        "last_name",
+        "phone_number",
+        "email",
+        "gender",
+        "date_of_birth",
+        "congregation__name",
+        "membership_status",
+        "position",
+    ).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+
+
+def attendance_rows(records=None):
+    if records is None:
+        records = SundayAttendance.objects.all()
+    yield ["Date", "Congregation", "Male Count", "Female Count", "Total Count"]
+    yield from records.values_list(
+        "date", "congregation__name", "male_count", "female_count", "total_count"
+    ).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+
+
+def analytics_rows(congregation=None):
+    members = Guilder.objects.all()
+    records = SundayAttendance.objects.all()
+    congregations = Congregation.objects.all()
+    if congregation is not None:
+        members = members.filter(congregation=congregation)
+        records = records.filter(congregation=congregation)
+        congregations = congregations.filter(pk=congregation.pk)
+    yield ["Metric", "Value"]
+    yield ["Total Members", members.count()]
+    yield ["Total Attendance Records", records.count()]
+    yield ["Total Congregations", congregations.count()]
+    yield ["Export Date", timezone.now().strftime("%Y-%m-%d %H:%M:%S")]
+
+
+def export_rows(export_type, congregation=None):
+    """
+    Rows for one of the EXPORT_TYPES selectors used by the data API,
+    limited to ``congregation`` when one is given.
+    """
+    members = Guilder.objects.all()
+    records = SundayAttendance.objects.all()
+    if congregation is not None:
+        members = members.filter(congregation=congregation)
+        records = records.filter(congregation=congregation)
+
+    if export_type == "members":
+        yield from member_rows(members)
+    elif export_type == "attendance":
+        yield from attendance_rows(records)
+    elif export_type == "analytics":
+        yield from analytics_rows(congregation)
+    else:
+        yield ["=== MEMBERS DATA ==="]
+        yield from member_rows(members)
+        yield []
+        yield ["=== ATTENDANCE DATA ==="]
+        yield from attendance_rows(records)
+        yield []
+        yield ["=== ANALYTICS DATA ==="]
+        yield from analytics_rows(congregation)
+
+
+def csv_lines(rows):
+    writer = csv.writer(Echo())
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def csv_text(rows):
+    """Whole CSV as one string, for the JSON export API"""
+    return "".join(csv_lines(rows))
+
+
+def export_filename(export_type):
+    return f'ypg_data_{export_type}_{timezone.now().strftime("%Y%m%d_%H%M%S")}.csv'
+
+
+def streaming_csv_response(rows, filename):
+    """Stream ``rows`` to the client as a CSV attachment without buffering"""
+    response = StreamingHttpResponse(csv_lines(rows), content_type="text/csv")
+    response["Content-Disposition"] = f'attachment; filename="{filename}"'
+    return response
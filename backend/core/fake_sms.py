@@ -0,0 +1,88 @@
+"""
+Local stand-in for an HTTP SMS API, speaking the protocol HTTPProvider
+uses. It keeps accepted messages in memory, answers a repeated
+Idempotency-Key with the original message id instead of sending twice,
+and can be told to fail the next requests, for tests and local runs (see
+the run_fake_sms_server command).
+"""
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        server = self.server
+        length = int(self.headers.get("Content-Length") or 0)
+        try:
+            payload = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            return self._reply(400, {"error": "Body must be JSON"})
+        if not payload.get("to") or not payload.get("body"):
+            return self._reply(400, {"error": "to and body are required"})
+
+        with server.lock:
+            server.requests += 1
+            if server.fail_next:
+                server.fail_next -= 1
+                return self._reply(server.fail_status, {"error": "Try again later"}, {"Retry-After": "0"})
+            key = self.headers.get("Idempotency-Key") or f"request-{server.requests}"
+            if key not in server.delivered:
+                server.delivered[key] = {"id": f"fake-{len(server.messages) + 1}", **payload}
+                server.messages.append(server.delivered[key])
+            message_id = server.delivered[key]["id"]
+        self._reply(201, {"id": message_id})
+
+    def _reply(self, status, body, headers=None):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+class FakeSMSServer(ThreadingHTTPServer):
+    """
+    ``with FakeSMSServer() as server:`` serves on ``server.url`` from a
+    background thread until the block ends.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, host="127.0.0.1", port=0, verbose=False):
+        super().__init__((host, port), _Handler)
+        self.verbose = verbose
+        self.lock = threading.Lock()
+        self.messages = []
+        self.delivered = {}
+        self.requests = 0
+        self.fail_next = 0
+        self.fail_status = 503
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/messages"
+
+    def fail(self, count, status=503):
+        """Answer the next ``count`` requests with ``status``"""
+        with self.lock:
+            self.fail_next = count
+            self.fail_status = status
+
+    def __enter__(self):
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.shutdown()
+        self.server_close()
+        self._thread.join()
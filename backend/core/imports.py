@@ -0,0 +1,386 @@
+"""
+Bulk member and attendance import.
+
+Member rows come from a BulkProfileCart or an uploaded CSV/XLSX sheet.
+Every row is validated with the member form before anything is written; phone
+numbers are checked against the database and the rest of the batch with
+one query, congregations are resolved once by id or name, and the valid
+rows are inserted with bulk_create in one transaction. The result lists
+each rejected row with its errors instead of dropping it.
+
+Attendance rows (congregation, date, male_count, female_count) are
+upserted on (congregation, date) with one bulk INSERT ... ON CONFLICT and
+the affected attendance rollups refreshed together afterwards.
+"""
+import csv
+import io
+from dataclasses import dataclass, field
+from datetime import date, datetime
+
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+
+from .caching import bump_on_commit
+from .forms import GuilderForm
+from .home_stats import mark_stale as mark_home_stats_stale
+from .messaging import queue_welcome_messages
+from .models import Congregation, Guilder, SundayAttendance, month_day
+from .rollups import refresh_rollups
+from .search import member_index
+
+BATCH_SIZE = 500
+MAX_ROWS = 5000
+
+# Sheet headers besides the field names themselves; headers are matched
+# case-insensitively with spaces and underscores treated alike
+HEADER_ALIASES = {
+    "phone": "phone_number",
+    "phone_no": "phone_number",
+    "dob": "date_of_birth",
+    "birth_date": "date_of_birth",
+    "status": "membership_status",
+    "residence": "place_of_residence",
+    "address": "residential_address",
+    "relative_phone": "relative_contact",
+}
+
+TRUE_VALUES = {"1", "true", "yes", "y", "on"}
+FALSE_VALUES = {"0", "false", "no", "n", "off"}
+
+
+class ImportFileError(Exception):
+    """The uploaded file could not be read as a member sheet"""
+
+
+class ImportForm(GuilderForm):
+    """
+    GuilderForm without the per-row queries: the congregation is resolved
+    for the whole batch and phone uniqueness is checked in one query.
+    """
+
+    class Meta(GuilderForm.Meta):
+        fields = [name for name in GuilderForm.Meta.fields if name not in ("congregation", "role")]
+
+    def validate_unique(self):
+        pass
+
+
+@dataclass
+class ImportResult:
+    total: int = 0
+    created: int = 0
+    dry_run: bool = False
+    errors: list = field(default_factory=list)
+
+    @property
+    def failed_rows(self):
+        return {error["row"] for error in self.errors}
+
+    def add_error(self, row, errors):
+        self.errors.append({"row": row, "errors": errors})
+
+    def as_json(self):
+        return {
+            "success": not self.errors,
+            "total": self.total,
+            "created": self.created,
+            "failed": len(self.failed_rows),
+            "dry_run": self.dry_run,
+            "errors": self.errors,
+        }
+
+
+@dataclass
+class AttendanceImportResult(ImportResult):
+    updated: int = 0
+    outcomes: list = field(default_factory=list)
+
+    def as_json(self):
+        data = super().as_json()
+        data["updated"] = self.updated
+        outcomes = {outcome["row"]: outcome for outcome in self.outcomes}
+        for error in self.errors:
+            outcomes[error["row"]] = {"row": error["row"], "status": "error", "errors": error["errors"]}
+        data["results"] = [outcomes[row] for row in sorted(outcomes)]
+        del data["errors"]
+        return data
+
+
+def header_key(header):
+    key = str(header or "").strip().lower().replace(" ", "_").replace("-", "_")
+    return HEADER_ALIASES.get(key, key)
+
+
+def read_sheet(upload):
+    """Rows of an uploaded .csv or .xlsx file as dicts keyed by field name"""
+    name = (upload.name or "").lower()
+    if name.endswith(".xlsx"):
+        rows = _xlsx_rows(upload)
+    elif name.endswith(".csv"):
+        try:
+            text = io.TextIOWrapper(upload.file, encoding="utf-8-sig")
+            rows = list(csv.reader(text))
+        except UnicodeDecodeError:
+            raise ImportFileError("CSV files must be UTF-8 encoded")
+    else:
+        raise ImportFileError("Upload a .csv or .xlsx file")
+
+    if not rows:
+        raise ImportFileError("The file is empty")
+    headers = [header_key(header) for header in rows[0]]
+    records = []
+    for values in rows[1:]:
+        if not any(value not in (None, "") for value in values):
+            continue
+        records.append(dict(zip(headers, values)))
+    if len(records) > MAX_ROWS:
+        raise ImportFileError(f"At most {MAX_ROWS} rows can be imported at a time")
+    return records
+
+
+def _xlsx_rows(upload):
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise ImportFileError("XLSX import needs openpyxl installed; upload a CSV instead")
+    try:
+        workbook = load_workbook(upload, read_only=True, data_only=True)
+    except Exception:
+        raise ImportFileError("The file is not a readable XLSX workbook")
+    return [list(row) for row in workbook.active.iter_rows(values_only=True)]
+
+
+def _form_data(profile):
+    """A sheet or cart row as form data, with model defaults for blank cells"""
+    data = {}
+    for name, value in profile.items():
+        if isinstance(value, datetime):
+            value = value.date()
+        if isinstance(value, date):
+            value = value.isoformat()
+        elif isinstance(value, float) and value.is_integer():
+            # Spreadsheets store phone numbers as numbers
+            value = int(value)
+        data[name] = "" if value is None else str(value).strip()
+
+    for name in ImportForm.Meta.fields:
+        model_field = Guilder._meta.get_field(name)
+        value = data.get(name, "")
+        if model_field.get_internal_type() == "BooleanField":
+            if value.lower() in TRUE_VALUES:
+                data[name] = True
+            elif value.lower() in FALSE_VALUES:
+                data[name] = False
+            else:
+                data[name] = model_field.get_default()
+        elif not value and model_field.has_default():
+            data[name] = model_field.get_default()
+    return data
+
+
+def _congregations(profiles):
+    """{"id:<pk>" / "name:<lower name>": Congregation} for the batch"""
+    ids, names = set(), set()
+    for profile in profiles:
+        value = str(profile.get("congregation") or "").strip()
+        if value.isdigit():
+            ids.add(int(value))
+        elif value:
+            names.add(value)
+    if not ids and not names:
+        return {}
+
+    query = Q(id__in=ids)
+    for name in names:
+        query |= Q(name__iexact=name)
+    found = {}
+    for congregation in Congregation.objects.filter(query):
+        found[f"id:{congregation.pk}"] = congregation
+        found[f"name:{congregation.name.lower()}"] = congregation
+    return found
+
+
+def _resolve_congregation(row, congregations, default, allowed):
+    """(congregation, error message) for a row's congregation cell"""
+    value = str(row.get("congregation") or "").strip()
+    if value:
+        target = congregations.get(f"id:{value}" if value.isdigit() else f"name:{value.lower()}")
+        if target is None:
+            return None, f"Congregation '{value}' not found"
+    elif default is None:
+        return None, "This field is required."
+    else:
+        target = default
+    if allowed is not None and target != allowed:
+        return None, f"You cannot add records to {target.name}"
+    return target, None
+
+
+def import_profiles(profiles, congregation=None, allowed=None, dry_run=False):
+    """
+    Validate and insert member ``profiles`` (dicts of GuilderForm fields).
+
+    Rows without a congregation go to ``congregation``; with ``allowed``
+    set, rows naming any other congregation are rejected. Row numbers in
+    the result count from 1.
+    """
+    result = ImportResult(total=len(profiles), dry_run=dry_run)
+    congregations = _congregations(profiles)
+
+    pending = []
+    for row, profile in enumerate(profiles, start=1):
+        form = ImportForm(_form_data(profile))
+        errors = {} if form.is_valid() else {
+            name: [str(message) for message in messages] for name, messages in form.errors.items()
+        }
+
+        target, problem = _resolve_congregation(profile, congregations, congregation, allowed)
+        if problem:
+            errors["congregation"] = [problem]
+
+        if errors:
+            result.add_error(row, errors)
+            continue
+        member = form.save(commit=False)
+        member.congregation = target
+        member.birth_month_day = month_day(member.date_of_birth)
+        pending.append((row, member))
+
+    # Phone numbers are unique across the district and within the batch
+    existing = set(
+        Guilder.objects.filter(
+            phone_number__in={member.phone_number for _, member in pending}
+        ).values_list("phone_number", flat=True)
+    )
+    seen = {}
+    members = []
+    for row, member in pending:
+        phone = member.phone_number
+        if phone in existing:
+            result.add_error(row, {"phone_number": [f"{phone} is already registered"]})
+        elif phone in seen:
+            result.add_error(row, {"phone_number": [f"{phone} is repeated from row {seen[phone]}"]})
+        else:
+            seen[phone] = row
+            members.append(member)
+    result.errors.sort(key=lambda error: error["row"])
+
+    if dry_run or not members:
+        return result
+
+    try:
+        with transaction.atomic():
+            Guilder.objects.bulk_create(members, batch_size=BATCH_SIZE)
+            queue_welcome_messages(members)
+            # bulk_create skips the signals that normally invalidate cached stats
+            bump_on_commit("members")
+            mark_home_stats_stale()
+            transaction.on_commit(member_index.invalidate)
+    except IntegrityError:
+        # A phone number was registered between the check and the insert
+        for row in seen.values():
+            result.add_error(row, {"__all__": ["Not imported: the data changed during the import, try again"]})
+        result.errors.sort(key=lambda error: error["row"])
+        return result
+
+    result.created = len(members)
+    return result
+
+
+def _count(value):
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    try:
+        count = int(str(value).strip())
+    except (TypeError, ValueError):
+        raise ValidationError("Enter a whole number.")
+    if count < 0:
+        raise ValidationError("Must not be negative.")
+    return count
+
+
+def _day(value):
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    try:
+        return date.fromisoformat(str(value or "").strip())
+    except ValueError:
+        raise ValidationError("Enter a valid date (YYYY-MM-DD).")
+
+
+def import_attendance(rows, congregation=None, allowed=None, dry_run=False):
+    """
+    Upsert Sunday attendance ``rows`` (dicts with congregation, date,
+    male_count and female_count), reporting whether each row was created,
+    updated or rejected. Congregation defaults and limits work as in
+    import_profiles.
+    """
+    result = AttendanceImportResult(total=len(rows), dry_run=dry_run)
+    congregations = _congregations(rows)
+
+    pending = {}
+    for row, values in enumerate(rows, start=1):
+        errors = {}
+        cleaned = {}
+        for name, parse in (("date", _day), ("male_count", _count), ("female_count", _count)):
+            try:
+                cleaned[name] = parse(values.get(name))
+            except ValidationError as e:
+                errors[name] = e.messages
+        target, problem = _resolve_congregation(values, congregations, congregation, allowed)
+        if problem:
+            errors["congregation"] = [problem]
+        if errors:
+            result.add_error(row, errors)
+            continue
+
+        key = (target.pk, cleaned["date"])
+        if key in pending:
+            result.add_error(
+                row, {"date": [f"{cleaned['date']} for {target.name} is repeated from row {pending[key][0]}"]}
+            )
+            continue
+        record = SundayAttendance(congregation=target, **cleaned)
+        record.total_count = record.male_count + record.female_count
+        pending[key] = (row, record)
+
+    def stored_ids():
+        """{(congregation_id, date): id} of stored records among ``pending``"""
+        rows = SundayAttendance.objects.filter(
+            congregation_id__in={key[0] for key in pending},
+            date__in={key[1] for key in pending},
+        ).values_list("congregation_id", "date", "id")
+        return {(congregation_id, day): pk for congregation_id, day, pk in rows}
+
+    if not pending:
+        return result
+    before = stored_ids()
+    if not dry_run:
+        with transaction.atomic():
+            SundayAttendance.objects.bulk_create(
+                [record for _, record in pending.values()],
+                batch_size=BATCH_SIZE,
+                update_conflicts=True,
+                unique_fields=["congregation", "date"],
+                update_fields=["male_count", "female_count", "total_count", "updated_at"],
+            )
+            refresh_rollups(pending)
+            # bulk_create skips the signals that normally invalidate cached stats
+            bump_on_commit("attendance")
+            mark_home_stats_stale()
+        after = stored_ids()
+    else:
+        after = before
+
+    for key, (row, record) in pending.items():
+        status = "updated" if key in before else "created"
+        if not dry_run:
+            if status == "updated":
+                result.updated += 1
+            else:
+                result.created += 1
+        result.outcomes.append({"row": row, "status": status, "attendance_id": after.get(key)})
+    return result
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from core.backups import create_backup
+
+
+class Command(BaseCommand):
+    help = "Write a compressed snapshot of congregations, members and attendance"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--type",
+            choices=["manual", "scheduled"],
+            default="manual",
+            help="Backup type recorded on the manifest",
+        )
+
+    def handle(self, *args, **options):
+        backup = create_backup(options["type"], created_by="management command")
+        counts = ", ".join(f"{name}: {count}" for name, count in backup.counts.items())
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Backup {backup.id} written to {backup.file_path} "
+                f"({backup.size_bytes} bytes; {counts})"
+            )
+        )
@@ -0,0 +1,217 @@
+import json
+import logging
+import statistics
+import subprocess
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from core import urls
+from core.models import (Congregation, Guilder, Quiz, QuizSubmission, ReportJob,
+                         SundayAttendance)
+
+# Query strings the endpoints need to do representative work
+EXTRA_PARAMS = {
+    "api_member_search": {"q": "kwame"},
+    "api_export_csv": {"type": "members"},
+    "api_analytics_detailed": {"weeks_back": 12, "months_back": 12, "years_back": 3},
+}
+
+# Sample object for each URL argument; routes whose argument has no
+# sample in the database are skipped
+SAMPLES = {
+    "quiz_id": lambda: Quiz.objects.order_by("-start_time").values_list("id", flat=True).first(),
+    "member_id": lambda: Guilder.objects.values_list("id", flat=True).first(),
+    "attendance_id": lambda: SundayAttendance.objects.values_list("id", flat=True).first(),
+    "job_id": lambda: ReportJob.objects.values_list("id", flat=True).first(),
+    "blog_id": lambda: 1,
+    "media_id": lambda: 1,
+    "event_id": lambda: 1,
+}
+
+
+def api_routes():
+    """(url name, route, argument names) for every api/ URL in core.urls"""
+    for pattern in urls.urlpatterns:
+        route = str(pattern.pattern)
+        if route.startswith("api/"):
+            yield pattern.name, route, list(pattern.pattern.converters)
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=settings.BASE_DIR,
+            capture_output=True,
+            text=True,
+            timeout=5,
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def percentile(ordered, pct):
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+class Command(BaseCommand):
+    help = (
+        "Time every GET /api/ endpoint against the current data (see "
+        "seed_synthetic_district) and write the results as JSON for comparison"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--repeat", type=int, default=5, help="Warm runs per endpoint")
+        parser.add_argument(
+            "--account",
+            help="Username to log in as (default: the account of a district congregation)",
+        )
+        parser.add_argument(
+            "--only", nargs="+", metavar="URL_NAME", help="Only benchmark these endpoints"
+        )
+        parser.add_argument("--output", help="Write the results as JSON to this file")
+        parser.add_argument(
+            "--compare", metavar="FILE", help="Print the change against an earlier --output file"
+        )
+
+    def handle(self, *args, **options):
+        client = Client()
+        # Each POST-only route answers the probing GET with a 405 warning
+        logging.getLogger("django.request").setLevel(logging.ERROR)
+        user = self.account(options["account"])
+        if user is not None:
+            client.force_login(user)
+
+        samples = {}
+        results = {
+            "commit": git_commit(),
+            "vendor": connection.vendor,
+            "account": user.username if user is not None else None,
+            "measured_at": timezone.now().isoformat(),
+            "repeat": options["repeat"],
+            "data": {
+                "congregations": Congregation.objects.count(),
+                "members": Guilder.objects.count(),
+                "attendance": SundayAttendance.objects.count(),
+                "quizzes": Quiz.objects.count(),
+                "submissions": QuizSubmission.objects.count(),
+            },
+            "endpoints": {},
+            "skipped": {},
+        }
+        self.stdout.write(
+            "Benchmarking against "
+            + ", ".join(f"{count} {name}" for name, count in results["data"].items())
+        )
+
+        for name, route, arguments in api_routes():
+            if options["only"] and name not in options["only"]:
+                continue
+            kwargs = {}
+            for argument in arguments:
+                if argument not in samples:
+                    sample = SAMPLES.get(argument)
+                    samples[argument] = sample() if sample else None
+                kwargs[argument] = samples[argument]
+            missing = [argument for argument, value in kwargs.items() if value is None]
+            if missing:
+                results["skipped"][name] = f"no sample for {', '.join(missing)}"
+                continue
+
+            path = "/" + route
+            for argument, value in kwargs.items():
+                path = path.replace(f"<int:{argument}>", str(value))
+            entry = self.measure(client, path, EXTRA_PARAMS.get(name, {}), options["repeat"])
+            if entry["status"] == 405:
+                results["skipped"][name] = "no GET"
+                continue
+            results["endpoints"][name] = entry
+            self.stdout.write(
+                f"{name:>34}: {entry['status']} cold {entry['cold_ms']:9.3f} ms "
+                f"({entry['cold_queries']} q), median {entry['median_ms']:9.3f} ms "
+                f"({entry['queries']} q), {entry['bytes']} bytes"
+            )
+
+        if options["compare"]:
+            self.compare(results, options["compare"])
+
+        if options["output"]:
+            with open(options["output"], "w") as fh:
+                json.dump(results, fh, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Results written to {options['output']}"))
+
+    def account(self, username):
+        if username:
+            user = User.objects.filter(username=username).first()
+            if user is None:
+                raise CommandError(f"No user named {username}")
+            return user
+        congregation = (
+            Congregation.objects.filter(is_district=True)
+            .exclude(user=None)
+            .select_related("user")
+            .first()
+        )
+        return congregation.user if congregation else None
+
+    def measure(self, client, path, params, repeat):
+        """One cold request after clearing the cache, then ``repeat`` warm ones"""
+        cache.clear()
+        runs = []
+        for _ in range(repeat + 1):
+            with CaptureQueriesContext(connection) as queries:
+                began = time.perf_counter()
+                response = client.get(path, params)
+                body = b"".join(response.streaming_content) if response.streaming else response.content
+                elapsed = (time.perf_counter() - began) * 1000
+            runs.append((elapsed, len(queries), response.status_code, len(body)))
+            if response.status_code == 405:
+                break
+
+        cold, warm = runs[0], runs[1:] or runs[:1]
+        timings = sorted(run[0] for run in warm)
+        return {
+            "path": path,
+            "status": warm[-1][2],
+            "cold_ms": round(cold[0], 3),
+            "cold_queries": cold[1],
+            "queries": warm[-1][1],
+            "min_ms": round(timings[0], 3),
+            "median_ms": round(statistics.median(timings), 3),
+            "p95_ms": round(percentile(timings, 95), 3),
+            "bytes": warm[-1][3],
+        }
+
+    def compare(self, results, path):
+        with open(path) as fh:
+            previous = json.load(fh)
+        self.stdout.write(
+            f"\nAgainst {previous.get('commit') or path} "
+            f"({previous.get('measured_at', 'unknown time')}):"
+        )
+        for name, entry in results["endpoints"].items():
+            before = previous.get("endpoints", {}).get(name)
+            if before is None:
+                self.stdout.write(f"{name:>34}: new")
+                continue
+            change = (
+                (entry["median_ms"] - before["median_ms"]) / before["median_ms"] * 100
+                if before["median_ms"]
+                else 0.0
+            )
+            line = (
+                f"{name:>34}: median {before['median_ms']:9.3f} -> {entry['median_ms']:9.3f} ms "
+                f"({change:+6.1f}%), queries {before['queries']} -> {entry['queries']}"
+            )
+            if entry["queries"] > before["queries"] or change > 10:
+                line = self.style.WARNING(line)
+            self.stdout.write(line)
@@ -0,0 +1,71 @@
+import json
+import os
+import statistics
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from core.backups import restore_archive, verify_archive, write_archive
+
+
+class Command(BaseCommand):
+    help = "Benchmark backup archive write, verify and restore throughput"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--repeat", type=int, default=3, help="Runs per phase")
+        parser.add_argument(
+            "--restore",
+            action="store_true",
+            help="Also time a full restore (rolled back after each run)",
+        )
+        parser.add_argument("--output", help="Write the results as JSON to this file")
+
+    def handle(self, *args, **options):
+        phases = {"write": [], "verify": [], "restore": []}
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "bench.ndjson.gz")
+            for _ in range(options["repeat"]):
+                began = time.perf_counter()
+                counts, _ = write_archive(path)
+                phases["write"].append(time.perf_counter() - began)
+
+                began = time.perf_counter()
+                verify_archive(path)
+                phases["verify"].append(time.perf_counter() - began)
+
+                if options["restore"]:
+                    with transaction.atomic():
+                        began = time.perf_counter()
+                        restore_archive(path)
+                        phases["restore"].append(time.perf_counter() - began)
+                        transaction.set_rollback(True)
+            size = os.path.getsize(path)
+
+        rows = sum(counts.values())
+        results = {
+            "vendor": connection.vendor,
+            "rows": rows,
+            "archive_bytes": size,
+            "phases": {},
+        }
+        self.stdout.write(f"{rows} rows, {size / 1024:.1f} KiB compressed, on {connection.vendor}")
+        for phase, timings in phases.items():
+            if not timings:
+                continue
+            median = statistics.median(timings)
+            results["phases"][phase] = {
+                "median_s": round(median, 4),
+                "rows_per_s": round(rows / median),
+                "mib_per_s": round(size / median / 1024 / 1024, 2),
+            }
+            self.stdout.write(
+                f"{phase:>8}: median {median * 1000:9.1f} ms, "
+                f"{rows / median:10.0f} rows/s, {size / median / 1024 / 1024:6.2f} MiB/s"
+            )
+
+        if options["output"]:
+            with open(options["output"], "w") as fh:
+                json.dump(results, fh, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Results written to {options['output']}"))
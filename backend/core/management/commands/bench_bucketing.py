@@ -0,0 +1,126 @@
+import json
+import statistics
+import time
+from collections import defaultdict
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.db.models import Sum
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from core.bucketing import PERIODS, bucketed
+from core.models import SundayAttendance
+from core.rollups import rollups
+
+
+def legacy_extra(start):
+    """The DATE_TRUNC/EXTRACT queries api_analytics_detailed used to run"""
+    queryset = SundayAttendance.objects.filter(date__gte=start)
+    results = {}
+    results["week"] = list(
+        queryset.values("date")
+        .annotate(total=Sum("total_count"))
+        .order_by("date")
+    )
+    results["month"] = list(
+        queryset.extra(select={"bucket": "DATE_TRUNC('month', date)"})
+        .values("bucket")
+        .annotate(total=Sum("total_count"))
+        .order_by("bucket")
+    )
+    results["year"] = list(
+        queryset.extra(select={"bucket": "EXTRACT(year FROM date)"})
+        .values("bucket")
+        .annotate(total=Sum("total_count"))
+        .order_by("bucket")
+    )
+    return results
+
+
+def python_grouping(start):
+    """Load every record and bucket it in Python, as the trend views did"""
+    results = {period: defaultdict(int) for period in PERIODS}
+    records = SundayAttendance.objects.filter(date__gte=start).values_list(
+        "date", "total_count"
+    )
+    for day, total in records:
+        results["week"][day - timedelta(days=day.weekday())] += total
+        results["month"][day.replace(day=1)] += total
+        results["year"][day.year] += total
+    return results
+
+
+def trunc_buckets(start):
+    queryset = SundayAttendance.objects.filter(date__gte=start)
+    return {period: list(bucketed(queryset, period)) for period in PERIODS}
+
+
+def rollup_reads(start):
+    return {period: list(rollups(period, start=start)) for period in PERIODS}
+
+
+class Command(BaseCommand):
+    help = "Benchmark attendance bucketing strategies against the current data"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--years", type=int, default=2, help="How many years of history to bucket"
+        )
+        parser.add_argument(
+            "--repeat", type=int, default=5, help="Runs per strategy"
+        )
+        parser.add_argument(
+            "--output", help="Write the results as JSON to this file"
+        )
+
+    def handle(self, *args, **options):
+        start = timezone.now().date() - timedelta(days=options["years"] * 365)
+        strategies = [
+            ("python_grouping", python_grouping),
+            ("trunc_buckets", trunc_buckets),
+            ("rollups", rollup_reads),
+        ]
+        # .extra(DATE_TRUNC ...) is Postgres-only SQL
+        if connection.vendor == "postgresql":
+            strategies.insert(0, ("legacy_extra", legacy_extra))
+        else:
+            self.stdout.write(
+                self.style.WARNING(
+                    f"Skipping legacy_extra: DATE_TRUNC is not available on {connection.vendor}"
+                )
+            )
+
+        records = SundayAttendance.objects.filter(date__gte=start).count()
+        self.stdout.write(
+            f"Bucketing {records} attendance records since {start} on {connection.vendor}"
+        )
+
+        results = {
+            "vendor": connection.vendor,
+            "records": records,
+            "since": start.isoformat(),
+            "strategies": {},
+        }
+        for name, strategy in strategies:
+            timings = []
+            for _ in range(options["repeat"]):
+                with CaptureQueriesContext(connection) as queries:
+                    began = time.perf_counter()
+                    strategy(start)
+                    timings.append((time.perf_counter() - began) * 1000)
+            results["strategies"][name] = {
+                "queries": len(queries),
+                "min_ms": round(min(timings), 3),
+                "median_ms": round(statistics.median(timings), 3),
+            }
+            self.stdout.write(
+                f"{name:>16}: median {statistics.median(timings):9.3f} ms, "
+                f"min {min(timings):9.3f} ms, {len(queries)} queries"
+            )
+
+        if options["output"]:
+            with open(options["output"], "w") as fh:
+                json.dump(results, fh, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Results written to {options['output']}"))
@@ -2,6 +2,7 @@ from django.core.management.base import BaseCommand
 from django.utils import timezone
 from datetime import timedelta
 from core.models import Quiz, QuizSubmission
+from core.quiz_standings import apply_due_quizzes
 import logging
 
 logger = logging.getLogger(__name__)
@@ -65,4 +66,9 @@ class Command(BaseCommand):
                     f"{correct_count} correct answers"
                 )
         
+        if not dry_run:
+            folded = apply_due_quizzes(now)
+            if folded:
+                self.stdout.write(f"Added {folded} quizzes to the congregation standings")
+
         self.stdout.write(self.style.SUCCESS('Quiz cleanup completed successfully'))
@@ -0,0 +1,54 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.retention import BATCH_SIZE, POLICIES, compact
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete rows older than their retention period (DATA_RETENTION_DAYS) "
+        "in small batches, and report the rows and space reclaimed"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--only", nargs="+", metavar="POLICY",
+            help=f"Only apply these policies ({', '.join(policy.name for policy in POLICIES)})",
+        )
+        parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="Rows per transaction")
+        parser.add_argument(
+            "--pause", type=float, default=0.0, help="Seconds to wait between batches"
+        )
+        parser.add_argument(
+            "--dry-run", action="store_true", help="Count the expired rows without deleting them"
+        )
+
+    def handle(self, *args, **options):
+        known = {policy.name for policy in POLICIES}
+        unknown = set(options["only"] or ()) - known
+        if unknown:
+            raise CommandError(f"Unknown policy: {', '.join(sorted(unknown))}")
+        if options["batch_size"] < 1:
+            raise CommandError("--batch-size must be at least 1")
+
+        began = time.perf_counter()
+        report = compact(
+            names=options["only"],
+            dry_run=options["dry_run"],
+            batch_size=options["batch_size"],
+            pause=options["pause"],
+        )
+        verb = "would delete" if options["dry_run"] else "deleted"
+        total_rows = total_bytes = 0
+        for name, entry in report.items():
+            size = f", ~{entry['bytes'] / 1024:.1f} KiB" if entry["bytes"] is not None else ""
+            days = f"{entry['days']} day{'s' if entry['days'] != 1 else ''}"
+            self.stdout.write(f"{name:>18}: {verb} {entry['rows']} rows past {days}{size}")
+            total_rows += entry["rows"]
+            total_bytes += entry["bytes"] or 0
+
+        summary = f"{verb.capitalize()} {total_rows} rows"
+        if total_bytes:
+            summary += f" (~{total_bytes / 1024 / 1024:.2f} MiB)"
+        self.stdout.write(self.style.SUCCESS(f"{summary} in {time.perf_counter() - began:.1f} s"))
@@ -0,0 +1,148 @@
+import json
+import statistics
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+from django.utils import timezone
+
+from core.models import Quiz, QuizSubmission
+from core.quiz_cache import submission_buffer
+
+SUBMIT_PATH = "/api/quizzes/submit/"
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+class Command(BaseCommand):
+    help = "Simulate a burst of concurrent quiz submitters against the submit endpoint"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--submitters", type=int, default=300, help="Number of distinct phone numbers"
+        )
+        parser.add_argument(
+            "--concurrency", type=int, default=50, help="Simultaneous submitters"
+        )
+        parser.add_argument(
+            "--duplicates",
+            type=float,
+            default=0.1,
+            help="Fraction of submitters that also send a second (rejected) answer",
+        )
+        parser.add_argument(
+            "--url",
+            help="Base URL of a running server (e.g. http://127.0.0.1:8000); "
+            "defaults to the in-process test client",
+        )
+        parser.add_argument(
+            "--quiz", type=int, help="Submit to this quiz instead of a temporary one"
+        )
+        parser.add_argument(
+            "--keep", action="store_true", help="Keep the temporary quiz and its submissions"
+        )
+
+    def handle(self, *args, **options):
+        if options["quiz"]:
+            quiz = Quiz.objects.filter(id=options["quiz"]).first()
+            if quiz is None:
+                raise CommandError(f"Quiz {options['quiz']} does not exist")
+            temporary = False
+        else:
+            now = timezone.now()
+            quiz = Quiz.objects.create(
+                title="Load test quiz",
+                question="Load test",
+                option_a="A",
+                option_b="B",
+                option_c="C",
+                option_d="D",
+                correct_answer="A",
+                start_time=now - timedelta(minutes=1),
+                end_time=now + timedelta(hours=1),
+            )
+            temporary = True
+
+        payloads = []
+        for index in range(options["submitters"]):
+            payloads.append(
+                {
+                    "quiz_id": quiz.id,
+                    "name": f"Load Tester {index}",
+                    "phone_number": f"09{index:08d}",
+                    "congregation": f"Load Congregation {index % 12}",
+                    "selected_answer": "ABCD"[index % 4],
+                }
+            )
+        duplicates = int(len(payloads) * options["duplicates"])
+        payloads.extend(dict(payload) for payload in payloads[:duplicates])
+
+        local = threading.local()
+
+        def submit(payload):
+            body = json.dumps(payload).encode()
+            began = time.perf_counter()
+            if options["url"]:
+                request = urllib.request.Request(
+                    options["url"].rstrip("/") + SUBMIT_PATH,
+                    data=body,
+                    headers={"Content-Type": "application/json"},
+                )
+                try:
+                    with urllib.request.urlopen(request, timeout=30) as response:
+                        status = response.status
+                except urllib.error.HTTPError as e:
+                    status = e.code
+            else:
+                if not hasattr(local, "client"):
+                    local.client = Client()
+                status = local.client.post(
+                    SUBMIT_PATH, body, content_type="application/json"
+                ).status_code
+            return status, time.perf_counter() - began
+
+        self.stdout.write(
+            f"Sending {len(payloads)} submissions ({duplicates} duplicates) to quiz {quiz.id} "
+            f"with {options['concurrency']} concurrent submitters"
+        )
+        began = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options["concurrency"]) as pool:
+            results = list(pool.map(submit, payloads))
+        elapsed = time.perf_counter() - began
+        if not options["url"]:
+            # Write out anything the in-process buffer still holds
+            submission_buffer.flush()
+
+        latencies = [latency * 1000 for _, latency in results]
+        statuses = Counter(status for status, _ in results)
+        stored = QuizSubmission.objects.filter(quiz=quiz).count()
+
+        self.stdout.write(
+            f"{len(results) / elapsed:.1f} submissions/s over {elapsed:.2f} s; "
+            f"latency p50 {statistics.median(latencies):.1f} ms, "
+            f"p95 {percentile(latencies, 0.95):.1f} ms, p99 {percentile(latencies, 0.99):.1f} ms"
+        )
+        self.stdout.write(
+            "Responses: " + ", ".join(f"{status}: {count}" for status, count in sorted(statuses.items()))
+        )
+        self.stdout.write(f"Stored submissions: {stored} (expected {options['submitters']})")
+
+        if temporary and not options["keep"]:
+            quiz.delete()
+        if stored == options["submitters"]:
+            self.stdout.write(self.style.SUCCESS("Load test completed"))
+        else:
+            self.stdout.write(
+                self.style.WARNING(
+                    "Stored count differs (a remote server may still hold buffered submissions)"
+                )
+            )
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from core.rollups import rebuild_rollups
+
+
+class Command(BaseCommand):
+    help = "Recompute weekly, monthly and yearly attendance rollups from scratch"
+
+    def handle(self, *args, **options):
+        count = rebuild_rollups()
+        self.stdout.write(
+            self.style.SUCCESS(f"Rebuilt {count} attendance rollup rows")
+        )
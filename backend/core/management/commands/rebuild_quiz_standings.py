@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from core.quiz_standings import rebuild_standings
+
+
+class Command(BaseCommand):
+    help = "Recompute the congregation quiz leaderboard from all quiz submissions"
+
+    def handle(self, *args, **options):
+        count = rebuild_standings()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt quiz standings for {count} congregations"))
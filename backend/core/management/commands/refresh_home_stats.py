@@ -0,0 +1,30 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.home_stats import refresh_snapshot
+
+
+class Command(BaseCommand):
+    help = "Rebuild the HomeStatsSnapshot served by api_home_stats"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--interval",
+            type=float,
+            help="Keep running and rebuild every INTERVAL seconds",
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            began = time.perf_counter()
+            snapshot = refresh_snapshot()
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"Home stats snapshot generated at {snapshot.generated_at:%Y-%m-%d %H:%M:%S} "
+                    f"in {(time.perf_counter() - began) * 1000:.1f} ms"
+                )
+            )
+            if not options["interval"]:
+                break
+            time.sleep(options["interval"])
@@ -0,0 +1,53 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core.backups import BackupError, restore_archive, restore_backup
+from core.models import Backup
+
+
+class Command(BaseCommand):
+    help = "Replace members and attendance with the contents of a backup"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "backup_id",
+            nargs="?",
+            type=int,
+            help="Backup to restore (defaults to the latest complete backup)",
+        )
+        parser.add_argument(
+            "--file", help="Restore from an archive file instead of a Backup record"
+        )
+        parser.add_argument(
+            "--noinput",
+            action="store_true",
+            help="Do not ask for confirmation",
+        )
+
+    def handle(self, *args, **options):
+        backup = None
+        if options["file"]:
+            source = options["file"]
+        else:
+            backups = Backup.objects.filter(status="complete")
+            if options["backup_id"]:
+                backups = backups.filter(id=options["backup_id"])
+            backup = backups.first()
+            if backup is None:
+                raise CommandError("No complete backup found")
+            source = backup.file_path
+
+        if not options["noinput"]:
+            answer = input(
+                f"This replaces all members and attendance with {source}. Type 'yes' to continue: "
+            )
+            if answer != "yes":
+                self.stdout.write("Restore cancelled")
+                return
+
+        try:
+            restored = restore_backup(backup) if backup else restore_archive(source)
+        except (BackupError, OSError) as e:
+            raise CommandError(str(e))
+
+        counts = ", ".join(f"{name}: {count}" for name, count in restored.items())
+        self.stdout.write(self.style.SUCCESS(f"Restored {source} ({counts})"))
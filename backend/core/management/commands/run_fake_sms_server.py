@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from core.fake_sms import FakeSMSServer
+
+
+class Command(BaseCommand):
+    help = (
+        "Serve a local stand-in for an HTTP SMS API; point the 'http' "
+        "messaging provider at it to try the message worker without sending SMS"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--port", type=int, default=8025)
+
+    def handle(self, *args, **options):
+        server = FakeSMSServer(port=options["port"], verbose=True)
+        self.stdout.write(self.style.SUCCESS(f"Accepting messages at {server.url}"))
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+            self.stdout.write(f"Received {len(server.messages)} messages")
@@ -0,0 +1,45 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+
+from core.messaging import BATCH_SIZE, THREADS, process_batch, requeue_stale_messages
+
+
+class Command(BaseCommand):
+    help = "Send queued SMS (OutboundMessage rows) through their providers"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Send the messages currently due, then exit",
+        )
+        parser.add_argument(
+            "--sleep",
+            type=float,
+            default=2.0,
+            help="Seconds to wait between polls when nothing is due",
+        )
+        parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="Messages claimed at a time")
+        parser.add_argument("--threads", type=int, default=THREADS, help="Concurrent sends")
+
+    def handle(self, *args, **options):
+        requeued = requeue_stale_messages()
+        if requeued:
+            self.stdout.write(self.style.WARNING(f"Requeued {requeued} stale messages"))
+
+        with ThreadPoolExecutor(max_workers=options["threads"]) as executor:
+            while True:
+                outcomes = process_batch(executor, options["batch_size"])
+                if not outcomes:
+                    if options["once"]:
+                        break
+                    time.sleep(options["sleep"])
+                    continue
+
+                line = (
+                    f"{outcomes['sent']} sent, {outcomes['retry']} to retry, "
+                    f"{outcomes['failed']} failed"
+                )
+                self.stdout.write(self.style.ERROR(line) if outcomes["failed"] else self.style.SUCCESS(line))
@@ -0,0 +1,44 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.reports import claim_next_job, requeue_stale_jobs, run_job
+
+
+class Command(BaseCommand):
+    help = "Build queued PDF reports (ReportJob rows) outside the web workers"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Process the jobs currently queued, then exit",
+        )
+        parser.add_argument(
+            "--sleep",
+            type=float,
+            default=2.0,
+            help="Seconds to wait between polls when the queue is empty",
+        )
+
+    def handle(self, *args, **options):
+        requeued = requeue_stale_jobs()
+        if requeued:
+            self.stdout.write(self.style.WARNING(f"Requeued {requeued} stale report jobs"))
+
+        while True:
+            job = claim_next_job()
+            if job is None:
+                if options["once"]:
+                    break
+                time.sleep(options["sleep"])
+                continue
+
+            self.stdout.write(f"Building {job.report_type} report (job {job.id})")
+            job = run_job(job)
+            if job.status == "done":
+                self.stdout.write(
+                    self.style.SUCCESS(f"Job {job.id} done: {job.row_count} rows -> {job.file_path}")
+                )
+            else:
+                self.stdout.write(self.style.ERROR(f"Job {job.id} {job.status}: {job.error}"))
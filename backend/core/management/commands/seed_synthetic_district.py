@@ -0,0 +1,243 @@
+import random
+import time
+from datetime import date, datetime, time as day_time, timedelta
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from core.caching import bump
+from core.home_stats import mark_stale as mark_home_stats_stale
+from core.models import (DISTRICT_EXECUTIVE_POSITIONS, LOCAL_EXECUTIVE_POSITIONS,
+                         Congregation, Guilder, Quiz, QuizSubmission, SundayAttendance,
+                         month_day)
+from core.quiz_feed import invalidate_feeds
+from core.quiz_standings import rebuild_standings
+from core.rollups import rebuild_rollups
+from core.search import member_index
+
+PREFIX = "Synthetic"
+BATCH_SIZE = 2000
+
+FIRST_NAMES = {
+    "Male": ["Kwame", "Kofi", "Yaw", "Kwabena", "Kwaku", "Kojo", "Emmanuel", "Daniel", "Samuel", "Isaac"],
+    "Female": ["Ama", "Akosua", "Abena", "Adwoa", "Afua", "Yaa", "Esi", "Grace", "Mercy", "Deborah"],
+}
+LAST_NAMES = ["Mensah", "Owusu", "Boateng", "Asante", "Osei", "Agyeman", "Appiah", "Darko", "Ofori", "Addo"]
+TOWNS = ["Kumasi", "Accra", "Tema", "Koforidua", "Cape Coast", "Takoradi", "Ho", "Sunyani"]
+PROFESSIONS = ["Teacher", "Nurse", "Trader", "Engineer", "Student", "Accountant", "Farmer", ""]
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate a reproducible synthetic district (congregations, members with "
+        "executives, years of attendance, quizzes and submissions) for benchmarks"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--congregations", type=int, default=12)
+        parser.add_argument("--members", type=int, default=80, help="Members per congregation")
+        parser.add_argument("--years", type=int, default=3, help="Years of Sunday attendance")
+        parser.add_argument("--quizzes", type=int, default=24)
+        parser.add_argument("--submissions", type=int, default=150, help="Submissions per quiz")
+        parser.add_argument("--seed", type=int, default=42, help="Random seed")
+        parser.add_argument(
+            "--end-date",
+            type=date.fromisoformat,
+            help="Last day of generated history (default: today), for identical data across days",
+        )
+        parser.add_argument(
+            "--clear",
+            action="store_true",
+            help=f"Delete previously generated '{PREFIX}' data first",
+        )
+
+    def handle(self, *args, **options):
+        rng = random.Random(options["seed"])
+        end_date = options["end_date"] or timezone.localdate()
+        began = time.perf_counter()
+
+        if options["clear"]:
+            self.clear()
+        elif Congregation.objects.filter(name__startswith=f"{PREFIX} ").exists():
+            self.stdout.write(
+                self.style.ERROR(f"{PREFIX} data already exists; pass --clear to replace it")
+            )
+            return
+
+        with transaction.atomic():
+            congregations = self.create_congregations(options["congregations"])
+            members = self.create_members(rng, congregations, options["members"])
+            records = self.create_attendance(rng, congregations, options["years"], end_date)
+            quizzes, submissions = self.create_quizzes(
+                rng, congregations, options["quizzes"], options["submissions"], end_date
+            )
+
+            # bulk_create skips the signals that keep these in step
+            rebuild_rollups()
+            rebuild_standings()
+            mark_home_stats_stale()
+            transaction.on_commit(bump)
+            transaction.on_commit(member_index.invalidate)
+            transaction.on_commit(invalidate_feeds)
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Created {len(congregations)} congregations, {members} members, "
+                f"{records} attendance records, {quizzes} quizzes and {submissions} "
+                f"submissions in {time.perf_counter() - began:.1f} s"
+            )
+        )
+
+    def clear(self):
+        congregations = Congregation.objects.filter(name__startswith=f"{PREFIX} ")
+        user_ids = list(congregations.exclude(user=None).values_list("user_id", flat=True))
+        with transaction.atomic():
+            Quiz.objects.filter(title__startswith=f"{PREFIX} ").delete()
+            SundayAttendance.objects.filter(congregation__in=congregations).delete()
+            Guilder.objects.filter(congregation__in=congregations).delete()
+            congregations.delete()
+            User.objects.filter(id__in=user_ids).delete()
+        self.stdout.write(f"Removed previous {PREFIX} data")
+
+    def create_congregations(self, count):
+        users = []
+        for index in range(count + 1):
+            user = User(username=f"synthetic_{index}")
+            user.set_unusable_password()
+            users.append(user)
+        users = User.objects.bulk_create(users)
+        # bulk_create only returns primary keys on some backends
+        users = list(User.objects.filter(username__startswith="synthetic_").order_by("id"))
+
+        congregations = [
+            Congregation(name=f"{PREFIX} District", user=users[0], is_district=True)
+        ] + [
+            Congregation(
+                name=f"{PREFIX} Congregation {index + 1:03d}",
+                location=TOWNS[index % len(TOWNS)],
+                user=users[index + 1],
+            )
+            for index in range(count)
+        ]
+        Congregation.objects.bulk_create(congregations)
+        return list(
+            Congregation.objects.filter(name__startswith=f"{PREFIX} ", is_district=False).order_by("name")
+        )
+
+    def create_members(self, rng, congregations, per_congregation):
+        district_positions = [code for code, _ in DISTRICT_EXECUTIVE_POSITIONS]
+        local_positions = [code for code, _ in LOCAL_EXECUTIVE_POSITIONS]
+        members = []
+        for number, congregation in enumerate(congregations):
+            for index in range(per_congregation):
+                gender = "Male" if rng.random() < 0.47 else "Female"
+                born = date(1985, 1, 1) + timedelta(days=rng.randrange(365 * 22))
+                member = Guilder(
+                    first_name=rng.choice(FIRST_NAMES[gender]),
+                    last_name=rng.choice(LAST_NAMES),
+                    date_of_birth=born,
+                    birth_month_day=month_day(born),
+                    gender=gender,
+                    phone_number=f"09{number:04d}{index:05d}",
+                    place_of_residence=congregation.location,
+                    residential_address=f"House {rng.randrange(1, 400)}, {congregation.location}",
+                    profession=rng.choice(PROFESSIONS),
+                    hometown=rng.choice(TOWNS),
+                    relative_contact=f"08{number:04d}{index:05d}",
+                    congregation=congregation,
+                    membership_status="Active" if rng.random() < 0.8 else "Distant",
+                )
+                # Every congregation fills each local office once
+                if index < len(local_positions):
+                    position = local_positions[index]
+                    member.is_executive = True
+                    member.executive_level = "local"
+                    member.executive_position = position
+                    member.local_executive_position = position
+                members.append(member)
+
+        # District offices go to members spread across the congregations,
+        # some of whom also hold a local office
+        for offset, position in enumerate(district_positions):
+            member = members[(offset * 37) % len(members)] if members else None
+            if member is None:
+                break
+            member.is_executive = True
+            if member.local_executive_position:
+                member.executive_level = "both"
+            else:
+                member.executive_level = "district"
+                member.executive_position = position
+            member.district_executive_position = position
+
+        Guilder.objects.bulk_create(members, batch_size=BATCH_SIZE)
+        return len(members)
+
+    def create_attendance(self, rng, congregations, years, end_date):
+        last_sunday = end_date - timedelta(days=(end_date.weekday() + 1) % 7)
+        sundays = [last_sunday - timedelta(weeks=week) for week in range(years * 52)]
+        records = []
+        for congregation in congregations:
+            size = rng.randrange(25, 90)
+            for sunday in sundays:
+                turnout = max(0, int(rng.gauss(size, size * 0.15)))
+                male = int(turnout * rng.uniform(0.38, 0.52))
+                records.append(
+                    SundayAttendance(
+                        congregation=congregation,
+                        date=sunday,
+                        male_count=male,
+                        female_count=turnout - male,
+                        total_count=turnout,
+                    )
+                )
+        SundayAttendance.objects.bulk_create(records, batch_size=BATCH_SIZE)
+        return len(records)
+
+    def create_quizzes(self, rng, congregations, count, per_quiz, end_date):
+        end = timezone.make_aware(datetime.combine(end_date, day_time(18)))
+        quizzes = []
+        for index in range(count):
+            start = end - timedelta(days=7 * (count - index))
+            quizzes.append(
+                Quiz(
+                    title=f"{PREFIX} quiz {index + 1:03d}",
+                    question=f"Synthetic question {index + 1}?",
+                    option_a="Option A",
+                    option_b="Option B",
+                    option_c="Option C",
+                    option_d="Option D",
+                    correct_answer=rng.choice("ABCD"),
+                    start_time=start,
+                    end_time=start + timedelta(hours=1),
+                )
+            )
+        Quiz.objects.bulk_create(quizzes)
+        quizzes = list(Quiz.objects.filter(title__startswith=f"{PREFIX} ").order_by("start_time"))
+
+        submissions = []
+        for number, quiz in enumerate(quizzes):
+            for index in range(per_quiz):
+                answer = quiz.correct_answer if rng.random() < 0.6 else rng.choice("ABCD")
+                submissions.append(
+                    QuizSubmission(
+                        quiz=quiz,
+                        name=f"{rng.choice(FIRST_NAMES['Female'] + FIRST_NAMES['Male'])} {rng.choice(LAST_NAMES)}",
+                        phone_number=f"07{number:04d}{index:05d}",
+                        congregation=rng.choice(congregations).name if congregations else PREFIX,
+                        selected_answer=answer,
+                        is_correct=answer == quiz.correct_answer,
+                    )
+                )
+        QuizSubmission.objects.bulk_create(submissions, batch_size=BATCH_SIZE)
+        # submitted_at is auto_now_add; spread it over each quiz's hour
+        for quiz in quizzes:
+            rows = list(QuizSubmission.objects.filter(quiz=quiz).order_by("id"))
+            for offset, submission in enumerate(rows):
+                submission.submitted_at = quiz.start_time + timedelta(
+                    seconds=int(3600 * offset / max(1, len(rows)))
+                )
+            QuizSubmission.objects.bulk_update(rows, ["submitted_at"], batch_size=BATCH_SIZE)
+        return len(quizzes), len(submissions)
@@ -0,0 +1,44 @@
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+
+from core.messaging import queue_attendance_reminders
+from core.models import Guilder, SundayAttendance
+
+# Local executives reminded when their congregation's attendance is missing
+REMINDED_POSITIONS = ("president", "secretary")
+
+
+class Command(BaseCommand):
+    help = "Queue SMS reminders to congregations that have not submitted a Sunday's attendance"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--date",
+            type=date.fromisoformat,
+            help="The Sunday to check (default: the most recent one)",
+        )
+
+    def handle(self, *args, **options):
+        today = timezone.now().date()
+        sunday = options["date"] or today - timedelta(days=(today.weekday() + 1) % 7)
+
+        recipients = list(
+            Guilder.objects.filter(
+                is_executive=True,
+                local_executive_position__in=REMINDED_POSITIONS,
+                congregation__is_district=False,
+            )
+            .filter(~Exists(SundayAttendance.objects.filter(congregation=OuterRef("congregation"), date=sunday)))
+            .values_list("congregation_id", "congregation__name", "phone_number")
+        )
+        messages = queue_attendance_reminders(sunday, recipients)
+
+        congregations = len({congregation_id for congregation_id, _, _ in recipients})
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Queued {len(messages)} reminders for {congregations} congregations missing {sunday}"
+            )
+        )
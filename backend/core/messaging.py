@@ -0,0 +1,330 @@
+"""
+Outbound SMS.
+
+Senders only queue OutboundMessage rows, in their own transaction, so a
+request never waits on an SMS API and a rolled-back change sends nothing.
+The run_message_worker command claims pending rows in batches, hands them
+to a thread pool and records every outcome with one bulk_update. Sends to
+each provider pass through a token bucket filled at the provider's RATE
+per second, so a district-wide blast goes out as fast as the provider
+accepts and no faster.
+
+Every message has an idempotency key: queuing a key again stores nothing,
+and providers receive the key so that a message resent after a worker
+crash is delivered once. Temporary failures are retried with exponential
+backoff up to MAX_ATTEMPTS; permanent ones fail the message straight away.
+"""
+import json
+import logging
+import random
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import Counter
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import OutboundMessage, SystemSettings
+from .utils import get_formatted_message
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 100
+THREADS = 8
+MAX_ATTEMPTS = 5
+RETRY_BASE_SECONDS = 30
+RETRY_MAX_SECONDS = 3600
+# A message still "sending" after this long was claimed by a dead worker
+STALE_CLAIM_AFTER = timedelta(minutes=10)
+
+
+class TemporaryError(Exception):
+    """The provider could not take the message now; it is worth retrying"""
+
+    def __init__(self, message, retry_after=None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class PermanentError(Exception):
+    """The provider refused the message; retrying will not help"""
+
+
+class Provider:
+    """
+    Sends one message at a time. ``send`` returns the provider's id for
+    the message or raises TemporaryError / PermanentError. It is called
+    from the worker's threads, so it must not touch the database.
+    """
+
+    def __init__(self, name, options):
+        self.name = name
+        self.options = options
+
+    def send(self, message):
+        raise NotImplementedError
+
+
+class ConsoleProvider(Provider):
+    """Logs messages instead of sending them"""
+
+    def send(self, message):
+        logger.info("SMS to %s: %s", message.recipient, message.body)
+        return f"console-{message.pk}"
+
+
+class HTTPProvider(Provider):
+    """
+    POSTs {"to", "from", "body"} as JSON to the URL option, with the
+    idempotency key in an Idempotency-Key header, and reads the message id
+    from the "id" of the JSON reply.
+    """
+
+    timeout = 10
+
+    def send(self, message):
+        headers = {"Content-Type": "application/json", "Idempotency-Key": message.idempotency_key}
+        if self.options.get("TOKEN"):
+            headers["Authorization"] = f"Bearer {self.options['TOKEN']}"
+        request = urllib.request.Request(
+            self.options["URL"],
+            data=json.dumps(
+                {"to": message.recipient, "from": self.options.get("SENDER", ""), "body": message.body}
+            ).encode(),
+            headers=headers,
+            method="POST",
+        )
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                reply = response.read()
+        except urllib.error.HTTPError as e:
+            if e.code == 429 or e.code >= 500:
+                raise TemporaryError(f"HTTP {e.code}", retry_after=_seconds(e.headers.get("Retry-After")))
+            raise PermanentError(f"HTTP {e.code}: {e.read()[:200].decode(errors='replace')}")
+        except OSError as e:
+            # Connection refused, DNS failure, timeout
+            raise TemporaryError(str(e))
+        try:
+            return str(json.loads(reply).get("id", ""))
+        except (ValueError, AttributeError):
+            # Delivered; the reply just has no id we can read
+            return ""
+
+
+def _seconds(value):
+    try:
+        return max(0, int(value))
+    except (TypeError, ValueError):
+        return None
+
+
+class TokenBucket:
+    """Hands out ``rate`` tokens per second, at most ``capacity`` at once"""
+
+    def __init__(self, rate, capacity=None):
+        self.rate = float(rate)
+        self.capacity = capacity or max(1.0, self.rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """Wait until a token is free and take it"""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+# One bucket per provider for the whole worker process, so the rate holds
+# across batches
+_buckets = {}
+_buckets_lock = threading.Lock()
+
+
+def bucket_for(name, rate):
+    with _buckets_lock:
+        bucket = _buckets.get(name)
+        if bucket is None or bucket.rate != float(rate):
+            bucket = _buckets[name] = TokenBucket(rate)
+        return bucket
+
+
+def get_provider(name):
+    """The configured Provider called ``name``, or None if there is none"""
+    options = settings.MESSAGING_PROVIDERS.get(name)
+    if options is None:
+        return None
+    return import_string(options["BACKEND"])(name, options)
+
+
+def queue_messages(messages):
+    """
+    Store unsaved OutboundMessage rows for the worker. Rows without a
+    provider go to MESSAGING_PROVIDER; keys already queued are skipped.
+    """
+    for message in messages:
+        message.provider = message.provider or settings.MESSAGING_PROVIDER
+    OutboundMessage.objects.bulk_create(messages, batch_size=BATCH_SIZE, ignore_conflicts=True)
+
+
+def queue_message(kind, recipient, body, idempotency_key, provider=""):
+    queue_messages([
+        OutboundMessage(
+            kind=kind, recipient=recipient, body=body, idempotency_key=idempotency_key, provider=provider
+        )
+    ])
+
+
+def queue_welcome_messages(members):
+    """
+    Queue the welcome message for new, saved ``members`` while it is
+    switched on. The key is the member's pk, so someone who is removed and
+    added again with the same phone number is welcomed again.
+    """
+    setting = SystemSettings.objects.filter(setting_type="welcome_message", is_active=True).first()
+    if setting is None:
+        return
+    queue_messages([
+        OutboundMessage(
+            kind="welcome_message",
+            recipient=member.phone_number,
+            body=setting.get_formatted_message(name=member.first_name, congregation=member.congregation.name),
+            idempotency_key=f"welcome_message:{member.pk}",
+        )
+        for member in members
+    ])
+
+
+def queue_attendance_reminders(sunday, recipients):
+    """
+    Queue the attendance_reminder message for ``recipients``, an iterable of
+    (congregation_id, congregation_name, phone_number), about ``sunday``.
+    A congregation's executives are reminded at most once for a Sunday.
+    """
+    # Placeholders are left in when no values are passed
+    template = get_formatted_message("attendance_reminder")
+    messages = [
+        OutboundMessage(
+            kind="attendance_reminder",
+            recipient=phone_number,
+            body=template.replace("{congregation}", name)
+            .replace("{date}", sunday.strftime("%d %B %Y"))
+            .replace("{day}", sunday.strftime("%A")),
+            idempotency_key=f"attendance_reminder:{congregation_id}:{sunday}:{phone_number}",
+        )
+        for congregation_id, name, phone_number in recipients
+    ]
+    queue_messages(messages)
+    return messages
+
+
+def requeue_stale_messages():
+    """Return messages a crashed worker left "sending" to the queue"""
+    return OutboundMessage.objects.filter(
+        status="sending", claimed_at__lt=timezone.now() - STALE_CLAIM_AFTER
+    ).update(status="pending")
+
+
+def claim_batch(limit=BATCH_SIZE):
+    """
+    Move up to ``limit`` due messages to "sending". SKIP LOCKED lets several
+    workers drain the table without claiming a message twice.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        messages = list(
+            OutboundMessage.objects.select_for_update(skip_locked=True)
+            .filter(status="pending", next_attempt_at__lte=now)
+            .order_by("next_attempt_at", "id")[:limit]
+        )
+        for message in messages:
+            message.status = "sending"
+            message.claimed_at = now
+            message.attempts += 1
+        OutboundMessage.objects.bulk_update(messages, ["status", "claimed_at", "attempts"])
+    return messages
+
+
+def retry_delay(attempts, retry_after=None):
+    """Seconds before another try: doubling from RETRY_BASE_SECONDS, with jitter"""
+    delay = min(RETRY_MAX_SECONDS, RETRY_BASE_SECONDS * 2 ** (attempts - 1))
+    delay *= random.uniform(0.8, 1.2)
+    return max(delay, retry_after or 0)
+
+
+def _deliver(provider, bucket, message):
+    bucket.acquire()
+    try:
+        return provider.send(message), None
+    except Exception as e:
+        return None, e
+
+
+def _record(message, provider_message_id, error, now):
+    """Fill in the outcome of sending ``message``; returns sent, retry or failed"""
+    if error is None:
+        message.status = "sent"
+        message.sent_at = now
+        message.provider_message_id = provider_message_id[:100]
+        message.error = ""
+        return "sent"
+    message.error = str(error) or error.__class__.__name__
+    if isinstance(error, PermanentError) or message.attempts >= MAX_ATTEMPTS:
+        message.status = "failed"
+        return "failed"
+    if not isinstance(error, TemporaryError):
+        logger.error("Sending message %s failed", message.pk, exc_info=error)
+    message.status = "pending"
+    message.next_attempt_at = now + timedelta(
+        seconds=retry_delay(message.attempts, getattr(error, "retry_after", None))
+    )
+    return "retry"
+
+
+def process_batch(executor, limit=BATCH_SIZE):
+    """
+    Claim and send one batch over ``executor`` (a thread pool); returns a
+    Counter of outcomes, empty when nothing was due.
+    """
+    messages = claim_batch(limit)
+    if not messages:
+        return Counter()
+
+    senders = {}
+    for name in {message.provider for message in messages}:
+        provider = get_provider(name)
+        if provider is not None:
+            senders[name] = (provider, bucket_for(name, provider.options["RATE"]))
+    futures = [
+        (message, executor.submit(_deliver, *senders[message.provider], message))
+        if message.provider in senders
+        else (message, None)
+        for message in messages
+    ]
+
+    outcomes = Counter()
+    now = timezone.now()
+    for message, future in futures:
+        if future is None:
+            result = None, PermanentError(f"No messaging provider named '{message.provider}'")
+        else:
+            result = future.result()
+        outcomes[_record(message, *result, now)] += 1
+    OutboundMessage.objects.bulk_update(
+        messages,
+        ["status", "sent_at", "provider_message_id", "error", "next_attempt_at"],
+        batch_size=BATCH_SIZE,
+    )
+    return outcomes
@@ -0,0 +1,161 @@
+"""
+Per-endpoint request measurements.
+
+ProfilingMiddleware records, for every request, the URL name, SQL query
+count, time spent in the database, the remaining (Python) time and the
+response size. Samples go to an in-memory ring buffer per worker process
+that api_metrics summarizes with percentiles; with REQUEST_METRICS_PERSIST
+on they are also written to RequestMetric in batches.
+
+Views declare how many queries they may issue with ``@query_budget(n)``.
+Requests over budget are logged, and the test suite checks the budgets
+of the hot endpoints (see core.tests.QueryBudgetTestMixin).
+"""
+import logging
+import threading
+import time
+from collections import deque, namedtuple
+
+from django.conf import settings
+from django.db import connection
+
+from .models import RequestMetric
+
+logger = logging.getLogger(__name__)
+
+MEASURES = ("queries", "db_ms", "python_ms", "response_bytes")
+PERCENTILES = (50, 95, 99)
+
+Sample = namedtuple(
+    "Sample", "url_name method status queries db_ms python_ms response_bytes"
+)
+
+
+def query_budget(limit):
+    """Declare the most SQL queries a view may run per request"""
+
+    def decorator(view):
+        view.query_budget = limit
+        return view
+
+    return decorator
+
+
+def budget_for(view):
+    """The declared budget of ``view``, looking through decorator wrappers"""
+    while view is not None:
+        limit = getattr(view, "query_budget", None)
+        if limit is not None:
+            return limit
+        view = getattr(view, "__wrapped__", None)
+    return None
+
+
+def percentile(ordered, pct):
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+class MetricsBuffer:
+    """Fixed-size ring buffer of request samples"""
+
+    def __init__(self, size):
+        self._samples = deque(maxlen=size)
+        self._unsaved = []
+        self._lock = threading.Lock()
+
+    def add(self, sample, persist=False):
+        with self._lock:
+            self._samples.append(sample)
+            if not persist:
+                return
+            self._unsaved.append(sample)
+            if len(self._unsaved) < settings.REQUEST_METRICS_FLUSH_EVERY:
+                return
+            batch, self._unsaved = self._unsaved, []
+        try:
+            RequestMetric.objects.bulk_create(RequestMetric(**sample._asdict()) for sample in batch)
+        except Exception:
+            # Losing a batch of metrics must never fail the request
+            logger.exception("Failed to store %d request metrics", len(batch))
+
+    def clear(self):
+        with self._lock:
+            self._samples.clear()
+            self._unsaved = []
+
+    def summary(self):
+        """{url_name: {"count", "status", <measure>: {"p50", "p95", "p99", "max"}}}"""
+        with self._lock:
+            samples = list(self._samples)
+
+        grouped = {}
+        for sample in samples:
+            grouped.setdefault(sample.url_name, []).append(sample)
+
+        result = {}
+        for url_name, rows in sorted(grouped.items()):
+            entry = {"count": len(rows), "status": {}}
+            for row in rows:
+                entry["status"][row.status] = entry["status"].get(row.status, 0) + 1
+            for measure in MEASURES:
+                ordered = sorted(getattr(row, measure) for row in rows)
+                entry[measure] = {f"p{pct}": percentile(ordered, pct) for pct in PERCENTILES}
+                entry[measure]["max"] = ordered[-1]
+            result[url_name] = entry
+        return result
+
+
+buffer = MetricsBuffer(getattr(settings, "REQUEST_METRICS_BUFFER_SIZE", 5000))
+
+
+class ProfilingMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not settings.REQUEST_METRICS_ENABLED:
+            return self.get_response(request)
+
+        timer = QueryTimer()
+        began = time.perf_counter()
+        with connection.execute_wrapper(timer):
+            response = self.get_response(request)
+        total_ms = (time.perf_counter() - began) * 1000
+
+        match = request.resolver_match
+        url_name = match.view_name if match else "unresolved"
+        sample = Sample(
+            url_name=url_name,
+            method=request.method,
+            status=response.status_code,
+            queries=timer.count,
+            db_ms=round(timer.seconds * 1000, 3),
+            python_ms=round(max(0.0, total_ms - timer.seconds * 1000), 3),
+            # Streaming bodies are produced after the middleware returns
+            response_bytes=0 if response.streaming else len(response.content),
+        )
+        buffer.add(sample, persist=settings.REQUEST_METRICS_PERSIST)
+
+        limit = budget_for(match.func) if match else None
+        if limit is not None and timer.count > limit:
+            logger.warning(
+                "%s ran %d queries (budget %d)", url_name, timer.count, limit
+            )
+        return response
+
+
+class QueryTimer:
+    """connection.execute_wrapper that counts and times queries"""
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        began = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.seconds += time.perf_counter() - began
@@ -0,0 +1,76 @@
+"""
+Request-scoped access to the logged-in account's congregation.
+
+CongregationMiddleware sets ``request.congregation``, a lazy object that
+resolves to the user's Congregation the first time a view touches it. It
+is falsy when there is no such congregation (anonymous users included),
+so views test it with ``if not request.congregation`` rather than
+``is None``. The Congregation is kept in the shared cache under the
+"congregations" namespace, which every Congregation save or delete bumps
+(PIN and theme changes included), so most authenticated requests run no
+query for it.
+"""
+from django.db.models import Q
+from django.utils.functional import SimpleLazyObject
+
+from .caching import cached
+from .models import Congregation
+
+# cached() treats None as a miss, so "no congregation" is stored as this
+NO_CONGREGATION = 0
+
+
+def congregation_for_user(user):
+    """The Congregation whose account is ``user``, or None"""
+    if not user.is_authenticated:
+        return None
+
+    def load():
+        return Congregation.objects.filter(user_id=user.pk).first() or NO_CONGREGATION
+
+    congregation = cached("user_congregation", ("congregations",), load, key=str(user.pk))
+    return congregation or None
+
+
+class CongregationMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request.congregation = SimpleLazyObject(lambda: congregation_for_user(request.user))
+        return self.get_response(request)
+
+
+def find_congregation(request, congregation_id=None, congregation_name=None):
+    """
+    Congregation the PIN endpoints act on: the id or name sent by the
+    frontend, then the logged-in account, then the session, then any.
+    """
+    lookups = []
+    if congregation_id == "district":
+        lookups.append(("name", "District Admin"))
+    elif str(congregation_id or "").isdigit():
+        lookups.append(("id", int(congregation_id)))
+    if congregation_name:
+        lookups.append(("name", congregation_name))
+
+    if lookups:
+        query = Q()
+        for field, value in lookups:
+            query |= Q(**{field: value})
+        found = list(Congregation.objects.filter(query))
+        for field, value in lookups:
+            for congregation in found:
+                if getattr(congregation, field) == value:
+                    return congregation
+
+    if request.congregation:
+        return request.congregation
+
+    session_id = request.session.get("congregation_id")
+    if session_id:
+        congregation = Congregation.objects.filter(id=session_id).first()
+        if congregation:
+            return congregation
+
+    return Congregation.objects.first()
@@ -0,0 +1,39 @@
+from django.db import migrations
+
+TRIGRAM_INDEXES = {
+    "core_guilder_first_name_trgm": "first_name",
+    "core_guilder_last_name_trgm": "last_name",
+    "core_guilder_phone_number_trgm": "phone_number",
+}
+
+
+def create_trigram_indexes(apps, schema_editor):
+    # pg_trgm only exists on Postgres; other backends use the in-process
+    # index in core.search instead.
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    for name, column in TRIGRAM_INDEXES.items():
+        # UPPER() matches the expression Django emits for icontains/istartswith
+        schema_editor.execute(
+            f"CREATE INDEX IF NOT EXISTS {name} ON core_guilder "
+            f"USING gin (UPPER({column}) gin_trgm_ops)"
+        )
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for name in TRIGRAM_INDEXES:
+        schema_editor.execute(f"DROP INDEX IF EXISTS {name}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_update_pin_to_4_digits'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.4 on 2026-10-18 09:37
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_guilder_trigram_search_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AttendanceRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.CharField(choices=[('week', 'Week'), ('month', 'Month'), ('year', 'Year')], max_length=5)),
+                ('period_start', models.DateField(help_text='Monday of the week, or first day of the month/year')),
+                ('male_count', models.PositiveIntegerField(default=0)),
+                ('female_count', models.PositiveIntegerField(default=0)),
+                ('total_count', models.PositiveIntegerField(default=0)),
+                ('record_count', models.PositiveIntegerField(default=0, help_text='Number of Sunday attendance records in this period')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('congregation', models.ForeignKey(blank=True, help_text='Empty for district-wide totals', null=True, on_delete=django.db.models.deletion.CASCADE, to='core.congregation')),
+            ],
+            options={
+                'ordering': ['period', 'period_start'],
+                'indexes': [models.Index(fields=['period', 'congregation', 'period_start'], name='core_attend_period_33ce9b_idx')],
+                'constraints': [models.UniqueConstraint(fields=('period', 'period_start', 'congregation'), name='unique_congregation_attendance_rollup'), models.UniqueConstraint(condition=models.Q(('congregation__isnull', True)), fields=('period', 'period_start'), name='unique_district_attendance_rollup')],
+            },
+        ),
+    ]
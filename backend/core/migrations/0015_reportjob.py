@@ -0,0 +1,38 @@
+# Generated by Django 5.2.4 on 2026-10-18 09:42
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0014_attendancerollup'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReportJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('report_type', models.CharField(choices=[('members', 'Members'), ('attendance', 'Attendance'), ('analytics', 'Analytics'), ('all', 'All Data')], max_length=20)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('done', 'Done'), ('failed', 'Failed')], default='pending', max_length=10)),
+                ('data_version', models.CharField(blank=True, help_text='Fingerprint of the data the report was built from', max_length=64)),
+                ('file_path', models.CharField(blank=True, max_length=255)),
+                ('row_count', models.PositiveIntegerField(default=0)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('congregation', models.ForeignKey(blank=True, help_text='Empty for district-wide reports', null=True, on_delete=django.db.models.deletion.CASCADE, to='core.congregation')),
+                ('requested_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['status', 'created_at'], name='core_report_status_f898a4_idx'), models.Index(fields=['report_type', 'congregation', 'data_version'], name='core_report_report__f5b6ec_idx')],
+            },
+        ),
+    ]
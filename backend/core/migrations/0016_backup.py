@@ -0,0 +1,34 @@
+# Generated by Django 5.2.4 on 2026-10-18 09:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0015_reportjob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Backup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('backup_type', models.CharField(choices=[('manual', 'Manual'), ('scheduled', 'Scheduled')], default='manual', max_length=20)),
+                ('status', models.CharField(choices=[('running', 'Running'), ('complete', 'Complete'), ('failed', 'Failed')], default='running', max_length=10)),
+                ('file_path', models.CharField(blank=True, max_length=255)),
+                ('size_bytes', models.BigIntegerField(default=0)),
+                ('checksum', models.CharField(blank=True, help_text='SHA-256 of the archive file', max_length=64)),
+                ('counts', models.JSONField(blank=True, default=dict, help_text='Rows per model')),
+                ('checksums', models.JSONField(blank=True, default=dict, help_text="SHA-256 of each model's rows")),
+                ('created_by', models.CharField(blank=True, max_length=100)),
+                ('error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('completed_at', models.DateTimeField(blank=True, null=True)),
+                ('restored_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
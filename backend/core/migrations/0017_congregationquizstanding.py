@@ -0,0 +1,43 @@
+# Generated by Django 5.2.4 on 2026-10-18 09:47
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0016_backup'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CongregationQuizStanding',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('congregation', models.CharField(max_length=100, unique=True)),
+                ('total_quizzes', models.PositiveIntegerField(default=0)),
+                ('total_participants', models.PositiveIntegerField(default=0)),
+                ('total_correct_answers', models.PositiveIntegerField(default=0)),
+                ('quiz_participation', models.JSONField(blank=True, default=list, help_text='Per-quiz participants and correct answers')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'ordering': ['-total_participants', 'congregation'],
+            },
+        ),
+        migrations.AddField(
+            model_name='quiz',
+            name='standings_applied',
+            field=models.BooleanField(default=False, help_text='Submissions are counted in CongregationQuizStanding'),
+        ),
+        migrations.AddIndex(
+            model_name='quiz',
+            index=models.Index(fields=['standings_applied', 'end_time'], name='core_quiz_standin_35119a_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='congregationquizstanding',
+            index=models.Index(fields=['-total_participants', 'congregation'], name='core_congre_total_p_dccf9c_idx'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.4 on 2026-10-18 09:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0017_congregationquizstanding'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HomeStatsSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('payload', models.TextField(help_text='Response body as JSON')),
+                ('etag', models.CharField(max_length=64)),
+                ('stale', models.BooleanField(default=False, help_text='Members or attendance changed since it was generated')),
+                ('generated_at', models.DateTimeField()),
+            ],
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.4 on 2026-10-18 09:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0018_homestatssnapshot'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RequestMetric',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('url_name', models.CharField(max_length=200)),
+                ('method', models.CharField(max_length=10)),
+                ('status', models.PositiveSmallIntegerField()),
+                ('queries', models.PositiveIntegerField()),
+                ('db_ms', models.FloatField()),
+                ('python_ms', models.FloatField()),
+                ('response_bytes', models.PositiveIntegerField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['url_name', 'created_at'], name='core_reques_url_nam_fec82d_idx')],
+            },
+        ),
+    ]
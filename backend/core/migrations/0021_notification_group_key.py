@@ -0,0 +1,24 @@
+# Generated by Django 5.2.4 on 2026-10-18 10:08
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0020_notification_inbox'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notification',
+            name='group_key',
+            field=models.CharField(blank=True, default='', help_text='Unread notifications with the same key are merged (e.g. guilder:12)', max_length=50),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['group_key', 'created_at'], name='core_notifi_group_k_0f22fa_idx'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.4 on 2026-10-18 11:02
+
+from django.db import migrations, models
+from django.db.models.functions import ExtractDay, ExtractMonth
+
+
+def fill_birth_month_day(apps, schema_editor):
+    Guilder = apps.get_model("core", "Guilder")
+    Guilder.objects.update(
+        birth_month_day=ExtractMonth("date_of_birth") * 100 + ExtractDay("date_of_birth")
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0021_notification_group_key'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='guilder',
+            name='birth_month_day',
+            field=models.PositiveSmallIntegerField(db_index=True, default=0, editable=False),
+            preserve_default=False,
+        ),
+        migrations.RunPython(fill_birth_month_day, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.4 on 2026-10-18 10:17
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0022_guilder_birth_month_day'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OutboundMessage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('birthday_message', 'Birthday Message'), ('welcome_message', 'Welcome Message'), ('attendance_reminder', 'Attendance Reminder'), ('manual', 'Manual')], max_length=30)),
+                ('provider', models.CharField(help_text='Key of MESSAGING_PROVIDERS that sends it', max_length=30)),
+                ('recipient', models.CharField(max_length=20)),
+                ('body', models.TextField()),
+                ('idempotency_key', models.CharField(help_text='Queuing the same key again is a no-op', max_length=100, unique=True)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('sending', 'Sending'), ('sent', 'Sent'), ('failed', 'Failed')], default='pending', max_length=10)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('next_attempt_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('claimed_at', models.DateTimeField(blank=True, null=True)),
+                ('sent_at', models.DateTimeField(blank=True, null=True)),
+                ('provider_message_id', models.CharField(blank=True, max_length=100)),
+                ('error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['status', 'next_attempt_at'], name='core_outbou_status_ee14de_idx')],
+            },
+        ),
+    ]
@@ -129,11 +129,18 @@ class LoginAttempt(models.Model):
         return hours, minutes
 
 
+def month_day(day):
+    """``day`` as month * 100 + day of month (e.g. 1231), the order of birthdays in a year"""
+    return day.month * 100 + day.day
+
+
 class Guilder(models.Model):
     # Section A – Personal Information
     first_name = models.CharField(max_length=100)
     last_name = models.CharField(max_length=100)
     date_of_birth = models.DateField()
+    # month_day(date_of_birth), so birthday lookups can use an index
+    birth_month_day = models.PositiveSmallIntegerField(editable=False, db_index=True)
     gender = models.CharField(
         max_length=10, choices=[("Male", "Male"), ("Female", "Female")]
     )
@@ -202,6 +209,14 @@ class Guilder(models.Model):
     def __str__(self):
         return f"{self.first_name} {self.last_name} ({self.phone_number}) - {self.congregation.name}"
 
+    def save(self, *args, **kwargs):
+        # bulk_create callers set this themselves
+        self.birth_month_day = month_day(self.date_of_birth)
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and "date_of_birth" in update_fields:
+            kwargs["update_fields"] = {*update_fields, "birth_month_day"}
+        super().save(*args, **kwargs)
+
     def get_primary_executive_position(self):
         """Get the primary executive position based on level"""
         if self.executive_level == "local":
@@ -259,6 +274,135 @@ class SundayAttendance(models.Model):
         return f"{self.congregation.name} - {self.date} | Total: {self.total_count}"
 
 
+class AttendanceRollup(models.Model):
+    """Pre-aggregated attendance totals per week, month and year"""
+    PERIOD_CHOICES = [
+        ("week", "Week"),
+        ("month", "Month"),
+        ("year", "Year"),
+    ]
+
+    period = models.CharField(max_length=5, choices=PERIOD_CHOICES)
+    period_start = models.DateField(help_text="Monday of the week, or first day of the month/year")
+    congregation = models.ForeignKey(
+        Congregation,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        help_text="Empty for district-wide totals",
+    )
+    male_count = models.PositiveIntegerField(default=0)
+    female_count = models.PositiveIntegerField(default=0)
+    total_count = models.PositiveIntegerField(default=0)
+    record_count = models.PositiveIntegerField(
+        default=0, help_text="Number of Sunday attendance records in this period"
+    )
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ["period", "period_start"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["period", "period_start", "congregation"],
+                name="unique_congregation_attendance_rollup",
+            ),
+            models.UniqueConstraint(
+                fields=["period", "period_start"],
+                condition=models.Q(congregation__isnull=True),
+                name="unique_district_attendance_rollup",
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['period', 'congregation', 'period_start']),
+        ]
+
+    def __str__(self):
+        scope = self.congregation.name if self.congregation_id else "District"
+        return f"{scope} - {self.period} of {self.period_start} | Total: {self.total_count}"
+
+
+class ReportJob(models.Model):
+    """PDF report queued for the run_report_worker command"""
+    REPORT_TYPES = [
+        ("members", "Members"),
+        ("attendance", "Attendance"),
+        ("analytics", "Analytics"),
+        ("all", "All Data"),
+    ]
+    STATUS_CHOICES = [
+        ("pending", "Pending"),
+        ("running", "Running"),
+        ("done", "Done"),
+        ("failed", "Failed"),
+    ]
+
+    report_type = models.CharField(max_length=20, choices=REPORT_TYPES)
+    congregation = models.ForeignKey(
+        Congregation,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        help_text="Empty for district-wide reports",
+    )
+    requested_by = models.ForeignKey(
+        User, on_delete=models.SET_NULL, null=True, blank=True
+    )
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default="pending")
+    data_version = models.CharField(
+        max_length=64, blank=True, help_text="Fingerprint of the data the report was built from"
+    )
+    file_path = models.CharField(max_length=255, blank=True)
+    row_count = models.PositiveIntegerField(default=0)
+    attempts = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["-created_at"]
+        indexes = [
+            models.Index(fields=['status', 'created_at']),
+            models.Index(fields=['report_type', 'congregation', 'data_version']),
+        ]
+
+    def __str__(self):
+        scope = self.congregation.name if self.congregation_id else "District"
+        return f"{self.get_report_type_display()} report for {scope} ({self.status})"
+
+
+class Backup(models.Model):
+    """Manifest of a compressed snapshot archive written by core.backups"""
+    BACKUP_TYPES = [
+        ("manual", "Manual"),
+        ("scheduled", "Scheduled"),
+    ]
+    STATUS_CHOICES = [
+        ("running", "Running"),
+        ("complete", "Complete"),
+        ("failed", "Failed"),
+    ]
+
+    backup_type = models.CharField(max_length=20, choices=BACKUP_TYPES, default="manual")
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default="running")
+    file_path = models.CharField(max_length=255, blank=True)
+    size_bytes = models.BigIntegerField(default=0)
+    checksum = models.CharField(max_length=64, blank=True, help_text="SHA-256 of the archive file")
+    counts = models.JSONField(default=dict, blank=True, help_text="Rows per model")
+    checksums = models.JSONField(default=dict, blank=True, help_text="SHA-256 of each model's rows")
+    created_by = models.CharField(max_length=100, blank=True)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+    restored_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["-created_at"]
+
+    def __str__(self):
+        return f"{self.get_backup_type_display()} backup {self.created_at:%Y-%m-%d %H:%M} ({self.status})"
+
+
 class BirthdayMessageLog(models.Model):
     guilder = models.ForeignKey(Guilder, on_delete=models.CASCADE)
     sent_date = models.DateField()
@@ -295,7 +439,12 @@ class Notification(models.Model):
     ]
 
     user = models.ForeignKey(
-        User, on_delete=models.CASCADE, related_name="notifications_sent"
+        User,
+        on_delete=models.CASCADE,
+        related_name="notifications_sent",
+        null=True,
+        blank=True,
+        help_text="Empty for system notifications",
     )
     congregation = models.ForeignKey(Congregation, on_delete=models.CASCADE)
     notification_type = models.CharField(max_length=20, choices=NOTIFICATION_TYPES)
@@ -312,6 +461,12 @@ class Notification(models.Model):
         blank=True,
     )
     change_details = models.JSONField(default=dict, blank=True)
+    group_key = models.CharField(
+        max_length=50,
+        blank=True,
+        default="",
+        help_text="Unread notifications with the same key are merged (e.g. guilder:12)",
+    )
 
     class Meta:
         ordering = ["-created_at"]
@@ -319,10 +474,26 @@ class Notification(models.Model):
             models.Index(fields=['user', 'is_read']),
             models.Index(fields=['congregation', 'notification_type']),
             models.Index(fields=['created_at']),
+            # Inbox pages, newest first, per recipient or congregation
+            models.Index(fields=['recipient', 'is_read', 'created_at']),
+            models.Index(fields=['congregation', 'created_at']),
+            models.Index(fields=['group_key', 'created_at']),
         ]
 
     def __str__(self):
-        return f"{self.title} - {self.user.username}"
+        return f"{self.title} - {self.user.username if self.user_id else 'system'}"
+
+
+class NotificationCounter(models.Model):
+    """Unread notifications in a user's inbox, kept in step by core.notifications"""
+    user = models.OneToOneField(
+        User, on_delete=models.CASCADE, primary_key=True, related_name="notification_counter"
+    )
+    unread = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.user.username}: {self.unread} unread"
 
 
 class SystemSettings(models.Model):
@@ -378,6 +549,9 @@ class Quiz(models.Model):
     password = models.CharField(max_length=50, default="youth2024")
     is_active = models.BooleanField(default=True)
     created_by = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True)
+    standings_applied = models.BooleanField(
+        default=False, help_text="Submissions are counted in CongregationQuizStanding"
+    )
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -386,6 +560,7 @@ class Quiz(models.Model):
         indexes = [
             models.Index(fields=['is_active', 'start_time', 'end_time']),
             models.Index(fields=['created_at']),
+            models.Index(fields=['standings_applied', 'end_time']),
         ]
 
     def __str__(self):
@@ -438,8 +613,105 @@ class QuizSubmission(models.Model):
 
     def save(self, *args, **kwargs):
         # Automatically determine if answer is correct
-        self.is_correct = self.selected_answer == self.quiz.correct_answer
+        from .quiz_cache import answer_keys
+
+        key = answer_keys.get(self.quiz_id)
+        correct_answer = key.correct_answer if key else self.quiz.correct_answer
+        self.is_correct = self.selected_answer == correct_answer
         super().save(*args, **kwargs)
 
 
+class CongregationQuizStanding(models.Model):
+    """Cross-quiz totals per congregation for quizzes whose results are out"""
+    congregation = models.CharField(max_length=100, unique=True)
+    total_quizzes = models.PositiveIntegerField(default=0)
+    total_participants = models.PositiveIntegerField(default=0)
+    total_correct_answers = models.PositiveIntegerField(default=0)
+    quiz_participation = models.JSONField(
+        default=list, blank=True, help_text="Per-quiz participants and correct answers"
+    )
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-total_participants', 'congregation']
+        indexes = [
+            models.Index(fields=['-total_participants', 'congregation']),
+        ]
+
+    def __str__(self):
+        return f"{self.congregation} - {self.total_participants} participants in {self.total_quizzes} quizzes"
+
+
+class HomeStatsSnapshot(models.Model):
+    """The api_home_stats response, serialized once per data change"""
+    payload = models.TextField(help_text="Response body as JSON")
+    etag = models.CharField(max_length=64)
+    stale = models.BooleanField(
+        default=False, help_text="Members or attendance changed since it was generated"
+    )
+    generated_at = models.DateTimeField()
+
+    def __str__(self):
+        return f"Home stats generated {self.generated_at:%Y-%m-%d %H:%M}"
+
+
+class RequestMetric(models.Model):
+    """One profiled request, persisted when REQUEST_METRICS_PERSIST is on"""
+    url_name = models.CharField(max_length=200)
+    method = models.CharField(max_length=10)
+    status = models.PositiveSmallIntegerField()
+    queries = models.PositiveIntegerField()
+    db_ms = models.FloatField()
+    python_ms = models.FloatField()
+    response_bytes = models.PositiveIntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['url_name', 'created_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.method} {self.url_name} {self.status} - {self.queries} queries"
+
 
+class OutboundMessage(models.Model):
+    """SMS queued for the run_message_worker command (see core.messaging)"""
+    KIND_CHOICES = [
+        ("birthday_message", "Birthday Message"),
+        ("welcome_message", "Welcome Message"),
+        ("attendance_reminder", "Attendance Reminder"),
+        ("manual", "Manual"),
+    ]
+    STATUS_CHOICES = [
+        ("pending", "Pending"),
+        ("sending", "Sending"),
+        ("sent", "Sent"),
+        ("failed", "Failed"),
+    ]
+
+    kind = models.CharField(max_length=30, choices=KIND_CHOICES)
+    provider = models.CharField(max_length=30, help_text="Key of MESSAGING_PROVIDERS that sends it")
+    recipient = models.CharField(max_length=20)
+    body = models.TextField()
+    idempotency_key = models.CharField(
+        max_length=100, unique=True, help_text="Queuing the same key again is a no-op"
+    )
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default="pending")
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    claimed_at = models.DateTimeField(null=True, blank=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+    provider_message_id = models.CharField(max_length=100, blank=True)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["-created_at"]
+        indexes = [
+            models.Index(fields=["status", "next_attempt_at"]),
+        ]
+
+    def __str__(self):
+        return f"{self.get_kind_display()} to {self.recipient} ({self.status})"
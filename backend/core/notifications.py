@@ -0,0 +1,340 @@
+"""
+Notification inbox.
+
+A notification addressed to a recipient belongs to that user's inbox;
+one without a recipient belongs to the inbox of its congregation's
+account and of every district account. Each user's unread total is kept
+in a NotificationCounter row that writes adjust with F() expressions, so
+polling the inbox reads one row instead of counting notifications. The
+counter is created and locked, then set with a COUNT, the first time a
+user's inbox is read.
+
+create_notification and fan_out only queue notifications. Queued rows
+are dropped if their transaction rolls back; otherwise they are written
+together with one bulk_create when NotificationBatchMiddleware finishes
+the request (or straight away outside a request). An unread notification
+with a ``group_key`` absorbs later ones with the same key that arrive
+within NOTIFICATION_COALESCE_SECONDS, merging their change_details.
+"""
+import logging
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F, Q, Value
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from .models import Congregation, Notification, NotificationCounter
+from .pagination import paginate_keyset
+
+logger = logging.getLogger(__name__)
+
+INBOX_ORDERING = ("-created_at", "-id")
+INBOX_PAGE_SIZE = 20
+INBOX_MAX_PAGE_SIZE = 100
+
+BATCH_SIZE = 500
+
+_batch = ContextVar("notification_batch", default=None)
+
+INBOX_FIELDS = (
+    "id",
+    "notification_type",
+    "title",
+    "message",
+    "is_read",
+    "created_at",
+    "change_details",
+    "user__username",
+    "congregation__name",
+)
+
+
+def inbox_filter(user, congregation):
+    """Q selecting the notifications in ``user``'s inbox"""
+    shared = Q(recipient__isnull=True)
+    if not congregation.is_district:
+        shared &= Q(congregation_id=congregation.pk)
+    return Q(recipient_id=user.pk) | shared
+
+
+def audiences(keys):
+    """{(congregation_id, recipient_id): user ids whose inbox holds it}"""
+    congregation_ids = {congregation_id for congregation_id, recipient_id in keys if not recipient_id}
+    accounts, district = {}, set()
+    if congregation_ids:
+        rows = (
+            Congregation.objects.filter(Q(pk__in=congregation_ids) | Q(is_district=True))
+            .exclude(user=None)
+            .values_list("pk", "user_id", "is_district")
+        )
+        for congregation_id, user_id, is_district in rows:
+            accounts[congregation_id] = user_id
+            if is_district:
+                district.add(user_id)
+
+    result = {}
+    for congregation_id, recipient_id in keys:
+        if recipient_id:
+            result[(congregation_id, recipient_id)] = {recipient_id}
+        else:
+            users = set(district)
+            if congregation_id in accounts:
+                users.add(accounts[congregation_id])
+            result[(congregation_id, recipient_id)] = users
+    return result
+
+
+def adjust_unread(user_ids, delta):
+    """Add ``delta`` to the unread counters of ``user_ids`` that have one"""
+    if not user_ids or not delta:
+        return
+    unread = F("unread") + delta if delta > 0 else Greatest(F("unread") + delta, Value(0))
+    NotificationCounter.objects.filter(user_id__in=user_ids).update(unread=unread)
+
+
+def count_unread(keys, sign=1):
+    """
+    Add (sign 1) or remove (sign -1) unread notifications on the counters.
+    ``keys`` holds one (congregation_id, recipient_id) per notification.
+    """
+    per_key = Counter(keys)
+    deltas = Counter()
+    for key, users in audiences(per_key).items():
+        for user_id in users:
+            deltas[user_id] += per_key[key]
+    # One UPDATE per distinct change rather than per user
+    users_by_delta = defaultdict(list)
+    for user_id, delta in deltas.items():
+        users_by_delta[delta * sign].append(user_id)
+    for delta, user_ids in users_by_delta.items():
+        adjust_unread(user_ids, delta)
+
+
+def reset_counters():
+    """Drop every counter so each is recounted on its next read"""
+    NotificationCounter.objects.all().delete()
+
+
+def create_notification(
+    user,
+    congregation,
+    notification_type,
+    title,
+    message,
+    recipient=None,
+    change_details=None,
+    group_key="",
+):
+    """Queue one notification; see the module docstring for when it is written"""
+    _queue([
+        Notification(
+            user=user,
+            congregation=congregation,
+            notification_type=notification_type,
+            title=title,
+            message=message,
+            recipient=recipient,
+            change_details=change_details or {},
+            group_key=group_key,
+        )
+    ])
+
+
+def fan_out(user, targets, notification_type, title, message):
+    """Queue the same notification for each (congregation_id, recipient_id) target"""
+    _queue([
+        Notification(
+            user=user,
+            congregation_id=congregation_id,
+            recipient_id=recipient_id,
+            notification_type=notification_type,
+            title=title,
+            message=message,
+        )
+        for congregation_id, recipient_id in targets
+    ])
+
+
+def _queue(notifications):
+    if connection.in_atomic_block:
+        transaction.on_commit(lambda: _collect(notifications))
+    else:
+        _collect(notifications)
+
+
+def _collect(notifications):
+    batch = _batch.get()
+    if batch is None:
+        write_notifications(notifications)
+    else:
+        batch.extend(notifications)
+
+
+@contextmanager
+def batched():
+    """Write the notifications queued inside the block together at its end"""
+    batch = []
+    token = _batch.set(batch)
+    try:
+        yield batch
+    finally:
+        _batch.reset(token)
+        if batch:
+            try:
+                write_notifications(batch)
+            except Exception:
+                # The changes they describe are already committed
+                logger.exception("Failed to write %d notifications", len(batch))
+
+
+class NotificationBatchMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with batched():
+            return self.get_response(request)
+
+
+def _merge(into, newer):
+    """Fold ``newer`` into ``into``, keeping each field's first "from" value"""
+    details = dict(into.change_details or {})
+    for name, change in (newer.change_details or {}).items():
+        earlier = details.get(name)
+        if isinstance(earlier, dict) and isinstance(change, dict) and "from" in earlier:
+            change = {"from": earlier["from"], "to": change.get("to")}
+            if change["from"] == change["to"]:
+                # Edited back to where it started
+                details.pop(name)
+                continue
+        details[name] = change
+    into.change_details = details
+    into.title = newer.title
+    into.message = newer.message
+    into.user_id = newer.user_id
+
+
+def _coalesce(notifications, now):
+    """Split into (stored rows that absorbed new ones, rows to insert)"""
+    window = settings.NOTIFICATION_COALESCE_SECONDS
+    fresh, grouped = [], {}
+    for notification in notifications:
+        if not (window and notification.group_key):
+            fresh.append(notification)
+            continue
+        key = (notification.group_key, notification.congregation_id, notification.recipient_id)
+        if key in grouped:
+            _merge(grouped[key], notification)
+        else:
+            grouped[key] = notification
+            fresh.append(notification)
+    if not grouped:
+        return [], fresh
+
+    stored = Notification.objects.filter(
+        group_key__in={key[0] for key in grouped},
+        is_read=False,
+        created_at__gte=now - timedelta(seconds=window),
+    ).order_by("created_at")
+    latest = {(row.group_key, row.congregation_id, row.recipient_id): row for row in stored}
+    absorbed = []
+    for key, notification in grouped.items():
+        row = latest.get(key)
+        if row is None:
+            continue
+        _merge(row, notification)
+        row.created_at = now
+        absorbed.append(row)
+        fresh.remove(notification)
+    return absorbed, fresh
+
+
+@transaction.atomic
+def write_notifications(notifications):
+    """Insert ``notifications`` in bulk, coalescing grouped ones, and count them unread"""
+    absorbed, fresh = _coalesce(notifications, timezone.now())
+    if absorbed:
+        Notification.objects.bulk_update(
+            absorbed, ["title", "message", "user", "change_details", "created_at"]
+        )
+    if fresh:
+        Notification.objects.bulk_create(fresh, batch_size=BATCH_SIZE)
+        count_unread([(row.congregation_id, row.recipient_id) for row in fresh])
+    return len(fresh)
+
+
+def unread_count(user, congregation):
+    counter = NotificationCounter.objects.filter(user_id=user.pk).values_list("unread", flat=True).first()
+    if counter is not None:
+        return counter
+    # Create and lock the row before counting, so a notification written
+    # meanwhile waits to adjust the counter instead of finding no row
+    with transaction.atomic(savepoint=False):
+        counter, created = NotificationCounter.objects.select_for_update().get_or_create(user_id=user.pk)
+        if not created:
+            # A concurrent first read has counted already
+            return counter.unread
+        counter.unread = Notification.objects.filter(inbox_filter(user, congregation), is_read=False).count()
+        counter.save(update_fields=["unread", "updated_at"])
+    return counter.unread
+
+
+def inbox_page(user, congregation, cursor=None, limit=INBOX_PAGE_SIZE, unread_only=False):
+    """(notification dicts, next cursor) for one page of ``user``'s inbox"""
+    queryset = Notification.objects.filter(inbox_filter(user, congregation))
+    if unread_only:
+        queryset = queryset.filter(is_read=False)
+    rows, next_cursor = paginate_keyset(
+        queryset.values(*INBOX_FIELDS), INBOX_ORDERING, cursor=cursor, limit=limit
+    )
+    notifications = [
+        {
+            "id": row["id"],
+            "type": row["notification_type"],
+            "title": row["title"],
+            "message": row["message"],
+            "is_read": row["is_read"],
+            "created_at": row["created_at"].isoformat(),
+            "change_details": row["change_details"],
+            "sender": row["user__username"],
+            "congregation": row["congregation__name"],
+        }
+        for row in rows
+    ]
+    return notifications, next_cursor
+
+
+def _locked(queryset):
+    """Lock ``queryset``: [(pk, (congregation_id, recipient_id), is_read)]"""
+    rows = queryset.select_for_update(of=("self",)).values_list(
+        "pk", "congregation_id", "recipient_id", "is_read"
+    )
+    return [(pk, (congregation_id, recipient_id), is_read) for pk, congregation_id, recipient_id, is_read in rows]
+
+
+def _release(rows):
+    """Take the unread ``rows`` off their audience's counters"""
+    count_unread([key for _, key, is_read in rows if not is_read], sign=-1)
+
+
+@transaction.atomic
+def mark_read(queryset):
+    """Mark the unread notifications in ``queryset`` read; returns how many changed"""
+    rows = [row for row in _locked(queryset) if not row[2]]
+    Notification.objects.filter(pk__in=[pk for pk, _, _ in rows]).update(is_read=True)
+    _release(rows)
+    return len(rows)
+
+
+@transaction.atomic
+def delete_notifications(queryset):
+    """Delete ``queryset`` and take its unread notifications off the counters"""
+    rows = _locked(queryset)
+    Notification.objects.filter(pk__in=[pk for pk, _, _ in rows]).delete()
+    _release(rows)
+    return len(rows)
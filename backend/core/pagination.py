@@ -0,0 +1,98 @@
+import base64
+import binascii
+import datetime
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 500
+
+
+class InvalidCursor(ValueError):
+    """Raised when a client sends a cursor we did not issue"""
+
+
+class CursorEncoder(DjangoJSONEncoder):
+    """DjangoJSONEncoder without its millisecond rounding of datetimes"""
+
+    def default(self, o):
+        # Rounded timestamps would make the keyset filter repeat the last row
+        if isinstance(o, datetime.datetime):
+            return o.isoformat()
+        return super().default(o)
+
+
+def encode_cursor(values):
+    """Encode the ordering key values of the last row as an opaque token"""
+    raw = json.dumps(list(values), cls=CursorEncoder, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(token, size):
+    """Decode a token produced by encode_cursor"""
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise InvalidCursor("Invalid cursor")
+    if not isinstance(values, list) or len(values) != size:
+        raise InvalidCursor("Invalid cursor")
+    return values
+
+
+def parse_page_size(value, default=DEFAULT_PAGE_SIZE, maximum=MAX_PAGE_SIZE):
+    """Clamp a ``limit`` query parameter to a sane page size"""
+    if value in (None, ""):
+        return default
+    try:
+        size = int(value)
+    except (TypeError, ValueError):
+        raise InvalidCursor("limit must be an integer")
+    return max(1, min(size, maximum))
+
+
+def _keyset_filter(ordering, values):
+    """
+    Build the "row comes after the cursor" condition for a multi-column
+    ordering, e.g. (a > x) OR (a = x AND b > y) OR (a = x AND b = y AND id > z).
+    """
+    condition = Q()
+    equal = Q()
+    for field, value in zip(ordering, values):
+        name = field.lstrip("-")
+        lookup = "lt" if field.startswith("-") else "gt"
+        condition |= equal & Q(**{f"{name}__{lookup}": value})
+        equal &= Q(**{name: value})
+    return condition
+
+
+def _row_value(row, field):
+    name = field.lstrip("-")
+    if isinstance(row, dict):
+        return row[name]
+    return getattr(row, name)
+
+
+def paginate_keyset(queryset, ordering, cursor=None, limit=DEFAULT_PAGE_SIZE):
+    """
+    Return one page of ``queryset`` ordered by ``ordering`` plus the cursor
+    for the next page (``None`` on the last page).
+
+    ``ordering`` must end in a unique column (normally ``id``) so that rows
+    sharing the leading keys are never skipped or repeated. Works for both
+    model and ``.values()`` querysets; the ordering fields must be present
+    in the projected values.
+    """
+    queryset = queryset.order_by(*ordering)
+    if cursor:
+        values = decode_cursor(cursor, len(ordering))
+        queryset = queryset.filter(_keyset_filter(ordering, values))
+
+    rows = list(queryset[: limit + 1])
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(_row_value(rows[-1], f) for f in ordering)
+    return rows, next_cursor
@@ -0,0 +1,164 @@
+"""
+Hot-path helpers for quiz submissions.
+
+Every submission needs the quiz's correct answer. Keeping the answer keys
+in process memory (with a short TTL and invalidation on Quiz writes) turns
+a submission into a single INSERT.
+"""
+import atexit
+import logging
+import threading
+import time
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.db import connection, transaction
+
+from .models import Quiz, QuizSubmission
+from .quiz_feed import reset_counts
+
+logger = logging.getLogger(__name__)
+
+# Other worker processes only see quiz edits once their entry expires
+ANSWER_KEY_TTL = 60
+
+SUBMISSION_BATCH_SIZE = 200
+SUBMISSION_FLUSH_INTERVAL = 1.0
+
+
+@dataclass(frozen=True)
+class AnswerKey:
+    id: int
+    title: str
+    correct_answer: str
+    start_time: object
+    end_time: object
+    expires: float
+
+
+class AnswerKeyCache:
+    """In-process TTL cache of active quizzes' answer keys"""
+
+    def __init__(self, ttl=ANSWER_KEY_TTL):
+        self.ttl = ttl
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, quiz_id):
+        """AnswerKey for an active quiz, or None if there is no such quiz"""
+        entry = self._entries.get(quiz_id)
+        if entry is not None and entry.expires > time.monotonic():
+            return entry
+
+        row = (
+            Quiz.objects.filter(id=quiz_id, is_active=True)
+            .values_list("id", "title", "correct_answer", "start_time", "end_time")
+            .first()
+        )
+        if row is None:
+            self.invalidate(quiz_id)
+            return None
+        entry = AnswerKey(*row, expires=time.monotonic() + self.ttl)
+        with self._lock:
+            self._entries[quiz_id] = entry
+        return entry
+
+    def invalidate(self, quiz_id=None):
+        with self._lock:
+            if quiz_id is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(quiz_id, None)
+
+
+answer_keys = AnswerKeyCache()
+
+
+class SubmissionBuffer:
+    """
+    Collects submissions and writes them with bulk_create, either when
+    SUBMISSION_BATCH_SIZE are pending or every SUBMISSION_FLUSH_INTERVAL
+    seconds.
+
+    Only used when settings.QUIZ_SUBMISSION_BUFFER is on. A submission is
+    refused if its phone number is pending here or already in the table.
+    Two workers can still buffer the same phone number; the unique
+    constraint drops the second at flush time, after it was acknowledged.
+    Rows still pending when a worker is killed are lost, so this is meant
+    for short live-quiz bursts only.
+    """
+
+    def __init__(self, batch_size=SUBMISSION_BATCH_SIZE, interval=SUBMISSION_FLUSH_INTERVAL):
+        self.batch_size = batch_size
+        self.interval = interval
+        self._pending = []
+        self._seen = set()
+        self._lock = threading.Lock()
+        self._timer = None
+
+    def add(self, submission):
+        """Queue a submission; False if the phone number already submitted"""
+        key = (submission.quiz_id, submission.phone_number)
+        if QuizSubmission.objects.filter(quiz_id=key[0], phone_number=key[1]).exists():
+            return False
+        with self._lock:
+            if key in self._seen:
+                return False
+            self._seen.add(key)
+            self._pending.append(submission)
+            full = len(self._pending) >= self.batch_size
+            if not full and self._timer is None:
+                self._timer = threading.Timer(self.interval, self._flush_from_timer)
+                self._timer.daemon = True
+                self._timer.start()
+        if full:
+            self.flush()
+        return True
+
+    def flush(self):
+        with self._lock:
+            batch, self._pending, self._seen = self._pending, [], set()
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+        if not batch:
+            return 0
+        # Imported here because quiz_standings uses the answer keys above
+        from .quiz_standings import record_submission
+
+        # bulk_create drops duplicates without saying which, so note the
+        # rows already there to know which ones it inserted
+        with transaction.atomic():
+            existing = set(
+                QuizSubmission.objects.filter(
+                    quiz_id__in={submission.quiz_id for submission in batch},
+                    phone_number__in={submission.phone_number for submission in batch},
+                ).values_list("quiz_id", "phone_number")
+            )
+            QuizSubmission.objects.bulk_create(batch, ignore_conflicts=True)
+        inserted = [
+            submission for submission in batch
+            if (submission.quiz_id, submission.phone_number) not in existing
+        ]
+        # bulk_create skips the post_save signal that counts late submissions
+        for submission in inserted:
+            record_submission(submission)
+        reset_counts({submission.quiz_id for submission in batch})
+        return len(inserted)
+
+    def _flush_from_timer(self):
+        try:
+            self.flush()
+        except Exception:
+            logger.exception("Failed to flush buffered quiz submissions")
+        finally:
+            # Each timer thread opens its own database connection
+            connection.close()
+
+
+submission_buffer = SubmissionBuffer()
+atexit.register(submission_buffer.flush)
+
+
+def buffering_enabled():
+    return getattr(settings, "QUIZ_SUBMISSION_BUFFER", False)
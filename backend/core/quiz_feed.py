@@ -0,0 +1,179 @@
+"""
+Cached payloads for the quiz endpoints every open browser tab polls.
+
+The quiz fields and the time-derived flags (has_started, has_ended, ...)
+only change when a quiz is edited or a start/end boundary passes, so the
+serialized quizzes are cached until the next boundary and dropped by the
+Quiz signals. Submission counts live in separate cache counters that are
+incremented as submissions arrive and re-seeded with one grouped query
+when they are missing. Each response carries an ETag built from both, so
+an unchanged poll is answered with a 304 from the cache alone.
+"""
+import copy
+import hashlib
+import json
+
+from django.core.cache import cache
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from .models import Quiz, QuizSubmission
+
+FEED_KEY = "quiz-feed:{}"
+COUNTER_KEY = "quiz-feed:counts:{}:{}"
+FEEDS = ("list", "active")
+
+# Upper bound on how long an entry may live when no boundary is near
+MAX_FEED_TTL = 60 * 60
+# Counters are re-seeded this often, which bounds drift when the cache
+# backend is per-process (each worker only sees its own increments)
+COUNTER_TTL = 30
+
+
+def _quiz_fields(quiz):
+    return {
+        "id": quiz.id,
+        "title": quiz.title,
+        "description": quiz.description,
+        "question": quiz.question,
+        "option_a": quiz.option_a,
+        "option_b": quiz.option_b,
+        "option_c": quiz.option_c,
+        "option_d": quiz.option_d,
+        "start_time": quiz.start_time.isoformat(),
+        "end_time": quiz.end_time.isoformat(),
+        "password": quiz.password,
+    }
+
+
+def _timeout(quizzes, now):
+    """Seconds until the next start/end boundary of ``quizzes`` passes"""
+    upcoming = [
+        moment
+        for quiz in quizzes
+        for moment in (quiz.start_time, quiz.end_time)
+        if moment >= now
+    ]
+    if not upcoming:
+        return MAX_FEED_TTL
+    # has_ended flips just after end_time, so expire one second past it
+    seconds = (min(upcoming) - now).total_seconds() + 1
+    return max(1, min(MAX_FEED_TTL, int(seconds)))
+
+
+def _build(name, now):
+    quizzes = list(Quiz.objects.filter(is_active=True).order_by("-created_at"))
+    timeout = _timeout(quizzes, now)
+    if name == "list":
+        quizzes_data = []
+        for quiz in quizzes:
+            data = _quiz_fields(quiz)
+            data.update(
+                is_currently_active=quiz.start_time <= now <= quiz.end_time,
+                has_ended=now > quiz.end_time,
+                has_started=now >= quiz.start_time,
+                created_at=quiz.created_at.isoformat(),
+            )
+            quizzes_data.append(data)
+        payload = {"quizzes": quizzes_data}
+    else:
+        # Same pick as the old Quiz.objects.filter(...).first()
+        active = next(
+            (quiz for quiz in quizzes if quiz.start_time <= now <= quiz.end_time), None
+        )
+        payload = {"quiz": _quiz_fields(active) if active else None}
+
+    body = json.dumps(payload, sort_keys=True)
+    entry = {
+        "payload": payload,
+        "quiz_ids": [quiz["id"] for quiz in _quizzes_in(payload)],
+        "tag": hashlib.sha1(body.encode()).hexdigest()[:16],
+    }
+    cache.set(FEED_KEY.format(name), entry, timeout)
+    return entry
+
+
+def _quizzes_in(payload):
+    if "quizzes" in payload:
+        return payload["quizzes"]
+    return [payload["quiz"]] if payload["quiz"] else []
+
+
+def feed_entry(name):
+    """Cached {"payload", "quiz_ids", "tag"} for the ``list`` or ``active`` feed"""
+    entry = cache.get(FEED_KEY.format(name))
+    if entry is None:
+        entry = _build(name, timezone.now())
+    return entry
+
+
+def submission_counts(quiz_ids):
+    """{quiz_id: (submissions, correct)} from the cache counters"""
+    keys = {
+        quiz_id: (COUNTER_KEY.format(quiz_id, "all"), COUNTER_KEY.format(quiz_id, "correct"))
+        for quiz_id in quiz_ids
+    }
+    cached = cache.get_many([key for pair in keys.values() for key in pair])
+    missing = [
+        quiz_id for quiz_id, pair in keys.items() if not all(key in cached for key in pair)
+    ]
+    if missing:
+        seeded = {quiz_id: (0, 0) for quiz_id in missing}
+        rows = (
+            QuizSubmission.objects.filter(quiz_id__in=missing)
+            .order_by()
+            .values("quiz_id")
+            .annotate(total=Count("id"), correct=Count("id", filter=Q(is_correct=True)))
+        )
+        for row in rows:
+            seeded[row["quiz_id"]] = (row["total"], row["correct"])
+        values = {}
+        for quiz_id, (total, correct) in seeded.items():
+            values[keys[quiz_id][0]] = total
+            values[keys[quiz_id][1]] = correct
+        cache.set_many(values, COUNTER_TTL)
+        cached.update(values)
+    return {quiz_id: (cached[pair[0]], cached[pair[1]]) for quiz_id, pair in keys.items()}
+
+
+def count_submission(quiz_id, is_correct):
+    """Bump the cached counters; missing counters are left to be re-seeded"""
+    names = ("all", "correct") if is_correct else ("all",)
+    for name in names:
+        try:
+            cache.incr(COUNTER_KEY.format(quiz_id, name))
+        except ValueError:
+            pass
+
+
+def reset_counts(quiz_ids):
+    """Drop counters so the next read counts from the database"""
+    cache.delete_many(
+        [COUNTER_KEY.format(quiz_id, name) for quiz_id in quiz_ids for name in ("all", "correct")]
+    )
+
+
+def invalidate_feeds():
+    cache.delete_many([FEED_KEY.format(name) for name in FEEDS])
+
+
+def feed_response_data(name):
+    """(response data, ETag) for a feed with the current submission counts"""
+    entry = feed_entry(name)
+    counts = submission_counts(entry["quiz_ids"])
+    data = copy.deepcopy(entry["payload"])
+    for quiz in _quizzes_in(data):
+        quiz["submissions_count"], quiz["correct_submissions_count"] = counts[quiz["id"]]
+    return data, feed_etag(entry, counts)
+
+
+def feed_etag(entry, counts):
+    versions = ",".join(
+        f"{quiz_id}:{total}:{correct}" for quiz_id, (total, correct) in sorted(counts.items())
+    )
+    return '"{}-{}"'.format(entry["tag"], hashlib.sha1(versions.encode()).hexdigest()[:12])
+
+
+def current_etag(name):
+    entry = feed_entry(name)
+    return feed_etag(entry, submission_counts(entry["quiz_ids"]))
@@ -0,0 +1,143 @@
+"""
+Quiz results computed with a fixed number of queries.
+
+Per-quiz and per-congregation counts come from one grouped aggregate over
+all requested quizzes, and the fastest-correct leaderboards from one
+ROW_NUMBER() window query, however many quizzes and submitters there are.
+"""
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db.models import Count, F, Q, Window
+from django.db.models.functions import RowNumber
+from django.urls import reverse
+from django.utils import timezone
+
+from .models import QuizSubmission
+
+# Results are only published this long after a quiz ends
+RESULTS_DELAY = timedelta(hours=2)
+
+LEADERBOARD_SIZE = 5
+CONGREGATION_LEADERBOARD_SIZE = 3
+
+PARTICIPANT_FIELDS = ("id", "name", "phone_number", "congregation", "is_correct", "submitted_at")
+PARTICIPANT_ORDERING = ("submitted_at", "id")
+
+
+def results_cutoff(now=None):
+    """Quizzes that ended before this moment have their results available"""
+    return (now or timezone.now()) - RESULTS_DELAY
+
+
+def congregation_stats(quiz_ids):
+    """Participants and correct answers per (quiz, congregation)"""
+    return (
+        QuizSubmission.objects.filter(quiz_id__in=quiz_ids)
+        .order_by()
+        .values("quiz_id", "congregation")
+        .annotate(
+            participants=Count("id"),
+            correct=Count("id", filter=Q(is_correct=True)),
+        )
+        .order_by("quiz_id", "congregation")
+    )
+
+
+def leaderboards(quiz_ids, size=LEADERBOARD_SIZE):
+    """First ``size`` correct submissions of each quiz, ranked by submission time"""
+    return (
+        QuizSubmission.objects.filter(quiz_id__in=quiz_ids, is_correct=True)
+        .annotate(
+            rank=Window(
+                RowNumber(),
+                partition_by=[F("quiz_id")],
+                order_by=[F("submitted_at").asc(), F("id").asc()],
+            )
+        )
+        .filter(rank__lte=size)
+        .values("id", "quiz_id", "name", "congregation", "rank")
+        .order_by("quiz_id", "rank")
+    )
+
+
+def quiz_results(quizzes):
+    """Result summaries for ``quizzes`` in the api_quiz_results shape"""
+    quizzes = list(quizzes)
+    quiz_ids = [quiz.id for quiz in quizzes]
+
+    by_quiz = defaultdict(list)
+    for row in congregation_stats(quiz_ids):
+        by_quiz[row["quiz_id"]].append(row)
+
+    leaders = defaultdict(list)
+    for row in leaderboards(quiz_ids):
+        leaders[row["quiz_id"]].append(
+            {
+                "id": row["id"],
+                "name": row["name"],
+                "congregation": row["congregation"],
+                "score": 100,  # All correct answers get 100%
+                "time_taken": 0,  # We don't track time yet
+                "rank": row["rank"],
+            }
+        )
+
+    results = []
+    for quiz in quizzes:
+        congregations = []
+        for row in by_quiz[quiz.id]:
+            success_rate = round(row["correct"] / row["participants"] * 100, 1)
+            congregations.append(
+                {
+                    "name": row["congregation"],
+                    "participants": row["participants"],
+                    "correct_answers": row["correct"],
+                    "average_score": success_rate,
+                    "best_score": 100 if row["correct"] else 0,
+                }
+            )
+
+        ranked = sorted(congregations, key=lambda row: row["participants"], reverse=True)
+        congregation_leaderboard = [
+            {
+                "congregation": row["name"],
+                "participants": row["participants"],
+                "correct_answers": row["correct_answers"],
+                "success_rate": row["average_score"],
+                "rank": rank,
+            }
+            for rank, row in enumerate(ranked[:CONGREGATION_LEADERBOARD_SIZE], 1)
+        ]
+
+        total = sum(row["participants"] for row in congregations)
+        correct = sum(row["correct_answers"] for row in congregations)
+        results.append(
+            {
+                "id": quiz.id,
+                "quiz_title": quiz.title,
+                "end_date": quiz.end_time.isoformat(),
+                "total_participants": total,
+                "correct_answers": correct,
+                "incorrect_answers": total - correct,
+                "congregations_count": len(congregations),
+                "leaderboard": leaders[quiz.id],
+                "congregations": [
+                    {
+                        "name": row["name"],
+                        "participants": row["participants"],
+                        "average_score": row["average_score"],
+                        "best_score": row["best_score"],
+                    }
+                    for row in congregations
+                ],
+                "congregation_leaderboard": congregation_leaderboard,
+                "participants_url": reverse("core:api_quiz_participants", args=[quiz.id]),
+            }
+        )
+    return results
+
+
+def participants(quiz):
+    """Submissions of one quiz as flat rows, for keyset pagination"""
+    return QuizSubmission.objects.filter(quiz=quiz).values(*PARTICIPANT_FIELDS)
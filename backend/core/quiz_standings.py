@@ -0,0 +1,186 @@
+"""
+Incrementally maintained cross-quiz congregation leaderboard.
+
+A quiz is folded into CongregationQuizStanding once its results become
+available (RESULTS_DELAY after it ends) and taken out again when it is
+deactivated or deleted, so the table always matches "active quizzes with
+published results". Submissions that arrive for, or are deleted from, an
+already folded quiz are added or taken out one at a time.
+"""
+from collections import defaultdict
+
+from django.db import transaction
+
+from .models import CongregationQuizStanding, Quiz
+from .quiz_cache import answer_keys
+from .quiz_feed import invalidate_feeds
+from .quiz_results import congregation_stats, results_cutoff
+
+STANDINGS_SIZE = 10
+
+
+def _locked_standing(congregation):
+    standing = (
+        CongregationQuizStanding.objects.select_for_update()
+        .filter(congregation=congregation)
+        .first()
+    )
+    return standing or CongregationQuizStanding(congregation=congregation)
+
+
+def _add(standing, quiz, participants, correct):
+    for entry in standing.quiz_participation:
+        if entry["quiz_id"] == quiz.id:
+            entry["participants"] += participants
+            entry["correct_answers"] += correct
+            break
+    else:
+        standing.quiz_participation.insert(
+            0,
+            {
+                "quiz_id": quiz.id,
+                "quiz_title": quiz.title,
+                "participants": participants,
+                "correct_answers": correct,
+            },
+        )
+        standing.total_quizzes += 1
+    standing.total_participants += participants
+    standing.total_correct_answers += correct
+    standing.save()
+
+
+def _subtract(standing, quiz_id, participants, correct):
+    for entry in standing.quiz_participation:
+        if entry["quiz_id"] == quiz_id:
+            break
+    else:
+        return
+    entry["participants"] -= participants
+    entry["correct_answers"] -= correct
+    if entry["participants"] <= 0:
+        standing.quiz_participation.remove(entry)
+        standing.total_quizzes -= 1
+    standing.total_participants -= participants
+    standing.total_correct_answers -= correct
+    if standing.total_quizzes:
+        standing.save()
+    else:
+        standing.delete()
+
+
+@transaction.atomic
+def fold_quiz(quiz):
+    """Add a quiz's submissions to the standings; False if already counted"""
+    # Claiming the flag first keeps concurrent callers from counting twice
+    if not Quiz.objects.filter(id=quiz.id, standings_applied=False).update(
+        standings_applied=True
+    ):
+        return False
+    quiz.standings_applied = True
+    for row in congregation_stats([quiz.id]):
+        _add(_locked_standing(row["congregation"]), quiz, row["participants"], row["correct"])
+    return True
+
+
+@transaction.atomic
+def unfold_quiz(quiz):
+    """Take a quiz back out of the standings; False if it was not counted"""
+    if not Quiz.objects.filter(id=quiz.id, standings_applied=True).update(
+        standings_applied=False
+    ):
+        return False
+    quiz.standings_applied = False
+    for standing in CongregationQuizStanding.objects.select_for_update():
+        for entry in standing.quiz_participation:
+            if entry["quiz_id"] == quiz.id:
+                _subtract(standing, quiz.id, entry["participants"], entry["correct_answers"])
+                break
+    return True
+
+
+def apply_due_quizzes(now=None):
+    """Fold every active quiz whose results have become available"""
+    due = Quiz.objects.filter(
+        is_active=True, standings_applied=False, end_time__lt=results_cutoff(now)
+    )
+    return sum(fold_quiz(quiz) for quiz in due)
+
+
+def _folded_quiz(submission):
+    """The submission's quiz if it is counted in the standings, else None"""
+    # Quizzes are only folded RESULTS_DELAY after they end, so submissions
+    # during a live quiz never need the flag lookup
+    key = answer_keys.get(submission.quiz_id)
+    if key is not None and key.end_time >= results_cutoff():
+        return None
+    return Quiz.objects.filter(id=submission.quiz_id, standings_applied=True).first()
+
+
+def record_submission(submission):
+    """Count a submission that arrived after its quiz was folded"""
+    quiz = _folded_quiz(submission)
+    if quiz is not None:
+        with transaction.atomic():
+            _add(_locked_standing(submission.congregation), quiz, 1, int(submission.is_correct))
+
+
+def unrecord_submission(submission):
+    """Take a deleted submission back out of its folded quiz's totals"""
+    quiz = _folded_quiz(submission)
+    if quiz is not None:
+        with transaction.atomic():
+            standing = _locked_standing(submission.congregation)
+            if standing.pk:
+                _subtract(standing, quiz.id, 1, int(submission.is_correct))
+
+
+def retire_quizzes(quizzes):
+    """Deactivate ``quizzes``, removing them from the standings first"""
+    for quiz in quizzes.filter(standings_applied=True):
+        unfold_quiz(quiz)
+    retired = quizzes.update(is_active=False)
+    # update() skips the Quiz signals that normally drop these
+    answer_keys.invalidate()
+    invalidate_feeds()
+    return retired
+
+
+@transaction.atomic
+def rebuild_standings(now=None):
+    """Recompute the whole table from submissions; returns the row count"""
+    quizzes = list(
+        Quiz.objects.filter(is_active=True, end_time__lt=results_cutoff(now)).order_by("-end_time")
+    )
+    titles = {quiz.id: quiz.title for quiz in quizzes}
+
+    standings = {}
+    participation = defaultdict(dict)
+    for row in congregation_stats(list(titles)):
+        standing = standings.setdefault(
+            row["congregation"], CongregationQuizStanding(congregation=row["congregation"])
+        )
+        standing.total_quizzes += 1
+        standing.total_participants += row["participants"]
+        standing.total_correct_answers += row["correct"]
+        participation[row["congregation"]][row["quiz_id"]] = {
+            "quiz_id": row["quiz_id"],
+            "quiz_title": titles[row["quiz_id"]],
+            "participants": row["participants"],
+            "correct_answers": row["correct"],
+        }
+    for name, standing in standings.items():
+        # Newest quiz first, as fold_quiz keeps it
+        standing.quiz_participation = [
+            participation[name][quiz.id] for quiz in quizzes if quiz.id in participation[name]
+        ]
+
+    CongregationQuizStanding.objects.all().delete()
+    CongregationQuizStanding.objects.bulk_create(standings.values())
+    Quiz.objects.exclude(id__in=titles).update(standings_applied=False)
+    Quiz.objects.filter(id__in=titles).update(standings_applied=True)
+    return len(standings)
+
+
+def top_standings(size=STANDINGS_SIZE):
+    return CongregationQuizStanding.objects.order_by("-total_participants", "congregation")[:size]
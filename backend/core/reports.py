@@ -0,0 +1,294 @@
+"""
+PDF report generation for the background report queue.
+
+Views only enqueue ReportJob rows; the run_report_worker command claims them
+and builds the PDF here. Finished files are reused for as long as the data
+they were built from is unchanged (see data_version).
+"""
+import hashlib
+import os
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Max
+from django.utils import timezone
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.styles import ParagraphStyle, getSampleStyleSheet
+from reportlab.platypus import (PageBreak, Paragraph, SimpleDocTemplate, Spacer,
+                                Table, TableStyle)
+
+from .exports import EXPORT_CHUNK_SIZE, analytics_rows
+from .models import Congregation, Guilder, ReportJob, SundayAttendance
+
+# Rows per reportlab Table. One huge Table makes the layout pass re-split the
+# remaining rows on every page; fixed-size chunks keep the build linear.
+TABLE_CHUNK_ROWS = 500
+
+# A job still "running" after this long is assumed to belong to a dead worker
+STALE_JOB_AFTER = timedelta(minutes=30)
+
+MAX_ATTEMPTS = 3
+
+TABLE_STYLE = TableStyle(
+    [
+        ("BACKGROUND", (0, 0), (-1, 0), colors.grey),
+        ("TEXTCOLOR", (0, 0), (-1, 0), colors.whitesmoke),
+        ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
+        ("FONTSIZE", (0, 0), (-1, 0), 12),
+        ("BOTTOMPADDING", (0, 0), (-1, 0), 12),
+        ("BACKGROUND", (0, 1), (-1, -1), colors.beige),
+        ("TEXTCOLOR", (0, 1), (-1, -1), colors.black),
+        ("FONTNAME", (0, 1), (-1, -1), "Helvetica"),
+        ("FONTSIZE", (0, 1), (-1, -1), 10),
+        ("GRID", (0, 0), (-1, -1), 1, colors.black),
+        ("ALIGN", (0, 0), (-1, -1), "LEFT"),
+    ]
+)
+
+
+def _members(congregation_id):
+    members = Guilder.objects.order_by("congregation__name", "first_name", "id")
+    if congregation_id:
+        members = members.filter(congregation_id=congregation_id)
+    return members
+
+
+def _attendance(congregation_id):
+    records = SundayAttendance.objects.order_by("-date", "congregation__name")
+    if congregation_id:
+        records = records.filter(congregation_id=congregation_id)
+    return records
+
+
+def member_table_rows(congregation_id=None):
+    yield ["Name", "Phone", "Congregation", "Status", "Gender"]
+    rows = _members(congregation_id).values_list(
+        "first_name",
+        "last_name",
+        "phone_number",
+        "congregation__name",
+        "membership_status",
+        "gender",
+    )
+    for first_name, last_name, phone_number, congregation, status, gender in rows.iterator(
+        chunk_size=EXPORT_CHUNK_SIZE
+    ):
+        yield [f"{first_name} {last_name}", phone_number, congregation, status, gender]
+
+
+def attendance_table_rows(congregation_id=None):
+    yield ["Date", "Congregation", "Male", "Female", "Total"]
+    rows = _attendance(congregation_id).values_list(
+        "date", "congregation__name", "male_count", "female_count", "total_count"
+    )
+    for day, congregation, male, female, total in rows.iterator(
+        chunk_size=EXPORT_CHUNK_SIZE
+    ):
+        yield [day.strftime("%Y-%m-%d"), congregation, str(male), str(female), str(total)]
+
+
+def analytics_table_rows(congregation_id=None):
+    congregation = Congregation.objects.get(pk=congregation_id) if congregation_id else None
+    yield from analytics_rows(congregation)
+
+
+SECTIONS = {
+    "members": ("YPG Members Report", member_table_rows),
+    "attendance": ("YPG Attendance Report", attendance_table_rows),
+    "analytics": ("YPG Analytics Summary", analytics_table_rows),
+}
+
+
+def sections(report_type):
+    if report_type == "all":
+        return [SECTIONS[name] for name in ("members", "attendance", "analytics")]
+    return [SECTIONS[report_type]]
+
+
+def chunked(rows, chunk_rows=TABLE_CHUNK_ROWS):
+    """Split a header + rows stream into lists of header + ``chunk_rows`` rows"""
+    rows = iter(rows)
+    header = next(rows)
+    chunk = [header]
+    emitted = False
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) > chunk_rows:
+            yield chunk
+            chunk = [header]
+            emitted = True
+    # An empty report still shows its header row
+    if len(chunk) > 1 or not emitted:
+        yield chunk
+
+
+def build_pdf(report_type, congregation_id, path):
+    """Write the report to ``path`` and return the number of table rows"""
+    styles = getSampleStyleSheet()
+    title_style = ParagraphStyle(
+        "CustomTitle",
+        parent=styles["Heading1"],
+        fontSize=16,
+        spaceAfter=30,
+        alignment=1,
+    )
+
+    elements = []
+    total = 0
+    for index, (title, rows) in enumerate(sections(report_type)):
+        if index:
+            elements.append(PageBreak())
+        elements.append(Paragraph(title, title_style))
+        elements.append(Spacer(1, 20))
+        for chunk in chunked(rows(congregation_id)):
+            # repeatRows=1 repeats the header on every page a chunk spans
+            elements.append(Table(chunk, repeatRows=1, style=TABLE_STYLE))
+            total += len(chunk) - 1
+
+    SimpleDocTemplate(str(path), pagesize=A4).build(elements)
+    return total
+
+
+def data_version(report_type, congregation_id=None):
+    """
+    Fingerprint of the rows a report reads: row counts catch inserts and
+    deletes, the newest updated_at catches edits.
+    """
+    # Congregation names appear in every table
+    querysets = [Congregation.objects.all()]
+    if report_type in ("members", "all"):
+        querysets.append(_members(congregation_id))
+    if report_type in ("attendance", "all"):
+        querysets.append(_attendance(congregation_id))
+    if report_type in ("analytics", "all"):
+        querysets += [Guilder.objects.all(), SundayAttendance.objects.all()]
+
+    parts = [report_type, str(congregation_id or "district")]
+    for queryset in querysets:
+        summary = queryset.order_by().aggregate(rows=Count("id"), latest=Max("updated_at"))
+        parts.append(f"{summary['rows']}:{summary['latest']}")
+    return hashlib.sha256("|".join(parts).encode()).hexdigest()
+
+
+def report_path(job):
+    scope = job.congregation_id or "district"
+    return Path(settings.REPORTS_ROOT) / f"{job.report_type}_{scope}_{job.data_version[:16]}.pdf"
+
+
+def report_filename(job):
+    return f'ypg_{job.report_type}_report_{(job.finished_at or job.created_at).strftime("%Y%m%d_%H%M%S")}.pdf'
+
+
+def cached_report(report_type, congregation_id=None, version=None):
+    """The newest finished job for the current data, if its file still exists"""
+    version = version or data_version(report_type, congregation_id)
+    job = (
+        ReportJob.objects.filter(
+            report_type=report_type,
+            congregation_id=congregation_id,
+            data_version=version,
+            status="done",
+        )
+        .order_by("-finished_at")
+        .first()
+    )
+    if job and os.path.exists(job.file_path):
+        return job
+    return None
+
+
+def enqueue_report(report_type, congregation_id=None, user=None):
+    """
+    Return a job for the report: a finished one when the current data was
+    already rendered, an existing pending/running one, or a newly queued job.
+    """
+    version = data_version(report_type, congregation_id)
+    job = cached_report(report_type, congregation_id, version)
+    if job:
+        return job
+    job = ReportJob.objects.filter(
+        report_type=report_type,
+        congregation_id=congregation_id,
+        data_version=version,
+        status__in=["pending", "running"],
+    ).first()
+    if job:
+        return job
+    return ReportJob.objects.create(
+        report_type=report_type,
+        congregation_id=congregation_id,
+        requested_by=user if user and user.is_authenticated else None,
+        data_version=version,
+    )
+
+
+def requeue_stale_jobs():
+    """Put jobs left 'running' by a crashed worker back in the queue"""
+    return ReportJob.objects.filter(
+        status="running",
+        started_at__lt=timezone.now() - STALE_JOB_AFTER,
+        attempts__lt=MAX_ATTEMPTS,
+    ).update(status="pending")
+
+
+def claim_next_job():
+    """
+    Atomically move the oldest pending job to 'running'. SKIP LOCKED lets
+    several workers poll the same table without handing out a job twice.
+    """
+    with transaction.atomic():
+        job = (
+            ReportJob.objects.select_for_update(skip_locked=True)
+            .filter(status="pending")
+            .order_by("created_at", "id")
+            .first()
+        )
+        if job is None:
+            return None
+        job.status = "running"
+        job.started_at = timezone.now()
+        job.attempts += 1
+        job.save(update_fields=["status", "started_at", "attempts"])
+    return job
+
+
+def run_job(job):
+    """Build the PDF for a claimed job and record the outcome"""
+    try:
+        # Rows may have changed while the job was queued
+        job.data_version = data_version(job.report_type, job.congregation_id)
+        cached = cached_report(job.report_type, job.congregation_id, job.data_version)
+        if cached:
+            job.file_path = cached.file_path
+            job.row_count = cached.row_count
+        else:
+            path = report_path(job)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            partial = path.with_suffix(f".{job.pk}.tmp")
+            job.row_count = build_pdf(job.report_type, job.congregation_id, partial)
+            os.replace(partial, path)
+            job.file_path = str(path)
+        job.status = "done"
+        job.error = ""
+    except Exception as e:
+        job.status = "pending" if job.attempts < MAX_ATTEMPTS else "failed"
+        job.error = str(e)
+    job.finished_at = timezone.now()
+    job.save()
+    return job
+
+
+def job_as_json(job):
+    return {
+        "id": job.id,
+        "type": job.report_type,
+        "congregation_id": job.congregation_id,
+        "status": job.status,
+        "row_count": job.row_count,
+        "error": job.error,
+        "created_at": job.created_at.isoformat(),
+        "finished_at": job.finished_at.isoformat() if job.finished_at else None,
+    }
@@ -0,0 +1,159 @@
+"""
+Retention policies for the append-heavy tables.
+
+Expired rows are deleted in batches of consecutive primary keys, each in
+its own short transaction, so no statement holds locks on more than BATCH_SIZE
+rows or runs for long. Tables that nothing cascades to and no signal
+watches are deleted with a single DELETE per batch (QuerySet._raw_delete,
+chosen by Django's own Collector.can_fast_delete check); the rest go
+through the normal delete. Notifications are removed through
+core.notifications so the unread counters stay right.
+
+The number of days each table keeps is DATA_RETENTION_DAYS in settings;
+a policy set to 0 or missing is skipped.
+"""
+import time
+from collections import namedtuple
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.sessions.models import Session
+from django.db import connection, transaction
+from django.db.models import Q
+from django.db.models.deletion import Collector
+from django.utils import timezone
+
+from .models import (BirthdayMessageLog, BulkProfileCart, LoginAttempt, Notification, OutboundMessage,
+                     RequestMetric)
+from .notifications import delete_notifications
+
+BATCH_SIZE = 1000
+# Give up on a batch rather than queue behind a long-held lock
+LOCK_TIMEOUT = "2s"
+
+Policy = namedtuple("Policy", "name model expired delete")
+
+
+def _fast_or_collected(queryset):
+    if Collector(using=queryset.db).can_fast_delete(queryset):
+        return queryset._raw_delete(queryset.db)
+    deleted, _ = queryset.delete()
+    return deleted
+
+
+POLICIES = [
+    Policy(
+        "sessions",
+        Session,
+        # Sessions count their days from when they expired
+        lambda now, cutoff: Q(expire_date__lt=cutoff),
+        _fast_or_collected,
+    ),
+    Policy(
+        "login_attempts",
+        LoginAttempt,
+        lambda now, cutoff: Q(last_attempt__lt=cutoff)
+        & (Q(blocked_until__isnull=True) | Q(blocked_until__lt=now)),
+        _fast_or_collected,
+    ),
+    Policy(
+        "notifications",
+        Notification,
+        lambda now, cutoff: Q(created_at__lt=cutoff),
+        delete_notifications,
+    ),
+    Policy(
+        "birthday_messages",
+        BirthdayMessageLog,
+        lambda now, cutoff: Q(created_at__lt=cutoff),
+        _fast_or_collected,
+    ),
+    Policy(
+        "bulk_carts",
+        BulkProfileCart,
+        lambda now, cutoff: Q(created_at__lt=cutoff, submitted=False),
+        _fast_or_collected,
+    ),
+    Policy(
+        "request_metrics",
+        RequestMetric,
+        lambda now, cutoff: Q(created_at__lt=cutoff),
+        _fast_or_collected,
+    ),
+    Policy(
+        "outbound_messages",
+        OutboundMessage,
+        # Messages still queued are kept however old
+        lambda now, cutoff: Q(created_at__lt=cutoff, status__in=["sent", "failed"]),
+        _fast_or_collected,
+    ),
+]
+
+
+def average_row_bytes(model):
+    """Mean stored size of a sample of ``model`` rows (PostgreSQL only)"""
+    if connection.vendor != "postgresql":
+        return None
+    table = connection.ops.quote_name(model._meta.db_table)
+    with connection.cursor() as cursor:
+        cursor.execute(f"SELECT avg(pg_column_size(t.*)) FROM (SELECT * FROM {table} LIMIT 1000) t")
+        value = cursor.fetchone()[0]
+    return float(value) if value is not None else None
+
+
+def _limit_lock_waits():
+    if connection.vendor == "postgresql":
+        with connection.cursor() as cursor:
+            cursor.execute(f"SET LOCAL lock_timeout = '{LOCK_TIMEOUT}'")
+
+
+def delete_in_batches(queryset, delete=_fast_or_collected, batch_size=BATCH_SIZE, pause=0.0):
+    """
+    Delete ``queryset`` in ranges of ``batch_size`` primary keys, one short
+    transaction per range; returns the number of rows deleted.
+    """
+    queryset = queryset.order_by("pk")
+    deleted = 0
+    low = None
+    while True:
+        remaining = queryset if low is None else queryset.filter(pk__gt=low)
+        # The last key of the next range, found on the primary key index
+        high = remaining.values_list("pk", flat=True)[batch_size - 1:batch_size].first()
+        batch = remaining if high is None else remaining.filter(pk__lte=high)
+        with transaction.atomic():
+            _limit_lock_waits()
+            deleted += delete(batch)
+        if high is None:
+            return deleted
+        low = high
+        if pause:
+            time.sleep(pause)
+
+
+def compact(names=None, dry_run=False, batch_size=BATCH_SIZE, pause=0.0, now=None):
+    """
+    Apply the retention policies (all, or those in ``names``); returns
+    {name: {"days", "rows", "bytes"}} where bytes is an estimate, or None
+    off PostgreSQL.
+    """
+    now = now or timezone.now()
+    retention = settings.DATA_RETENTION_DAYS
+    report = {}
+    for policy in POLICIES:
+        if names and policy.name not in names:
+            continue
+        days = retention.get(policy.name)
+        if not days:
+            continue
+        expired = policy.model.objects.filter(policy.expired(now, now - timedelta(days=days)))
+        row_bytes = average_row_bytes(policy.model)
+        if dry_run:
+            rows = expired.count()
+        else:
+            rows = delete_in_batches(expired, policy.delete, batch_size, pause)
+        report[policy.name] = {
+            "days": days,
+            "rows": rows,
+            "bytes": round(rows * row_bytes) if row_bytes is not None else None,
+        }
+    return report
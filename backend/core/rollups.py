@@ -0,0 +1,163 @@
+from collections import defaultdict
+from datetime import date
+
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .bucketing import PERIODS, bucketed, period_end, period_start
+from .models import AttendanceRollup, SundayAttendance
+
+BATCH_SIZE = 1000
+
+
+# First key of the pg_advisory_xact_lock pairs taken per rollup bucket
+ROLLUP_LOCK_CLASS = 4201
+
+
+def _lock_buckets(buckets):
+    """
+    Serialize refreshes of the same buckets until the transaction ends.
+    Row locks cannot cover rollup rows that do not exist yet, so two writes
+    in one period would otherwise both insert its district row. SQLite
+    already runs one write transaction at a time.
+    """
+    if connection.vendor != "postgresql":
+        return
+    # A fixed order keeps two refreshes from deadlocking on each other
+    keys = sorted({(PERIODS.index(period), start.toordinal()) for period, start in buckets})
+    with connection.cursor() as cursor:
+        for period_index, ordinal in keys:
+            cursor.execute(
+                "SELECT pg_advisory_xact_lock(%s, %s)", [ROLLUP_LOCK_CLASS + period_index, ordinal]
+            )
+
+
+@transaction.atomic
+def refresh_rollups(touched):
+    """
+    Recompute the rollup rows affected by attendance writes.
+
+    ``touched`` is an iterable of ``(congregation_id, date)`` pairs. The
+    affected periods are re-aggregated with one grouped query per period
+    grain and the rollup rows written back in bulk, which keeps the stored
+    totals exact whatever mix of inserts, updates and deletes happened.
+    Concurrent refreshes of the same period wait for each other.
+    """
+    congregations_by_bucket = defaultdict(set)
+    for congregation_id, day in touched:
+        if isinstance(day, str):
+            day = date.fromisoformat(day)
+        for period in PERIODS:
+            congregations_by_bucket[(period, period_start(day, period))].add(
+                congregation_id
+            )
+    if not congregations_by_bucket:
+        return
+    # Taken before aggregating, so the totals include the other writer's rows
+    _lock_buckets(congregations_by_bucket)
+
+    empty = {"male": 0, "female": 0, "total": 0, "records": 0}
+    totals = {}
+    for period in PERIODS:
+        starts = [start for grain, start in congregations_by_bucket if grain == period]
+        ranges = Q()
+        for start in starts:
+            ranges |= Q(date__gte=start, date__lt=period_end(start, period))
+        rows = bucketed(SundayAttendance.objects.filter(ranges), period, by_congregation=True)
+        for row in rows:
+            totals[(period, row["bucket"], row["congregation_id"])] = row
+            district = totals.setdefault((period, row["bucket"], None), dict(empty))
+            for key in empty:
+                district[key] += row[key] or 0
+
+    wanted = {}
+    for (period, start), congregation_ids in congregations_by_bucket.items():
+        for congregation_id in congregation_ids | {None}:
+            wanted[(period, start, congregation_id)] = totals.get(
+                (period, start, congregation_id), empty
+            )
+
+    buckets = Q()
+    for period, start in congregations_by_bucket:
+        buckets |= Q(period=period, period_start=start)
+    existing = {
+        (rollup.period, rollup.period_start, rollup.congregation_id): rollup
+        for rollup in AttendanceRollup.objects.filter(buckets)
+    }
+
+    now = timezone.now()
+    changed, added, emptied = [], [], []
+    for key, row in wanted.items():
+        rollup = existing.get(key)
+        if not row["records"]:
+            if rollup is not None:
+                emptied.append(rollup.pk)
+            continue
+        if rollup is None:
+            period, start, congregation_id = key
+            rollup = AttendanceRollup(
+                period=period, period_start=start, congregation_id=congregation_id
+            )
+            added.append(rollup)
+        else:
+            changed.append(rollup)
+        rollup.male_count = row["male"] or 0
+        rollup.female_count = row["female"] or 0
+        rollup.total_count = row["total"] or 0
+        rollup.record_count = row["records"]
+        rollup.updated_at = now
+
+    if emptied:
+        AttendanceRollup.objects.filter(pk__in=emptied).delete()
+    if changed:
+        AttendanceRollup.objects.bulk_update(
+            changed,
+            ["male_count", "female_count", "total_count", "record_count", "updated_at"],
+            batch_size=BATCH_SIZE,
+        )
+    if added:
+        AttendanceRollup.objects.bulk_create(added, batch_size=BATCH_SIZE)
+
+
+@transaction.atomic
+def rebuild_rollups():
+    """Drop and recompute every rollup row from SundayAttendance"""
+    rows = []
+    for period in PERIODS:
+        for by_congregation in (True, False):
+            for bucket in bucketed(
+                SundayAttendance.objects.all(), period, by_congregation=by_congregation
+            ).iterator():
+                rows.append(
+                    AttendanceRollup(
+                        period=period,
+                        period_start=bucket["bucket"],
+                        congregation_id=bucket.get("congregation_id"),
+                        male_count=bucket["male"],
+                        female_count=bucket["female"],
+                        total_count=bucket["total"],
+                        record_count=bucket["records"],
+                    )
+                )
+
+    AttendanceRollup.objects.all().delete()
+    AttendanceRollup.objects.bulk_create(rows, batch_size=BATCH_SIZE)
+    return len(rows)
+
+
+def rollups(period, congregation_id=None, start=None, end=None):
+    """
+    Rollup rows for one period grain, district-wide unless a congregation
+    is given. ``start``/``end`` bound the dates the periods cover.
+    """
+    queryset = AttendanceRollup.objects.filter(period=period)
+    if congregation_id:
+        queryset = queryset.filter(congregation_id=congregation_id)
+    else:
+        queryset = queryset.filter(congregation__isnull=True)
+    if start:
+        queryset = queryset.filter(period_start__gte=period_start(start, period))
+    if end:
+        queryset = queryset.filter(period_start__lte=end)
+    return queryset.order_by("period_start")
@@ -0,0 +1,214 @@
+import threading
+
+from django.db import connection
+from django.db.models import F, Q, Value
+from django.db.models.functions import Greatest, Upper
+
+from .models import Guilder
+
+SEARCH_RESULT_LIMIT = 20
+MAX_SEARCH_RESULTS = 50
+
+RESULT_FIELDS = ("id", "first_name", "last_name", "phone_number", "congregation_id")
+
+
+def normalize(text):
+    return " ".join((text or "").upper().split())
+
+
+def use_trigram():
+    return connection.vendor == "postgresql"
+
+
+def filter_members(queryset, term):
+    """
+    Restrict ``queryset`` to guilders whose name or phone contains ``term``.
+
+    On Postgres the UPPER(...) LIKE condition Django emits for ``icontains``
+    is served by the trigram indexes from migration 0013, so this no longer
+    scans the table.
+    """
+    return queryset.filter(
+        Q(first_name__icontains=term)
+        | Q(last_name__icontains=term)
+        | Q(phone_number__icontains=term)
+    )
+
+
+def edit_distance(a, b, limit):
+    """Levenshtein distance between a and b, giving up once it exceeds limit"""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(
+                min(
+                    previous[j] + 1,
+                    current[j - 1] + 1,
+                    previous[j - 1] + (ca != cb),
+                )
+            )
+        if min(current) > limit:
+            return limit + 1
+        previous = current
+    return previous[-1]
+
+
+def typo_budget(word):
+    if len(word) >= 7:
+        return 2
+    if len(word) >= 4:
+        return 1
+    return 0
+
+
+def score_word(word, tokens):
+    """Best match score of one query word against a member's name tokens"""
+    best = 0.0
+    budget = typo_budget(word)
+    for token in tokens:
+        if token == word:
+            return 1.0
+        if token.startswith(word):
+            best = max(best, 0.9)
+        elif word in token:
+            best = max(best, 0.7)
+        elif budget:
+            # Compare against the token prefix so partially typed names match
+            distance = edit_distance(word, token[: len(word)], budget)
+            if distance <= budget:
+                best = max(best, 0.6 - 0.1 * distance)
+    return best
+
+
+class MemberSearchIndex:
+    """
+    In-process search index used when the database has no pg_trgm support
+    (SQLite development databases).
+
+    The index holds one normalized entry per guilder and is rebuilt lazily
+    after any Guilder write (see core.signals).
+    """
+
+    def __init__(self):
+        self._entries = None
+        self._lock = threading.Lock()
+
+    def invalidate(self):
+        self._entries = None
+
+    def entries(self):
+        entries = self._entries
+        if entries is None:
+            with self._lock:
+                if self._entries is None:
+                    self._entries = [
+                        (
+                            pk,
+                            congregation_id,
+                            normalize(f"{first_name} {last_name}").split(),
+                            "".join(ch for ch in phone_number if ch.isdigit()),
+                        )
+                        for pk, first_name, last_name, phone_number, congregation_id in (
+                            Guilder.objects.values_list(*RESULT_FIELDS).iterator()
+                        )
+                    ]
+                entries = self._entries
+        return entries
+
+    def search(self, term, limit=SEARCH_RESULT_LIMIT, congregation_id=None):
+        """Return ``[(score, guilder_id), ...]`` best matches first"""
+        words = normalize(term).split()
+        digits = "".join(ch for ch in term if ch.isdigit())
+        if not words:
+            return []
+
+        scored = []
+        for pk, cong_id, tokens, phone in self.entries():
+            if congregation_id is not None and cong_id != congregation_id:
+                continue
+            if digits and len(digits) >= 3 and digits in phone:
+                score = 1.0 if phone.startswith(digits) else 0.8
+            else:
+                scores = [score_word(word, tokens) for word in words]
+                # Every query word has to match something
+                if not all(scores):
+                    continue
+                score = sum(scores) / len(scores)
+            scored.append((score, pk))
+
+        scored.sort(key=lambda item: (-item[0], item[1]))
+        return scored[:limit]
+
+
+member_index = MemberSearchIndex()
+
+
+def _trigram_search(queryset, term, limit):
+    from django.contrib.postgres.lookups import TrigramWordSimilar
+    from django.contrib.postgres.search import TrigramWordSimilarity
+
+    needle = normalize(term)
+    condition = (
+        Q(first_name__istartswith=term)
+        | Q(last_name__istartswith=term)
+        | Q(phone_number__icontains=term)
+    )
+    # Trigram similarity is meaningless for one or two characters; type-ahead
+    # on those only needs the prefix match above.
+    if len(needle) >= 3:
+        for field in ("first_name", "last_name"):
+            condition |= TrigramWordSimilar(Upper(field), Value(needle))
+
+    return (
+        queryset.filter(condition)
+        .annotate(
+            score=Greatest(
+                TrigramWordSimilarity(Value(needle), Upper("first_name")),
+                TrigramWordSimilarity(Value(needle), Upper("last_name")),
+                TrigramWordSimilarity(Value(needle), Upper("phone_number")),
+            )
+        )
+        .order_by("-score", "first_name", "last_name", "id")
+        .values(*RESULT_FIELDS, "score", congregation_name=F("congregation__name"))[:limit]
+    )
+
+
+def search_members(term, limit=SEARCH_RESULT_LIMIT, congregation_id=None):
+    """
+    Ranked, prefix-aware and typo-tolerant member search.
+
+    Returns a list of dicts with the RESULT_FIELDS, the congregation name and
+    a relevance ``score`` between 0 and 1.
+    """
+    term = (term or "").strip()
+    if not term:
+        return []
+
+    queryset = Guilder.objects.all()
+    if congregation_id is not None:
+        queryset = queryset.filter(congregation_id=congregation_id)
+
+    if use_trigram():
+        rows = list(_trigram_search(queryset, term, limit))
+    else:
+        ranked = member_index.search(term, limit, congregation_id)
+        scores = dict((pk, score) for score, pk in ranked)
+        by_id = {
+            row["id"]: row
+            for row in queryset.filter(id__in=scores).values(
+                *RESULT_FIELDS, congregation_name=F("congregation__name")
+            )
+        }
+        rows = []
+        for score, pk in ranked:
+            # Skip guilders deleted since the index was built
+            if pk in by_id:
+                rows.append(dict(by_id[pk], score=score))
+
+    for row in rows:
+        row["congregation"] = row.pop("congregation_name")
+        row["score"] = round(float(row["score"] or 0), 3)
+    return rows
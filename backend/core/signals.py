@@ -0,0 +1,122 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_init, post_save, pre_delete
+from django.dispatch import receiver
+
+from .caching import bump_on_commit
+from .home_stats import mark_stale as mark_home_stats_stale
+from .models import Congregation, Guilder, Quiz, QuizSubmission, SundayAttendance
+from .notifications import reset_counters as reset_notification_counters
+from .quiz_cache import answer_keys
+from .quiz_feed import count_submission, invalidate_feeds, reset_counts
+from .quiz_results import results_cutoff
+from .quiz_standings import fold_quiz, record_submission, unfold_quiz, unrecord_submission
+from .rollups import refresh_rollups
+from .search import member_index
+
+
+@receiver(post_save, sender=Guilder)
+@receiver(post_delete, sender=Guilder)
+def invalidate_member_search(sender, **kwargs):
+    member_index.invalidate()
+
+
+@receiver(post_save, sender=Guilder)
+@receiver(post_delete, sender=Guilder)
+def invalidate_cached_member_stats(sender, **kwargs):
+    bump_on_commit("members")
+    mark_home_stats_stale()
+
+
+@receiver(post_save, sender=SundayAttendance)
+@receiver(post_delete, sender=SundayAttendance)
+def invalidate_cached_attendance_stats(sender, **kwargs):
+    bump_on_commit("attendance")
+    mark_home_stats_stale()
+
+
+@receiver(post_save, sender=Congregation)
+@receiver(post_delete, sender=Congregation)
+def invalidate_cached_congregation_stats(sender, **kwargs):
+    # Congregation names and flags appear in both member and attendance stats;
+    # "congregations" holds the user -> congregation mapping
+    bump_on_commit("members", "attendance", "congregations")
+    mark_home_stats_stale()
+
+
+@receiver(post_delete, sender=Congregation)
+def recount_notifications(sender, **kwargs):
+    # The congregation's notifications went with it, bypassing the counters
+    transaction.on_commit(reset_notification_counters)
+
+
+@receiver(post_init, sender=SundayAttendance)
+def remember_attendance_bucket(sender, instance, **kwargs):
+    # Keep the loaded congregation/date so an edit that moves a record to
+    # another week or congregation also refreshes the buckets it left.
+    instance._rollup_origin = (instance.congregation_id, instance.date)
+
+
+@receiver(post_save, sender=SundayAttendance)
+def update_attendance_rollups(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    touched = {(instance.congregation_id, instance.date)}
+    origin = getattr(instance, "_rollup_origin", None)
+    if not created and origin and origin[1] is not None:
+        touched.add(origin)
+    refresh_rollups(touched)
+    instance._rollup_origin = (instance.congregation_id, instance.date)
+
+
+@receiver(post_delete, sender=SundayAttendance)
+def remove_attendance_from_rollups(sender, instance, **kwargs):
+    refresh_rollups([(instance.congregation_id, instance.date)])
+
+
+@receiver(post_save, sender=QuizSubmission)
+def count_late_quiz_submission(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        record_submission(instance)
+        count_submission(instance.quiz_id, instance.is_correct)
+
+
+@receiver(post_delete, sender=QuizSubmission)
+def recount_quiz_submissions(sender, instance, **kwargs):
+    unrecord_submission(instance)
+    reset_counts([instance.quiz_id])
+
+
+@receiver(post_save, sender=Quiz)
+@receiver(post_delete, sender=Quiz)
+def invalidate_answer_key(sender, instance, **kwargs):
+    answer_keys.invalidate(instance.id)
+    invalidate_feeds()
+
+
+@receiver(post_init, sender=Quiz)
+def remember_quiz_standing_fields(sender, instance, **kwargs):
+    # The standings copy each quiz's title and only hold quizzes whose
+    # results are out, so an edit to either has to refold the quiz.
+    # Deferred fields are left unread rather than loaded here.
+    instance._standings_origin = (instance.__dict__.get("title"), instance.__dict__.get("end_time"))
+
+
+@receiver(post_save, sender=Quiz)
+def update_quiz_in_standings(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    if not instance.is_active:
+        if instance.standings_applied:
+            unfold_quiz(instance)
+    elif getattr(instance, "_standings_origin", None) != (instance.title, instance.end_time):
+        # unfold_quiz checks the stored flag, which this instance may not have seen
+        if unfold_quiz(instance) and instance.end_time < results_cutoff():
+            fold_quiz(instance)
+    instance._standings_origin = (instance.title, instance.end_time)
+
+
+@receiver(pre_delete, sender=Quiz)
+def remove_deleted_quiz_from_standings(sender, instance, **kwargs):
+    # unfold_quiz claims the flag on the quiz row, which is gone by post_delete
+    if instance.standings_applied:
+        unfold_quiz(instance)
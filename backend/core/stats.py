@@ -0,0 +1,216 @@
+from dataclasses import dataclass, field
+
+from django.db.models import Count, F, Q
+
+from .models import Congregation, Guilder
+
+
+@dataclass
+class DashboardStats:
+    """Headline counters and roster lists for one dashboard scope"""
+    is_district: bool
+    total_members: int = 0
+    total_male: int = 0
+    total_female: int = 0
+    active_members: int = 0
+    distant_members: int = 0
+    total_congregations: int = 0
+    district_executives: list = field(default_factory=list)
+    local_executives: list = field(default_factory=list)
+    members: list = field(default_factory=list)
+
+    def counters(self):
+        counters = {
+            "total_members": self.total_members,
+            "total_male": self.total_male,
+            "total_female": self.total_female,
+            "active_members": self.active_members,
+            "distant_members": self.distant_members,
+        }
+        if self.is_district:
+            counters["total_congregations"] = self.total_congregations
+        return counters
+
+    def as_json(self):
+        """Serialize in the shape returned by api_dashboard_stats"""
+        if self.is_district:
+            return {
+                "is_district": True,
+                "stats": self.counters(),
+                "district_executives": [
+                    _executive_json(row, with_congregation=True)
+                    for row in self.district_executives
+                ],
+                "local_executives": [
+                    _executive_json(row, with_congregation=True)
+                    for row in self.local_executives
+                ],
+                "members": [
+                    {
+                        "id": row["id"],
+                        "name": row["name"],
+                        "congregation": row["congregation"],
+                        "status": row["status"],
+                    }
+                    for row in self.members
+                ],
+            }
+
+        return {
+            "is_district": False,
+            "stats": self.counters(),
+            "executives": [
+                _executive_json(row, with_congregation=False)
+                for row in self.local_executives
+            ],
+            "members": [
+                {"id": row["id"], "name": row["name"], "status": row["status"]}
+                for row in self.members
+            ],
+        }
+
+
+def _executive_json(row, with_congregation):
+    data = {
+        "id": row["id"],
+        "name": row["name"],
+        "position": row["position"],
+        "level": row["level"],
+    }
+    if with_congregation:
+        data["congregation"] = row["congregation"]
+    return data
+
+
+class DashboardStatsService:
+    """
+    Build dashboard statistics for a congregation account.
+
+    All headline counters come from a single conditional-aggregate query and
+    the executive/member lists are loaded as flat ``.values()`` rows joined to
+    the congregation name, so the query count does not grow with the roster.
+    """
+
+    ROSTER_FIELDS = (
+        "id",
+        "first_name",
+        "last_name",
+        "membership_status",
+        "executive_level",
+        "executive_position",
+        "local_executive_position",
+        "district_executive_position",
+    )
+
+    def __init__(self, congregation):
+        self.congregation = congregation
+        self.is_district = bool(congregation and congregation.is_district)
+
+    def guilders(self):
+        """Guilders visible from this account"""
+        if self.is_district:
+            return Guilder.objects.all()
+        if self.congregation is None:
+            return Guilder.objects.none()
+        return Guilder.objects.filter(congregation=self.congregation)
+
+    def counters(self):
+        return self.guilders().aggregate(
+            total_members=Count("id"),
+            total_male=Count("id", filter=Q(gender="Male")),
+            total_female=Count("id", filter=Q(gender="Female")),
+            active_members=Count("id", filter=Q(membership_status="Active")),
+            distant_members=Count("id", filter=Q(membership_status="Distant")),
+        )
+
+    def _roster(self, queryset, position_field):
+        rows = []
+        for row in queryset.values(
+            *self.ROSTER_FIELDS, congregation_name=F("congregation__name")
+        ):
+            rows.append(
+                {
+                    "id": row["id"],
+                    "first_name": row["first_name"],
+                    "last_name": row["last_name"],
+                    "name": f"{row['first_name']} {row['last_name']}",
+                    "congregation": row["congregation_name"],
+                    "status": row["membership_status"],
+                    "level": row["executive_level"],
+                    "position": (
+                        row[position_field] or row["executive_position"]
+                        if position_field
+                        else row["executive_position"]
+                    ),
+                }
+            )
+        return rows
+
+    def district_executives(self):
+        return self._roster(
+            self.guilders()
+            .filter(is_executive=True, executive_level__in=["district", "both"])
+            .order_by("district_executive_position", "first_name"),
+            "district_executive_position",
+        )
+
+    def local_executives(self):
+        ordering = ["local_executive_position", "first_name"]
+        if self.is_district:
+            ordering.insert(0, "congregation__name")
+        return self._roster(
+            self.guilders()
+            .filter(is_executive=True, executive_level__in=["local", "both"])
+            .order_by(*ordering),
+            "local_executive_position",
+        )
+
+    def members(self):
+        return self._roster(
+            self.guilders()
+            .filter(is_executive=False)
+            .order_by("first_name", "last_name"),
+            None,
+        )
+
+    def get_stats(self):
+        stats = DashboardStats(is_district=self.is_district, **self.counters())
+        if self.is_district:
+            stats.total_congregations = Congregation.objects.count()
+            stats.district_executives = self.district_executives()
+        elif self.congregation is not None:
+            stats.total_congregations = 1
+        stats.local_executives = self.local_executives()
+        stats.members = self.members()
+        return stats
+
+
+class CongregationMemberBreakdown:
+    """
+    Member, male, female, active and distant counts for every congregation.
+
+    The counts come from one LEFT JOIN ... GROUP BY congregation query with
+    conditional aggregates, so congregations without members are included
+    with zeros and the query count does not grow with the congregations.
+    """
+
+    def __init__(self, congregations=None):
+        if congregations is None:
+            congregations = Congregation.objects.all()
+        self.congregations = congregations
+        self._rows = None
+
+    def rows(self):
+        if self._rows is None:
+            self._rows = list(
+                self.congregations.order_by("id")
+                .values("id", "name", "background_color", "is_district")
+                .annotate(
+                    members=Count("guilder"),
+                    male=Count("guilder", filter=Q(guilder__gender="Male")),
+                    female=Count("guilder", filter=Q(guilder__gender="Female")),
+                    active=Count("guilder", filter=Q(guilder__membership_status="Active")),
+                    distant=Count("guilder", filter=Q(guilder__membership_status="Distant")),
+                )
+            )
+        return self._rows
@@ -1,3 +1,1435 @@
-from django.test import TestCase
+import io
+import json
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve, reverse
+from django.utils import timezone
+
+from .backups import create_backup
+from .birthdays import send_birthday_messages, upcoming_birthdays
+from .bucketing import PERIODS, bucketed, period_end, period_start, week_label
+from .caching import bump, cached, stats as cache_stats
+from .fake_sms import FakeSMSServer
+from .home_stats import current_snapshot, mark_stale
+from .imports import import_profiles
+from .messaging import process_batch, queue_message, queue_welcome_messages
+from .metrics import budget_for, buffer as metrics_buffer
+from .middleware import congregation_for_user
+from .models import (AttendanceRollup, Backup, BirthdayMessageLog, BulkProfileCart, Congregation,
+                     CongregationQuizStanding, Guilder, LoginAttempt, Notification, NotificationCounter, OutboundMessage, Quiz,
+                     QuizSubmission, ReportJob, SundayAttendance, SystemSettings)
+from .notifications import batched, create_notification, fan_out, unread_count
+from .quiz_cache import SubmissionBuffer, answer_keys
+from .quiz_results import quiz_results
+from .quiz_standings import apply_due_quizzes, fold_quiz, rebuild_standings
+from .retention import compact
+from .search import MemberSearchIndex
+from .rollups import rebuild_rollups
+from .stats import CongregationMemberBreakdown, DashboardStatsService
+
+
+class QueryBudgetTestMixin:
+    """Fails a test when an endpoint runs more queries than its @query_budget"""
+
+    def assertWithinQueryBudget(self, url_name, args=None, **request_kwargs):
+        url = reverse(url_name, args=args)
+        limit = budget_for(resolve(url).func)
+        self.assertIsNotNone(limit, f"{url_name} declares no @query_budget")
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, **request_kwargs)
+        self.assertLess(response.status_code, 500, f"{url_name} returned {response.status_code}")
+        self.assertLessEqual(
+            len(queries),
+            limit,
+            f"{url_name} ran {len(queries)} queries, over its budget of {limit}:\n"
+            + "\n".join(query["sql"] for query in queries.captured_queries),
+        )
+        return response
+
+
+class CongregationMemberBreakdownTests(TestCase):
+    endpoints = (
+        "core:api_congregation_pie_data",
+        "core:api_gender_distribution",
+        "core:api_analytics_detailed",
+    )
+
+    def add_congregations(self, count):
+        start = Congregation.objects.count()
+        for index in range(start, start + count):
+            congregation = Congregation.objects.create(name=f"Congregation {index}")
+            for offset, (gender, status) in enumerate(
+                [("Male", "Active"), ("Female", "Active"), ("Female", "Distant")]
+            ):
+                Guilder.objects.create(
+                    first_name=f"Member{offset}",
+                    last_name=f"C{index}",
+                    gender=gender,
+                    membership_status=status,
+                    date_of_birth=date(2000, 1, 1),
+                    phone_number=f"02{index:04d}{offset:04d}",
+                    congregation=congregation,
+                )
+
+    def query_counts(self):
+        counts = {}
+        for name in self.endpoints:
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(reverse(name))
+            self.assertEqual(response.status_code, 200)
+            counts[name] = len(queries)
+        return counts
+
+    def test_breakdown_counts(self):
+        self.add_congregations(2)
+        Congregation.objects.create(name="Empty")
+
+        rows = {row["name"]: row for row in CongregationMemberBreakdown().rows()}
+
+        self.assertEqual(
+            {key: rows["Congregation 0"][key] for key in ("members", "male", "female", "active", "distant")},
+            {"members": 3, "male": 1, "female": 2, "active": 2, "distant": 1},
+        )
+        self.assertEqual(rows["Empty"]["members"], 0)
+
+    def test_query_count_is_constant_as_congregations_grow(self):
+        self.add_congregations(2)
+        few = self.query_counts()
+
+        self.add_congregations(5)
+        many = self.query_counts()
+
+        self.assertEqual(few, many)
+        self.assertEqual(many["core:api_congregation_pie_data"], 1)
+        self.assertEqual(many["core:api_gender_distribution"], 1)
+
+    def test_pie_data_skips_empty_congregations(self):
+        self.add_congregations(1)
+        Congregation.objects.create(name="Empty")
+
+        data = self.client.get(reverse("core:api_congregation_pie_data")).json()
+
+        self.assertEqual(data["labels"], ["Congregation 0"])
+        self.assertEqual(data["data"], [3])
+
+
+class QueryBudgetTests(QueryBudgetTestMixin, TestCase):
+    public_endpoints = (
+        "core:api_home_stats",
+        "core:api_quizzes",
+        "core:api_active_quiz",
+        "core:api_quiz_results",
+        "core:api_analytics_detailed",
+        "core:api_congregation_pie_data",
+        "core:api_gender_distribution",
+        "core:api_members",
+        "core:api_executive_positions",
+    )
+
+    def setUp(self):
+        # Cached responses would hide the queries being budgeted
+        cache.clear()
+        user = User.objects.create_user("budget", password="secret")
+        self.congregation = Congregation.objects.create(name="Budget", user=user)
+        self.client.force_login(user)
+
+    def add_data(self, count):
+        now = timezone.now()
+        start = Guilder.objects.count()
+        for index in range(start, start + count):
+            congregation = Congregation.objects.create(name=f"Budget {index}")
+            Guilder.objects.create(
+                first_name=f"Member{index}",
+                last_name="Budget",
+                gender="Male" if index % 2 else "Female",
+                date_of_birth=date(2000, 1, 1),
+                phone_number=f"03{index:08d}",
+                congregation=congregation,
+            )
+            SundayAttendance.objects.create(
+                congregation=congregation,
+                date=now.date() - timedelta(days=7 * index),
+                male_count=index,
+                female_count=index + 1,
+            )
+            quiz = Quiz.objects.create(
+                title=f"Quiz {index}",
+                question="?",
+                option_a="a",
+                option_b="b",
+                option_c="c",
+                option_d="d",
+                correct_answer="A",
+                start_time=now - timedelta(days=1, hours=index),
+                end_time=now - timedelta(hours=3 + index),
+            )
+            QuizSubmission.objects.create(
+                quiz=quiz,
+                name="Submitter",
+                phone_number=f"04{index:08d}",
+                congregation=congregation.name,
+                selected_answer="A",
+            )
+
+    def check_budgets(self):
+        cache.clear()
+        for name in self.public_endpoints:
+            self.assertWithinQueryBudget(name)
+        self.assertWithinQueryBudget("core:api_dashboard_stats")
+        self.assertWithinQueryBudget("core:api_notifications")
+        self.assertWithinQueryBudget("core:api_upcoming_birthdays", data={"days": 90})
+        quiz = Quiz.objects.first()
+        self.assertWithinQueryBudget("core:api_quiz_participants", args=[quiz.id])
+
+    def test_endpoints_stay_within_budget_as_data_grows(self):
+        self.add_data(2)
+        self.check_budgets()
+        self.add_data(6)
+        self.check_budgets()
+
+    def test_metrics_summary_reports_recorded_requests(self):
+        metrics_buffer.clear()
+        self.add_data(1)
+        for _ in range(3):
+            self.client.get(reverse("core:api_quiz_results"))
+
+        self.assertEqual(self.client.get(reverse("core:api_metrics")).status_code, 403)
+        self.client.force_login(User.objects.create_user("ops", password="secret", is_staff=True))
+        endpoints = self.client.get(reverse("core:api_metrics")).json()["endpoints"]
+
+        summary = endpoints["core:api_quiz_results"]
+        self.assertEqual(summary["count"], 3)
+        self.assertEqual(summary["status"], {"200": 3})
+        self.assertLessEqual(summary["queries"]["p99"], budget_for(resolve(reverse("core:api_quiz_results")).func))
+
+
+class MemberImportTests(TestCase):
+    header = "First Name,Last Name,Date of Birth,Gender,Phone,Place of Residence,Residential Address,Hometown,Relative Contact\n"
+
+    def setUp(self):
+        user = User.objects.create_user("importer", password="secret")
+        self.congregation = Congregation.objects.create(name="Importers", user=user)
+        self.client.force_login(user)
+
+    def sheet(self, rows):
+        upload = SimpleUploadedFile("members.csv", (self.header + "".join(rows)).encode())
+        return self.client.post(reverse("core:api_import_members"), {"file": upload}).json()
+
+    def row(self, index, phone=None, born="2000-01-01"):
+        return f"First{index},Last,{born},Female,{phone or f'05{index:08d}'},Accra,House,Ho,020\n"
+
+    def test_rejected_rows_are_reported_and_the_rest_imported(self):
+        Guilder.objects.create(
+            first_name="Existing",
+            last_name="Member",
+            gender="Male",
+            date_of_birth=date(2000, 1, 1),
+            phone_number="0599999999",
+            congregation=self.congregation,
+        )
+
+        result = self.sheet(
+            [self.row(1), self.row(2, phone="0599999999"), self.row(3, born="someday"), self.row(4, phone="0500000001")]
+        )
+
+        self.assertEqual((result["total"], result["created"], result["failed"]), (4, 1, 3))
+        self.assertEqual([error["row"] for error in result["errors"]], [2, 3, 4])
+        self.assertIn("date_of_birth", result["errors"][1]["errors"])
+        member = Guilder.objects.get(phone_number="0500000001")
+        self.assertEqual(member.congregation, self.congregation)
+        self.assertTrue(member.is_baptized)
+
+    def test_query_count_does_not_grow_with_rows(self):
+        self.sheet([self.row(999)])
+        counts = []
+        for start, size in ((0, 3), (100, 30)):
+            with CaptureQueriesContext(connection) as queries:
+                result = self.sheet([self.row(start + index) for index in range(size)])
+            self.assertEqual(result["created"], size)
+            counts.append(len(queries))
+        self.assertEqual(counts[0], counts[1])
+
+    def test_upload_needs_the_csrf_token(self):
+        # Logging in sets the csrftoken cookie the frontend reads
+        client = Client(enforce_csrf_checks=True)
+        client.post(
+            reverse("core:api_login"), {"username": "importer", "password": "secret"}, content_type="application/json"
+        )
+        upload = SimpleUploadedFile("members.csv", (self.header + self.row(1)).encode())
+        self.assertEqual(client.post(reverse("core:api_import_members"), {"file": upload}).status_code, 403)
+
+        upload.seek(0)
+        response = client.post(
+            reverse("core:api_import_members"), {"file": upload}, HTTP_X_CSRFTOKEN=client.cookies["csrftoken"].value
+        )
+        self.assertEqual(response.json()["created"], 1)
+
+    def test_cart_keeps_rejected_profiles(self):
+        valid = {
+            "first_name": "Ama",
+            "last_name": "Owusu",
+            "date_of_birth": "2001-02-03",
+            "gender": "Female",
+            "phone_number": "0511111111",
+            "place_of_residence": "Accra",
+            "residential_address": "House",
+            "hometown": "Ho",
+            "relative_contact": "020",
+        }
+        invalid = dict(valid, phone_number="0522222222", gender="")
+        cart = BulkProfileCart.objects.create(
+            user=User.objects.get(username="importer"),
+            congregation=self.congregation,
+            profiles=[valid, invalid],
+        )
+
+        self.client.post(reverse("core:bulk_cart", args=[cart.id]), {"action": "submit"})
+
+        cart.refresh_from_db()
+        self.assertFalse(cart.submitted)
+        self.assertEqual(cart.profiles, [invalid])
+        self.assertTrue(Guilder.objects.filter(phone_number="0511111111").exists())
+
+
+class BulkAttendanceTests(TestCase):
+    def setUp(self):
+        user = User.objects.create_user("secretary", password="secret")
+        self.congregation = Congregation.objects.create(name="Secretaries", user=user)
+        self.client.force_login(user)
+
+    def post(self, records):
+        return self.client.post(
+            reverse("core:api_bulk_attendance"), {"records": records}, content_type="application/json"
+        ).json()
+
+    def test_posts_need_the_csrf_token(self):
+        client = Client(enforce_csrf_checks=True)
+        client.post(
+            reverse("core:api_login"), {"username": "secretary", "password": "secret"}, content_type="application/json"
+        )
+        url = reverse("core:api_bulk_attendance")
+        records = {"records": [{"date": "2024-01-07", "male_count": 1, "female_count": 2}]}
+        self.assertEqual(client.post(url, records, content_type="application/json").status_code, 403)
+
+        response = client.post(
+            url, records, content_type="application/json", HTTP_X_CSRFTOKEN=client.cookies["csrftoken"].value
+        )
+        self.assertEqual(response.json()["created"], 1)
+
+    def test_upsert_reports_each_row_and_keeps_rollups_exact(self):
+        first = date(2024, 1, 7)
+        records = [
+            {"date": str(first + timedelta(weeks=week)), "male_count": week, "female_count": 2}
+            for week in range(10)
+        ]
+        created = self.post(records)
+        self.assertEqual((created["created"], created["updated"]), (10, 0))
+
+        records[0]["male_count"] = 40
+        records.append({"date": "not a date", "male_count": 1, "female_count": 1})
+        records.append({"congregation": "Elsewhere", "date": str(first), "male_count": 1, "female_count": 1})
+        Congregation.objects.create(name="Elsewhere")
+        updated = self.post(records)
+
+        self.assertEqual((updated["created"], updated["updated"], updated["failed"]), (0, 10, 2))
+        self.assertEqual([row["status"] for row in updated["results"]], ["updated"] * 10 + ["error"] * 2)
+        self.assertIn("congregation", updated["results"][-1]["errors"])
+        self.assertEqual(SundayAttendance.objects.get(date=first).total_count, 42)
+
+        month = AttendanceRollup.objects.get(
+            period="month", period_start=date(2024, 1, 1), congregation=self.congregation
+        )
+        self.assertEqual((month.male_count, month.record_count), (40 + 1 + 2 + 3, 4))
+        def totals():
+            return list(
+                AttendanceRollup.objects.order_by("period", "period_start", "congregation").values_list(
+                    "period", "period_start", "congregation", "male_count", "female_count", "record_count"
+                )
+            )
+
+        stored = totals()
+        rebuild_rollups()
+        self.assertEqual(stored, totals())
+
+
+class NotificationInboxTests(TestCase):
+    def setUp(self):
+        self.district_user = User.objects.create_user("district", password="secret")
+        self.local_user = User.objects.create_user("local", password="secret")
+        Congregation.objects.create(name="District", user=self.district_user, is_district=True)
+        self.local = Congregation.objects.create(name="Local", user=self.local_user)
+        self.other = Congregation.objects.create(name="Other")
+
+    def inbox(self, user, **params):
+        self.client.force_login(user)
+        return self.client.get(reverse("core:api_notifications"), params).json()
+
+    def test_counters_follow_create_read_and_clear(self):
+        # Seed both counters before the writes so they are kept, not recounted
+        self.assertEqual(self.inbox(self.district_user)["unseen_count"], 0)
+        self.assertEqual(self.inbox(self.local_user)["unseen_count"], 0)
+        with self.captureOnCommitCallbacks(execute=True):
+            for index in range(5):
+                create_notification(self.local_user, self.local, "edit", f"Local {index}", "")
+            create_notification(self.local_user, self.other, "edit", "Other", "")
+            create_notification(None, self.other, "manual", "Direct", "", recipient=self.local_user)
+
+        local = self.inbox(self.local_user, limit=4)
+        self.assertEqual(local["unseen_count"], 6)
+        self.assertEqual([n["title"] for n in local["notifications"]], ["Direct", "Local 4", "Local 3", "Local 2"])
+        rest = self.inbox(self.local_user, limit=4, cursor=local["next_cursor"])
+        self.assertEqual([n["title"] for n in rest["notifications"]], ["Local 1", "Local 0"])
+        self.assertIsNone(rest["next_cursor"])
+        self.assertEqual(self.inbox(self.district_user)["unseen_count"], 6)
+
+        self.client.post(reverse("core:api_mark_notification_read"), {"id": local["notifications"][1]["id"]})
+        self.client.post(reverse("core:api_mark_notification_read"), {"id": local["notifications"][1]["id"]})
+        self.assertEqual(self.inbox(self.local_user)["unseen_count"], 5)
+        self.assertEqual(self.inbox(self.district_user)["unseen_count"], 5)
+
+        self.client.post(reverse("core:api_clear_notifications"), {"congregation": "Local"})
+        self.assertEqual(self.inbox(self.local_user)["unseen_count"], 1)
+        self.assertEqual(self.inbox(self.district_user)["unseen_count"], 1)
+        counted = Notification.objects.filter(is_read=False, recipient__isnull=True).count()
+        self.assertEqual(NotificationCounter.objects.get(user=self.district_user).unread, counted)
+
+    def test_first_read_seeds_a_counter_that_later_writes_adjust(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            create_notification(self.local_user, self.local, "edit", "Before", "")
+        self.assertFalse(NotificationCounter.objects.exists())
+        self.assertEqual(unread_count(self.local_user, self.local), 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            create_notification(self.local_user, self.local, "edit", "After", "")
+        self.assertEqual(NotificationCounter.objects.get(user=self.local_user).unread, 2)
+        self.assertEqual(unread_count(self.local_user, self.local), 2)
+
+    def test_batch_is_written_together_and_repeated_edits_merge(self):
+        self.inbox(self.district_user)
+
+        def edit(change):
+            create_notification(
+                self.local_user, self.local, "edit", "Edit", "Edited", change_details=change, group_key="guilder:1"
+            )
+
+        with CaptureQueriesContext(connection) as queries:
+            with batched(), self.captureOnCommitCallbacks(execute=True):
+                edit({"first_name": {"from": "Ama", "to": "Amma"}})
+                edit({"first_name": {"from": "Amma", "to": "Ama"}, "last_name": {"from": "O", "to": "Owusu"}})
+                fan_out(None, [(self.local.id, self.local_user.id), (self.other.id, None)], "manual", "All", "")
+        inserts = [query for query in queries.captured_queries if query["sql"].startswith("INSERT")]
+        self.assertEqual(len(inserts), 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            edit({"phone_number": {"from": "01", "to": "02"}})
+
+        merged = Notification.objects.get(group_key="guilder:1")
+        self.assertEqual(
+            merged.change_details,
+            {"last_name": {"from": "O", "to": "Owusu"}, "phone_number": {"from": "01", "to": "02"}},
+        )
+        self.assertEqual(Notification.objects.count(), 3)
+        self.assertEqual(self.inbox(self.district_user)["unseen_count"], 2)
+
+
+class RetentionTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("local", password="secret")
+        self.congregation = Congregation.objects.create(name="Local", user=self.user)
+        self.old = timezone.now() - timedelta(days=400)
+
+    def test_expired_rows_go_in_batches_and_counters_follow(self):
+        for index in range(5):
+            LoginAttempt.objects.create(ip_address="10.0.0.1", username=f"user{index}")
+        LoginAttempt.objects.filter(username__in=["user0", "user1", "user2"]).update(last_attempt=self.old)
+        # Still blocked, so kept however old
+        LoginAttempt.objects.filter(username="user2").update(
+            is_blocked=True, blocked_until=timezone.now() + timedelta(hours=1)
+        )
+        Notification.objects.bulk_create(
+            Notification(congregation=self.congregation, notification_type="edit", title=str(index), message="")
+            for index in range(7)
+        )
+        Notification.objects.filter(title__in="01234").update(created_at=self.old)
+        self.assertEqual(unread_count(self.user, self.congregation), 7)
+
+        self.assertEqual(compact(dry_run=True)["notifications"]["rows"], 5)
+        self.assertEqual(Notification.objects.count(), 7)
+
+        with CaptureQueriesContext(connection) as queries:
+            report = compact(["login_attempts", "notifications"], batch_size=2)
+        self.assertEqual(report["login_attempts"]["rows"], 2)
+        self.assertEqual(report["notifications"]["rows"], 5)
+        self.assertEqual(
+            sorted(LoginAttempt.objects.values_list("username", flat=True)), ["user2", "user3", "user4"]
+        )
+        self.assertEqual(unread_count(self.user, self.congregation), 2)
+        # One DELETE per batch of two
+        deletes = [query for query in queries.captured_queries if query["sql"].startswith("DELETE")]
+        self.assertEqual(len(deletes), 2 + 3)
+
+    def test_clearing_all_notifications_recounts(self):
+        self.client.force_login(self.user)
+        Notification.objects.bulk_create(
+            Notification(congregation=self.congregation, notification_type="edit", title=str(index), message="")
+            for index in range(3)
+        )
+        self.assertEqual(unread_count(self.user, self.congregation), 3)
+        self.client.post(reverse("core:api_clear_notifications"))
+        self.assertFalse(Notification.objects.exists())
+        self.assertEqual(unread_count(self.user, self.congregation), 0)
+
+
+class BirthdayTests(TestCase):
+    def setUp(self):
+        self.congregation = Congregation.objects.create(name="Local")
+        self.other = Congregation.objects.create(name="Other")
+        births = {
+            "Ama": date(2000, 12, 30),
+            "Kofi": date(1996, 2, 29),
+            "Yaw": date(1999, 1, 2),
+            "Esi": date(1998, 3, 1),
+            "Abena": date(1990, 6, 1),
+        }
+        for index, (name, born) in enumerate(births.items()):
+            Guilder.objects.create(
+                first_name=name,
+                last_name="Mensah",
+                date_of_birth=born,
+                phone_number=f"05{index:08d}",
+                congregation=self.other if name == "Yaw" else self.congregation,
+            )
+
+    def names(self, birthdays):
+        return [entry["name"].split()[0] for entry in birthdays]
+
+    def test_upcoming_wraps_the_year_and_places_leap_day_birthdays(self):
+        birthdays = upcoming_birthdays(date(2026, 12, 29), days=5)
+        self.assertEqual(self.names(birthdays), ["Ama", "Yaw"])
+        self.assertEqual(birthdays[1]["birthday"], "2027-01-02")
+        self.assertEqual(birthdays[1]["turning"], 28)
+        self.assertEqual(self.names(upcoming_birthdays(date(2026, 12, 29), 5, self.congregation)), ["Ama"])
+
+        # Kofi's birthday is February 28 when there is no 29th
+        self.assertEqual(self.names(upcoming_birthdays(date(2027, 2, 27), days=1)), ["Kofi"])
+        self.assertEqual(upcoming_birthdays(date(2027, 2, 27), days=1)[0]["birthday"], "2027-02-28")
+        self.assertEqual(self.names(upcoming_birthdays(date(2027, 3, 1), days=0)), ["Esi"])
+        self.assertEqual(self.names(upcoming_birthdays(date(2028, 2, 28), days=0)), [])
+        self.assertEqual(self.names(upcoming_birthdays(date(2028, 2, 29), days=0)), ["Kofi"])
+
+    def test_daily_run_logs_each_member_once_in_constant_queries(self):
+        today = date(2027, 2, 28)
+        Guilder.objects.create(
+            first_name="Adwoa",
+            last_name="Owusu",
+            date_of_birth=date(2001, 2, 28),
+            phone_number="0600000000",
+            congregation=self.congregation,
+        )
+        with CaptureQueriesContext(connection) as queries:
+            logs = send_birthday_messages(today)
+        self.assertEqual(sorted(log.guilder.first_name for log in logs), ["Adwoa", "Kofi"])
+        # Settings, the due members, the log insert, the queued keys and the message insert
+        statements = [query for query in queries.captured_queries if "SAVEPOINT" not in query["sql"]]
+        self.assertEqual(len(statements), 5)
+        self.assertEqual(
+            sorted(OutboundMessage.objects.values_list("recipient", flat=True)),
+            sorted(log.guilder.phone_number for log in logs),
+        )
+        self.assertIn("Kofi", BirthdayMessageLog.objects.get(guilder__first_name="Kofi").message)
+
+        self.assertEqual(send_birthday_messages(today), [])
+        self.assertEqual(BirthdayMessageLog.objects.filter(sent_date=today).count(), 2)
+        self.assertEqual(OutboundMessage.objects.count(), 2)
+
+    def test_daily_run_skips_members_logged_after_it_looked(self):
+        today = timezone.now().date()
+        kofi = Guilder.objects.get(first_name="Kofi")
+        district_user = User.objects.create_user("district", password="secret")
+        Congregation.objects.create(name="District", user=district_user, is_district=True)
+        self.client.force_login(district_user)
+        self.assertTrue(self.client.post(reverse("core:send_birthday_sms", args=[kofi.id])).json()["success"])
+        self.assertFalse(self.client.post(reverse("core:send_birthday_sms", args=[kofi.id])).json()["success"])
+
+        # As if the dashboard logged Kofi between the run's lookup and its insert
+        with mock.patch("core.birthdays.due_today", return_value=Guilder.objects.filter(pk=kofi.pk)):
+            self.assertEqual(send_birthday_messages(today), [])
+        self.assertEqual(OutboundMessage.objects.get().body, BirthdayMessageLog.objects.get(guilder=kofi).message)
+
+    def test_dashboard_sms_is_limited_to_the_callers_congregation(self):
+        local_user = User.objects.create_user("local", password="secret")
+        district_user = User.objects.create_user("district", password="secret")
+        self.congregation.user = local_user
+        self.congregation.save()
+        Congregation.objects.create(name="District", user=district_user, is_district=True)
+        ama = Guilder.objects.get(first_name="Ama")
+        yaw = Guilder.objects.get(first_name="Yaw")
+
+        def send(member):
+            return self.client.post(reverse("core:send_birthday_sms", args=[member.id]))
+
+        self.assertEqual(send(ama).status_code, 302)
+        self.client.force_login(local_user)
+        self.assertEqual(send(yaw).status_code, 403)
+        self.assertTrue(send(ama).json()["success"])
+        self.client.force_login(district_user)
+        self.assertTrue(send(yaw).json()["success"])
+        self.assertEqual(
+            sorted(OutboundMessage.objects.values_list("recipient", flat=True)),
+            sorted([ama.phone_number, yaw.phone_number]),
+        )
+
+
+class MessagingTests(TestCase):
+    def test_worker_sends_once_per_key_and_retries_temporary_failures(self):
+        with FakeSMSServer() as server, ThreadPoolExecutor(max_workers=4) as executor:
+            providers = {"fake": {"BACKEND": "core.messaging.HTTPProvider", "URL": server.url, "RATE": 1000}}
+            with override_settings(MESSAGING_PROVIDERS=providers, MESSAGING_PROVIDER="fake"):
+                for index in range(3):
+                    queue_message("manual", f"02400000{index}", f"Hello {index}", f"test:{index}")
+                queue_message("manual", "024000000", "Hello again", "test:0")
+                queue_message("manual", "024000009", "Nowhere", "test:9", provider="missing")
+                self.assertEqual(OutboundMessage.objects.count(), 4)
+
+                server.fail(1)
+                outcomes = process_batch(executor)
+                self.assertEqual(outcomes, {"sent": 2, "retry": 1, "failed": 1})
+                self.assertEqual(process_batch(executor), {})
+
+                OutboundMessage.objects.filter(status="pending").update(next_attempt_at=timezone.now())
+                self.assertEqual(process_batch(executor), {"sent": 1})
+
+        self.assertEqual(sorted(message["body"] for message in server.messages), ["Hello 0", "Hello 1", "Hello 2"])
+        sent = OutboundMessage.objects.filter(status="sent")
+        self.assertEqual(sent.count(), 3)
+        self.assertFalse(sent.filter(provider_message_id="").exists())
+        self.assertEqual(OutboundMessage.objects.get(status="failed").recipient, "024000009")
+
+    def test_attendance_reminders_go_through_the_worker_once(self):
+        sunday = date(2026, 3, 1)
+        missing = Congregation.objects.create(name="Missing")
+        submitted = Congregation.objects.create(name="Submitted")
+        SundayAttendance.objects.create(congregation=submitted, date=sunday, male_count=1, female_count=1)
+        for index, (congregation, position) in enumerate(
+            [(missing, "president"), (missing, "secretary"), (missing, "treasurer"), (submitted, "president")]
+        ):
+            Guilder.objects.create(
+                first_name=f"Exec{index}",
+                last_name="Reminder",
+                date_of_birth=date(2000, 1, 1),
+                phone_number=f"05500000{index}",
+                congregation=congregation,
+                is_executive=True,
+                executive_level="local",
+                local_executive_position=position,
+            )
+
+        with FakeSMSServer() as server, ThreadPoolExecutor(max_workers=2) as executor:
+            providers = {"fake": {"BACKEND": "core.messaging.HTTPProvider", "URL": server.url, "RATE": 1000}}
+            with override_settings(MESSAGING_PROVIDERS=providers, MESSAGING_PROVIDER="fake"):
+                for _ in range(2):
+                    call_command("send_attendance_reminders", date=sunday, stdout=io.StringIO())
+                self.assertEqual(process_batch(executor), {"sent": 2})
+
+        self.assertEqual(sorted(message["to"] for message in server.messages), ["055000000", "055000001"])
+        self.assertIn("Missing", server.messages[0]["body"])
+        self.assertIn("01 March 2026", server.messages[0]["body"])
+        self.assertEqual(set(OutboundMessage.objects.values_list("kind", flat=True)), {"attendance_reminder"})
+
+    def test_reminders_and_welcomes_are_queued(self):
+        local = Congregation.objects.create(name="Local")
+        reported = Congregation.objects.create(name="Reported")
+        sunday = date(2026, 10, 11)
+        SundayAttendance.objects.create(congregation=reported, date=sunday, male_count=1, female_count=1)
+        for index, congregation in enumerate([local, reported]):
+            Guilder.objects.create(
+                first_name="Kojo",
+                last_name="Addo",
+                date_of_birth=date(1995, 5, 5),
+                phone_number=f"02700000{index}",
+                congregation=congregation,
+                is_executive=True,
+                local_executive_position="secretary",
+            )
+        call_command("send_attendance_reminders", date=sunday, stdout=io.StringIO())
+        call_command("send_attendance_reminders", date=sunday, stdout=io.StringIO())
+        reminder = OutboundMessage.objects.get(kind="attendance_reminder")
+        self.assertEqual(reminder.recipient, "027000000")
+        self.assertIn("Local", reminder.body)
+        self.assertIn("11 October 2026", reminder.body)
+
+        SystemSettings.objects.create(
+            setting_type="welcome_message", title="Welcome", message_template="Welcome {name} to {congregation}!"
+        )
+        import_profiles(
+            [{"first_name": "Efua", "last_name": "Asante", "date_of_birth": "1999-09-09", "gender": "Female",
+              "phone_number": "0270000099", "place_of_residence": "Ho", "residential_address": "Ho",
+              "hometown": "Ho", "relative_contact": "0270000098"}],
+            congregation=local,
+        )
+        efua = Guilder.objects.get(phone_number="0270000099")
+        welcome = OutboundMessage.objects.get(kind="welcome_message")
+        self.assertEqual((welcome.recipient, welcome.body), ("0270000099", "Welcome Efua to Local!"))
+        self.assertEqual(welcome.idempotency_key, f"welcome_message:{efua.pk}")
+
+        # Re-added under the same phone number, she is a new member to welcome
+        efua.delete()
+        efua.pk = None
+        efua.save()
+        queue_welcome_messages([efua])
+        self.assertEqual(OutboundMessage.objects.filter(kind="welcome_message", recipient="0270000099").count(), 2)
+
+
+class CongregationMiddlewareTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_congregation_is_cached_until_a_congregation_save(self):
+        user = User.objects.create_user("local", password="secret")
+        congregation = Congregation.objects.create(name="Local", user=user, pin="1111")
+        self.assertEqual(congregation_for_user(user).pin, "1111")
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(congregation_for_user(user).pin, "1111")
+        self.assertEqual(len(queries), 0)
+
+        congregation.pin = "2222"
+        with self.captureOnCommitCallbacks(execute=True):
+            congregation.save(update_fields=["pin", "updated_at"])
+        self.assertEqual(congregation_for_user(user).pin, "2222")
+
+        nobody = User.objects.create_user("nobody")
+        self.assertIsNone(congregation_for_user(nobody))
+        with CaptureQueriesContext(connection) as queries:
+            self.assertIsNone(congregation_for_user(nobody))
+        self.assertEqual(len(queries), 0)
+
+
+class BackupTests(TestCase):
+    def setUp(self):
+        backup_root = tempfile.TemporaryDirectory()
+        self.addCleanup(backup_root.cleanup)
+        settings_override = override_settings(BACKUP_ROOT=backup_root.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.district_user = User.objects.create_user("district", password="secret")
+        self.local_user = User.objects.create_user("local", password="secret")
+        Congregation.objects.create(name="District", user=self.district_user, is_district=True)
+        self.local = Congregation.objects.create(name="Local", user=self.local_user)
+        self.moved = Congregation.objects.create(name="Moved")
+        for index, congregation in enumerate([self.local, self.moved]):
+            Guilder.objects.create(
+                first_name=f"Member{index}",
+                last_name="Backup",
+                date_of_birth=date(2001, 4, 9),
+                phone_number=f"07{index:08d}",
+                congregation=congregation,
+            )
+            SundayAttendance.objects.create(
+                congregation=congregation, date=date(2026, 3, 1), male_count=index, female_count=2
+            )
+
+    def restore(self):
+        return self.client.post(reverse("core:api_restore_backup"), content_type="application/json")
+
+    def test_restore_round_trip_remaps_congregations(self):
+        BirthdayMessageLog.objects.create(
+            guilder=Guilder.objects.get(first_name="Member1"), sent_date=date(2026, 4, 9), message="Happy birthday"
+        )
+        self.client.force_login(self.district_user)
+        response = self.client.post(reverse("core:api_create_backup"))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["backup_info"]["members_count"], 2)
+
+        # A congregation recreated since the backup has a new primary key
+        self.moved.delete()
+        moved = Congregation.objects.create(name="Moved")
+        Guilder.objects.filter(congregation=self.local).update(first_name="Changed")
+
+        response = self.restore()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            sorted(Guilder.objects.values_list("first_name", "congregation_id", "birth_month_day")),
+            [("Member0", self.local.pk, 409), ("Member1", moved.pk, 409)],
+        )
+        self.assertEqual(
+            sorted(SundayAttendance.objects.values_list("congregation_id", "male_count")),
+            [(self.local.pk, 0), (moved.pk, 1)],
+        )
+        self.assertEqual(AttendanceRollup.objects.filter(congregation=moved).count(), 3)
+        # The day's log survives, so the birthday run will not message Member1 again
+        log = BirthdayMessageLog.objects.get()
+        self.assertEqual((log.guilder.first_name, log.guilder.congregation_id), ("Member1", moved.pk))
+
+    def test_only_district_accounts_may_back_up_or_restore(self):
+        create_backup("manual", created_by="district")
+        for user in (None, self.local_user):
+            if user:
+                self.client.force_login(user)
+            self.assertEqual(self.client.post(reverse("core:api_create_backup")).status_code, 403)
+            self.assertEqual(self.restore().status_code, 403)
+        self.assertEqual(Guilder.objects.count(), 2)
+        self.assertFalse(Backup.objects.filter(created_by="local").exists())
+
+
+class ReportJobAccessTests(TestCase):
+    def setUp(self):
+        self.district_user = User.objects.create_user("district", password="secret")
+        self.local_user = User.objects.create_user("local", password="secret")
+        self.other_user = User.objects.create_user("other", password="secret")
+        Congregation.objects.create(name="District", user=self.district_user, is_district=True)
+        self.local = Congregation.objects.create(name="Local", user=self.local_user)
+        self.other = Congregation.objects.create(name="Other", user=self.other_user)
+
+    def export(self, **data):
+        return self.client.post(reverse("core:api_export_pdf"), data, content_type="application/json")
+
+    def test_local_reports_are_scoped_and_only_visible_to_their_congregation(self):
+        self.assertEqual(self.export(type="members").status_code, 403)
+
+        self.client.force_login(self.local_user)
+        response = self.export(type="members", congregation_id=self.other.pk)
+        self.assertEqual(response.status_code, 202)
+        job = ReportJob.objects.get(id=response.json()["job"]["id"])
+        self.assertEqual((job.congregation, job.requested_by), (self.local, self.local_user))
+
+        status_url = reverse("core:api_report_job_status", args=[job.id])
+        download_url = reverse("core:api_report_job_download", args=[job.id])
+        self.assertEqual(self.client.get(status_url).status_code, 200)
+        self.assertEqual(self.client.get(download_url).status_code, 409)
+
+        self.client.force_login(self.other_user)
+        self.assertEqual(self.client.get(status_url).status_code, 404)
+        self.assertEqual(self.client.get(download_url).status_code, 404)
+
+        self.client.force_login(self.district_user)
+        self.assertEqual(self.client.get(status_url).status_code, 200)
+        response = self.export(type="members", congregation_id=self.other.pk)
+        self.assertEqual(ReportJob.objects.get(id=response.json()["job"]["id"]).congregation, self.other)
+
+        self.client.logout()
+        self.assertEqual(self.client.get(status_url).status_code, 403)
+
+
+class MemberListTests(TestCase):
+    def test_following_next_cursor_returns_every_member_once(self):
+        congregation = Congregation.objects.create(name="Local")
+        for index in range(7):
+            Guilder.objects.create(
+                # Repeated names make the id the tie-breaker
+                first_name=f"Member{index % 3}",
+                last_name="List",
+                date_of_birth=date(2000, 1, 1),
+                phone_number=f"08{index:08d}",
+                congregation=congregation,
+            )
+
+        ids, cursor = [], None
+        while True:
+            params = {"limit": 3, "fields": "id,first_name"}
+            if cursor:
+                params["cursor"] = cursor
+            page = self.client.get(reverse("core:api_members"), params).json()
+            self.assertLessEqual(len(page["members"]), 3)
+            ids += [member["id"] for member in page["members"]]
+            cursor = page["next_cursor"]
+            if not cursor:
+                break
+
+        expected = Guilder.objects.order_by("first_name", "last_name", "id").values_list("id", flat=True)
+        self.assertEqual(ids, list(expected))
+
+    def test_congregation_must_be_an_id(self):
+        url = reverse("core:api_members")
+        self.assertEqual(self.client.get(url, {"congregation": "Local"}).status_code, 400)
+        self.assertEqual(self.client.get(url, {"congregation": "1"}).status_code, 200)
+
+
+class QuizStandingsTests(TestCase):
+    def setUp(self):
+        now = timezone.now()
+        self.quizzes = [
+            Quiz.objects.create(
+                title=f"Quiz {index}",
+                question="?",
+                option_a="a",
+                option_b="b",
+                option_c="c",
+                option_d="d",
+                correct_answer="A",
+                start_time=now - timedelta(days=2, hours=index),
+                end_time=now - timedelta(days=1, hours=index),
+            )
+            for index in range(2)
+        ]
+        self.phone = 0
+
+    def submit(self, quiz, congregation, answer="A"):
+        self.phone += 1
+        return QuizSubmission.objects.create(
+            quiz=quiz,
+            name="Submitter",
+            phone_number=f"09{self.phone:08d}",
+            congregation=congregation,
+            selected_answer=answer,
+        )
+
+    def standings(self):
+        return sorted(
+            (
+                standing.congregation,
+                standing.total_quizzes,
+                standing.total_participants,
+                standing.total_correct_answers,
+                sorted(standing.quiz_participation, key=lambda entry: entry["quiz_id"]),
+            )
+            for standing in CongregationQuizStanding.objects.all()
+        )
+
+    def assertMatchesRebuild(self):
+        incremental = self.standings()
+        rebuild_standings()
+        self.assertEqual(incremental, self.standings())
+
+    def test_incremental_standings_match_a_rebuild_after_inserts_and_deletes(self):
+        first, second = self.quizzes
+        self.submit(first, "Local")
+        lone = self.submit(first, "Other", answer="B")
+        self.assertEqual(apply_due_quizzes(), 2)
+        self.assertMatchesRebuild()
+
+        # Late submissions, including a congregation new to a quiz
+        late = self.submit(first, "Local", answer="C")
+        self.submit(second, "Local")
+        self.submit(second, "Other")
+        self.assertMatchesRebuild()
+
+        late.delete()
+        self.assertMatchesRebuild()
+
+        # The congregation's only submission to one quiz, then to any quiz
+        lone.delete()
+        self.assertMatchesRebuild()
+        QuizSubmission.objects.filter(congregation="Other").delete()
+        self.assertMatchesRebuild()
+        self.assertFalse(CongregationQuizStanding.objects.filter(congregation="Other").exists())
+
+    def test_edits_to_a_folded_quiz_reach_the_standings(self):
+        first, second = self.quizzes
+        self.submit(first, "Local")
+        self.submit(second, "Local")
+        apply_due_quizzes()
+
+        quiz = Quiz.objects.get(pk=first.pk)
+        quiz.title = "Renamed"
+        quiz.save()
+        titles = [entry["quiz_title"] for entry in CongregationQuizStanding.objects.get().quiz_participation]
+        self.assertIn("Renamed", titles)
+        self.assertMatchesRebuild()
+
+        # Moved back into the future, its results are no longer out
+        quiz.end_time = timezone.now() + timedelta(hours=1)
+        quiz.save()
+        self.assertEqual(CongregationQuizStanding.objects.get().total_quizzes, 1)
+        self.assertFalse(Quiz.objects.get(pk=first.pk).standings_applied)
+        self.assertMatchesRebuild()
+
+
+class AttendanceRollupTests(TestCase):
+    def rollup_rows(self):
+        return sorted(
+            AttendanceRollup.objects.values_list(
+                "period", "period_start", "congregation_id", "male_count", "female_count", "total_count",
+                "record_count",
+            ),
+            key=lambda row: (row[0], row[1], row[2] or 0),
+        )
+
+    def assertMatchesRebuild(self):
+        incremental = self.rollup_rows()
+        rebuild_rollups()
+        self.assertEqual(incremental, self.rollup_rows())
+        self.assertEqual({row[0] for row in incremental}, {"week", "month", "year"})
+
+    def test_signal_maintained_rollups_match_a_rebuild(self):
+        local = Congregation.objects.create(name="Local")
+        other = Congregation.objects.create(name="Other")
+        records = [
+            SundayAttendance.objects.create(congregation=local, date=day, male_count=3, female_count=4)
+            for day in (date(2025, 12, 28), date(2026, 1, 4), date(2026, 1, 11))
+        ]
+        SundayAttendance.objects.create(congregation=other, date=date(2026, 1, 4), male_count=1, female_count=1)
+        self.assertMatchesRebuild()
+
+        edited = SundayAttendance.objects.get(pk=records[1].pk)
+        edited.male_count = 10
+        edited.save()
+        self.assertMatchesRebuild()
+
+        # Moves across a year and to another congregation leave nothing behind
+        moved = SundayAttendance.objects.get(pk=records[0].pk)
+        moved.date = date(2026, 2, 1)
+        moved.save()
+        self.assertMatchesRebuild()
+        moved.congregation = other
+        moved.save()
+        self.assertMatchesRebuild()
+        self.assertFalse(AttendanceRollup.objects.filter(period="year", period_start=date(2025, 1, 1)).exists())
+
+        SundayAttendance.objects.get(pk=records[2].pk).delete()
+        self.assertMatchesRebuild()
+
+
+class CSVExportTests(TestCase):
+    def setUp(self):
+        self.district_user = User.objects.create_user("district", password="secret")
+        self.local_user = User.objects.create_user("local", password="secret")
+        Congregation.objects.create(name="District", user=self.district_user, is_district=True)
+        local = Congregation.objects.create(name="Local", user=self.local_user)
+        other = Congregation.objects.create(name="Other")
+        for index, congregation in enumerate([local, other]):
+            Guilder.objects.create(
+                first_name=f"{congregation.name}Member",
+                last_name="Export",
+                date_of_birth=date(2000, 1, 1),
+                phone_number=f"06{index:08d}",
+                congregation=congregation,
+            )
+
+    def download(self, export_type):
+        response = self.client.get(reverse("core:api_export_csv"), {"type": export_type})
+        if response.status_code != 200:
+            return response.status_code, ""
+        return response.status_code, b"".join(response.streaming_content).decode()
+
+    def test_downloads_need_a_login_a_known_type_and_stay_in_the_congregation(self):
+        self.assertEqual(self.download("members")[0], 403)
+
+        self.client.force_login(self.local_user)
+        self.assertEqual(self.download("passwords")[0], 400)
+        status, body = self.download("all")
+        self.assertEqual(status, 200)
+        self.assertIn("LocalMember", body)
+        self.assertNotIn("OtherMember", body)
+        self.assertIn("Total Members,1", body)
+
+        self.client.force_login(self.district_user)
+        status, body = self.download("members")
+        self.assertIn("LocalMember", body)
+        self.assertIn("OtherMember", body)
+
+
+class DashboardStatsTests(TestCase):
+    def setUp(self):
+        self.district_user = User.objects.create_user("district", password="secret")
+        self.local_user = User.objects.create_user("local", password="secret")
+        self.district = Congregation.objects.create(name="District", user=self.district_user, is_district=True)
+        self.local = Congregation.objects.create(name="Local", user=self.local_user)
+        other = Congregation.objects.create(name="Other")
+        members = [
+            ("Ama", "Female", "Active", self.local, {}),
+            ("Kofi", "Male", "Distant", self.local, {}),
+            ("Esi", "Female", "Active", self.local,
+             {"executive_level": "local", "local_executive_position": "President"}),
+            ("Yaw", "Male", "Active", other,
+             {"executive_level": "both", "local_executive_position": "Secretary",
+              "district_executive_position": "Treasurer"}),
+        ]
+        for index, (name, gender, status, congregation, executive) in enumerate(members):
+            Guilder.objects.create(
+                first_name=name,
+                last_name="Stats",
+                gender=gender,
+                membership_status=status,
+                date_of_birth=date(2000, 1, 1),
+                phone_number=f"01{index:08d}",
+                congregation=congregation,
+                is_executive=bool(executive),
+                **executive,
+            )
+
+    def test_local_and_district_scopes(self):
+        local = DashboardStatsService(self.local).get_stats()
+        self.assertEqual(
+            local.counters(),
+            {"total_members": 3, "total_male": 1, "total_female": 2, "active_members": 2, "distant_members": 1},
+        )
+        self.assertEqual([row["position"] for row in local.local_executives], ["President"])
+        self.assertEqual([row["name"] for row in local.members], ["Ama Stats", "Kofi Stats"])
+
+        district = DashboardStatsService(self.district).get_stats()
+        self.assertEqual(district.counters()["total_members"], 4)
+        self.assertEqual(district.counters()["total_congregations"], 3)
+        self.assertEqual(
+            [(row["position"], row["congregation"]) for row in district.district_executives],
+            [("Treasurer", "Other")],
+        )
+
+        # The JSON view serves the same numbers as the dashboard page
+        self.client.force_login(self.local_user)
+        data = self.client.get(reverse("core:api_dashboard_stats")).json()
+        self.assertEqual(data["stats"], local.counters())
+        self.assertEqual([row["name"] for row in data["executives"]], ["Esi Stats"])
+
+
+class MemberSearchTests(TestCase):
+    def setUp(self):
+        self.congregation = Congregation.objects.create(name="Local")
+        self.members = {
+            name: Guilder.objects.create(
+                first_name=name,
+                last_name="Boateng",
+                date_of_birth=date(2000, 1, 1),
+                phone_number=f"024{index:07d}",
+                congregation=self.congregation,
+            )
+            for index, name in enumerate(["Abena", "Abenaa", "Gabena", "Kwabena"])
+        }
+
+    def search(self, q):
+        response = self.client.get(reverse("core:api_member_search"), {"q": q})
+        return [row["first_name"] for row in response.json()["results"]]
+
+    def test_index_ranks_exact_then_prefix_then_substring_then_typo(self):
+        index = MemberSearchIndex()
+        ranked = [
+            Guilder.objects.get(pk=pk).first_name for _, pk in index.search("abena")
+        ]
+        self.assertEqual(ranked[:2], ["Abena", "Abenaa"])
+        self.assertEqual(set(ranked[2:]), {"Gabena", "Kwabena"})
+        self.assertEqual(
+            [Guilder.objects.get(pk=pk).first_name for _, pk in index.search("abenq")],
+            ["Abena", "Abenaa"],
+        )
+
+    def test_results_follow_member_saves_and_deletes(self):
+        self.assertIn("Abena", self.search("Abena"))
+        self.assertEqual(self.search("Serwaa"), [])
+
+        member = self.members["Abena"]
+        member.first_name = "Serwaa"
+        member.save()
+        self.assertEqual(self.search("Serwaa"), ["Serwaa"])
+        self.assertNotIn("Abena", self.search("Abena"))
+
+        member.delete()
+        self.assertEqual(self.search("Serwaa"), [])
+
+
+class BucketingTests(TestCase):
+    def test_database_buckets_match_python_period_starts(self):
+        local = Congregation.objects.create(name="Local")
+        other = Congregation.objects.create(name="Other")
+        # Sundays either side of a year end, plus a Monday starting a week
+        days = [date(2025, 12, 28), date(2026, 1, 4), date(2026, 1, 5), date(2026, 2, 1)]
+        for index, day in enumerate(days):
+            SundayAttendance.objects.create(congregation=local, date=day, male_count=index, female_count=1)
+        SundayAttendance.objects.create(congregation=other, date=days[1], male_count=5, female_count=5)
+
+        for period in PERIODS:
+            expected = {}
+            for record in SundayAttendance.objects.all():
+                key = (period_start(record.date, period), record.congregation_id)
+                total, records = expected.get(key, (0, 0))
+                expected[key] = (total + record.total_count, records + 1)
+            rows = bucketed(SundayAttendance.objects.all(), period, by_congregation=True)
+            self.assertEqual(
+                {(row["bucket"], row["congregation_id"]): (row["total"], row["records"]) for row in rows},
+                expected,
+                period,
+            )
+
+        self.assertEqual(period_start(date(2026, 1, 4), "week"), date(2025, 12, 29))
+        self.assertEqual(week_label(date(2025, 12, 29)), date(2026, 1, 4))
+        self.assertEqual(period_end(date(2025, 12, 1), "month"), date(2026, 1, 1))
+        self.assertEqual(period_end(date(2025, 12, 29), "week"), date(2026, 1, 5))
+
+
+class QuizResultsTests(TestCase):
+    def test_results_count_per_congregation_and_rank_the_fastest_correct(self):
+        now = timezone.now()
+        quizzes = [
+            Quiz.objects.create(
+                title=f"Quiz {index}",
+                question="?",
+                option_a="a",
+                option_b="b",
+                option_c="c",
+                option_d="d",
+                correct_answer="A",
+                start_time=now - timedelta(days=2),
+                end_time=now - timedelta(days=1),
+            )
+            for index in range(2)
+        ]
+        congregations = ["North", "North", "North", "South", "South", "East", "West", "North"]
+        answers = ["B", "A", "A", "A", "C", "A", "A", "A"]
+        for index, (congregation, answer) in enumerate(zip(congregations, answers)):
+            submission = QuizSubmission.objects.create(
+                quiz=quizzes[0],
+                name=f"Submitter {index}",
+                phone_number=f"02{index:08d}",
+                congregation=congregation,
+                selected_answer=answer,
+            )
+            # Submitted in reverse order of creation
+            QuizSubmission.objects.filter(pk=submission.pk).update(
+                submitted_at=now - timedelta(days=1, minutes=index)
+            )
+        QuizSubmission.objects.create(
+            quiz=quizzes[1], name="Other quiz", phone_number="0299999999", congregation="East", selected_answer="A"
+        )
+
+        first, second = quiz_results(quizzes)
+        self.assertEqual(
+            (first["total_participants"], first["correct_answers"], first["congregations_count"]), (8, 6, 4)
+        )
+        self.assertEqual(
+            [row["name"] for row in first["leaderboard"]],
+            ["Submitter 7", "Submitter 6", "Submitter 5", "Submitter 3", "Submitter 2"],
+        )
+        self.assertEqual([row["rank"] for row in first["leaderboard"]], [1, 2, 3, 4, 5])
+        self.assertEqual(
+            [(row["congregation"], row["participants"], row["success_rate"])
+             for row in first["congregation_leaderboard"]],
+            [("North", 4, 75.0), ("South", 2, 50.0), ("East", 1, 100.0)],
+        )
+        self.assertEqual([row["name"] for row in second["leaderboard"]], ["Other quiz"])
+
+
+class QuizSubmissionTests(TestCase):
+    def setUp(self):
+        now = timezone.now()
+        self.quiz = Quiz.objects.create(
+            title="Live",
+            question="?",
+            option_a="a",
+            option_b="b",
+            option_c="c",
+            option_d="d",
+            correct_answer="A",
+            start_time=now - timedelta(minutes=5),
+            end_time=now + timedelta(minutes=30),
+        )
+        answer_keys.invalidate()
+
+    def submit(self, phone_number, answer):
+        return self.client.post(
+            reverse("core:api_submit_quiz"),
+            {
+                "quiz_id": self.quiz.id,
+                "name": "Submitter",
+                "phone_number": phone_number,
+                "congregation": "Local",
+                "selected_answer": answer,
+            },
+            content_type="application/json",
+        )
+
+    def test_cached_answer_key_makes_a_submission_one_insert(self):
+        self.assertTrue(self.submit("0200000001", "A").json()["is_correct"])
+        with CaptureQueriesContext(connection) as queries:
+            response = self.submit("0200000002", "B")
+        self.assertFalse(response.json()["is_correct"])
+        statements = [query["sql"] for query in queries.captured_queries if "SAVEPOINT" not in query["sql"]]
+        self.assertEqual(len(statements), 1)
+        self.assertTrue(statements[0].startswith("INSERT"))
+
+        self.assertEqual(self.submit("0200000002", "A").status_code, 409)
+
+        # Editing the quiz drops its cached key
+        self.quiz.correct_answer = "B"
+        self.quiz.save()
+        self.assertTrue(self.submit("0200000003", "B").json()["is_correct"])
+
+    def test_buffer_writes_in_batches_and_drops_duplicates(self):
+        buffer = SubmissionBuffer(batch_size=3, interval=60)
+        self.addCleanup(buffer.flush)
+
+        def submission(phone_number):
+            return QuizSubmission(
+                quiz=self.quiz, name="Submitter", phone_number=phone_number, congregation="Local",
+                selected_answer="A", is_correct=True,
+            )
+
+        self.assertTrue(buffer.add(submission("0200000001")))
+        self.assertFalse(buffer.add(submission("0200000001")))
+        self.assertTrue(buffer.add(submission("0200000002")))
+        self.assertEqual(QuizSubmission.objects.count(), 0)
+
+        self.assertTrue(buffer.add(submission("0200000003")))
+        self.assertEqual(QuizSubmission.objects.count(), 3)
+        self.assertEqual(buffer.flush(), 0)
+
+        # Phone numbers already written are refused before they are queued
+        self.assertFalse(buffer.add(submission("0200000003")))
+
+        # Late submissions to a folded quiz reach the standings
+        self.quiz.end_time = timezone.now() - timedelta(days=1)
+        self.quiz.save()
+        fold_quiz(self.quiz)
+        self.assertTrue(buffer.add(submission("0200000004")))
+        self.assertTrue(buffer.add(submission("0200000005")))
+        # Written by another worker after this one buffered it
+        QuizSubmission.objects.create(
+            quiz=self.quiz, name="Direct", phone_number="0200000005", congregation="Local", selected_answer="B",
+        )
+        self.assertEqual(buffer.flush(), 1)
+        standing = CongregationQuizStanding.objects.get(congregation="Local")
+        self.assertEqual((standing.total_participants, standing.total_correct_answers), (5, 4))
+
+
+class QuizFeedTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        now = timezone.now()
+        self.quiz = Quiz.objects.create(
+            title="Live",
+            question="?",
+            option_a="a",
+            option_b="b",
+            option_c="c",
+            option_d="d",
+            correct_answer="A",
+            start_time=now - timedelta(minutes=5),
+            end_time=now + timedelta(minutes=30),
+        )
+
+    def poll(self, etag=None):
+        headers = {"HTTP_IF_NONE_MATCH": etag} if etag else {}
+        return self.client.get(reverse("core:api_active_quiz"), **headers)
+
+    def test_unchanged_polls_get_304_until_a_submission_or_edit(self):
+        response = self.poll()
+        self.assertEqual(response.json()["quiz"]["submissions_count"], 0)
+        etag = response["ETag"]
+
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.poll(etag).status_code, 304)
+        self.assertEqual(len(queries), 0)
+
+        QuizSubmission.objects.create(
+            quiz=self.quiz, name="Submitter", phone_number="0200000001", congregation="Local", selected_answer="A"
+        )
+        response = self.poll(etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            (response.json()["quiz"]["submissions_count"], response.json()["quiz"]["correct_submissions_count"]),
+            (1, 1),
+        )
+        etag = response["ETag"]
+
+        self.quiz.title = "Renamed"
+        self.quiz.save()
+        response = self.poll(etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["quiz"]["title"], "Renamed")
+
+
+class CachingTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        cache_stats.reset()
+
+    def test_cached_values_miss_after_their_namespace_is_bumped(self):
+        builds = []
+
+        def build():
+            builds.append(len(builds))
+            return len(builds)
+
+        self.assertEqual(cached("total", ("members",), build), 1)
+        self.assertEqual(cached("total", ("members",), build), 1)
+        self.assertEqual(cached("total", ("members",), build, key="other"), 2)
+
+        bump("attendance")
+        self.assertEqual(cached("total", ("members",), build), 1)
+        bump("members")
+        self.assertEqual(cached("total", ("members",), build), 3)
+        self.assertEqual(cache_stats.snapshot()["total"]["hits"], 2)
+        self.assertEqual(cache_stats.snapshot()["total"]["misses"], 3)
+
+    def test_stats_endpoint_is_for_district_accounts(self):
+        url = reverse("core:api_cache_stats")
+        self.assertEqual(self.client.get(url).status_code, 403)
+        local_user = User.objects.create_user("local", password="secret")
+        Congregation.objects.create(name="Local", user=local_user)
+        self.client.force_login(local_user)
+        self.assertEqual(self.client.get(url).status_code, 403)
+
+        district_user = User.objects.create_user("district", password="secret")
+        Congregation.objects.create(name="District", user=district_user, is_district=True)
+        self.client.force_login(district_user)
+        self.assertIn("stats", self.client.get(url).json())
+
+    def test_member_writes_invalidate_cached_endpoints(self):
+        congregation = Congregation.objects.create(name="Local")
+        url = reverse("core:api_analytics_detailed")
+
+        def get():
+            with CaptureQueriesContext(connection) as queries:
+                data = self.client.get(url).json()["data"]
+            return data, len(queries)
+
+        before, _ = get()
+        self.assertEqual(get(), (before, 0))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Guilder.objects.create(
+                first_name="Ama",
+                last_name="Cache",
+                gender="Female",
+                date_of_birth=date(2000, 1, 1),
+                phone_number="0300000001",
+                congregation=congregation,
+            )
+        after, queries = get()
+        self.assertNotEqual(before, after)
+        self.assertGreater(queries, 0)
+
+
+class HomeStatsSnapshotTests(TestCase):
+    def add_member(self, congregation, phone_number):
+        Guilder.objects.create(
+            first_name="Ama",
+            last_name="Home",
+            date_of_birth=date(2000, 1, 1),
+            phone_number=phone_number,
+            congregation=congregation,
+        )
+
+    def test_snapshot_is_reused_until_marked_stale(self):
+        congregation = Congregation.objects.create(name="Local")
+        self.add_member(congregation, "0400000001")
+        url = reverse("core:api_home_stats")
+        response = self.client.get(url)
+        self.assertEqual(response.json()["data"]["totalMembers"], 1)
+        etag = response["ETag"]
+
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.assertEqual(len(queries), 1)
+
+        # A write that skips the signals leaves the snapshot as it was
+        Guilder.objects.filter(congregation=congregation).update(membership_status="Distant")
+        self.assertEqual(current_snapshot().etag, etag)
+        mark_stale()
+        snapshot = current_snapshot()
+        self.assertNotEqual(snapshot.etag, etag)
+        self.assertEqual(json.loads(snapshot.payload)["data"]["activeMembers"], 0)
+
+        # Member saves mark it stale through the signals
+        self.add_member(congregation, "0400000002")
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=snapshot.etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["data"]["totalMembers"], 2)
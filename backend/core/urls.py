@@ -54,14 +54,17 @@ urlpatterns = [
     
     # API URLs
     path("api/members/", views.api_members, name="api_members"),
+    path("api/members/search/", views.api_member_search, name="api_member_search"),
     path(
         "api/attendance/stats/", views.api_attendance_stats, name="api_attendance_stats"
     ),
     path("api/attendance/log/", views.api_log_attendance, name="api_log_attendance"),
+    path("api/attendance/bulk/", views.api_bulk_attendance, name="api_bulk_attendance"),
     path("api/attendance/records/", views.api_attendance_records, name="api_attendance_records"),
     path("api/attendance/<int:attendance_id>/", views.api_update_attendance, name="api_update_attendance"),
     path("api/attendance/<int:attendance_id>/delete/", views.api_delete_attendance, name="api_delete_attendance"),
     path("api/members/add/", views.api_add_member, name="api_add_member"),
+    path("api/members/import/", views.api_import_members, name="api_import_members"),
     path("api/members/update/<int:member_id>/", views.api_update_member, name="api_update_member"),
     path("api/members/<int:member_id>/delete/", views.api_delete_member, name="api_delete_member"),
     path(
@@ -91,6 +94,8 @@ urlpatterns = [
     ),
     path("api/dashboard-stats/", views.api_dashboard_stats, name="api_dashboard_stats"),
     path("api/home-stats/", views.api_home_stats, name="api_home_stats"),
+    path("api/cache/stats/", views.api_cache_stats, name="api_cache_stats"),
+    path("api/_metrics/", views.api_metrics, name="api_metrics"),
     # Notification API URLs
     path("api/notifications/", views.api_notifications, name="api_notifications"),
     path("api/notifications/mark-read/", views.api_mark_notification_read, name="api_mark_notification_read"),
@@ -99,6 +104,7 @@ urlpatterns = [
     path("api/notifications/create-test/", views.api_create_test_notifications, name="api_create_test_notifications"),
     # Birthday SMS URLs
     path("birthdays/", views.birthday_dashboard, name="birthday_dashboard"),
+    path("api/birthdays/upcoming/", views.api_upcoming_birthdays, name="api_upcoming_birthdays"),
     path(
         "birthdays/send-sms/<int:guilder_id>/",
         views.send_birthday_sms,
@@ -110,6 +116,7 @@ urlpatterns = [
     path("api/quizzes/submit/", views.api_submit_quiz, name="api_submit_quiz"),
     path("api/quizzes/results/", views.api_quiz_results, name="api_quiz_results"),
     path("api/quizzes/results/<int:quiz_id>/", views.api_quiz_results, name="api_quiz_results_detail"),
+    path("api/quizzes/results/<int:quiz_id>/participants/", views.api_quiz_participants, name="api_quiz_participants"),
     path("api/quizzes/create/", views.api_create_quiz, name="api_create_quiz"),
     path("api/quizzes/<int:quiz_id>/end/", views.api_end_quiz, name="api_end_quiz"),
     path("api/quizzes/<int:quiz_id>/delete/", views.api_delete_quiz, name="api_delete_quiz"),
@@ -128,6 +135,8 @@ urlpatterns = [
     path('api/data/export/csv/', views.api_export_csv, name='api_export_csv'),
     path('api/data/export/excel/', views.api_export_excel, name='api_export_excel'),
     path('api/data/export/pdf/', views.api_export_pdf, name='api_export_pdf'),
+    path('api/reports/<int:job_id>/', views.api_report_job_status, name='api_report_job_status'),
+    path('api/reports/<int:job_id>/download/', views.api_report_job_download, name='api_report_job_download'),
     path('api/data/backup/create/', views.api_create_backup, name='api_create_backup'),
     path('api/data/backup/restore/', views.api_restore_backup, name='api_restore_backup'),
     path('api/data/clear/', views.api_clear_data, name='api_clear_data'),
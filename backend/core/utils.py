@@ -101,23 +101,3 @@ def get_formatted_message(setting_type, **kwargs):
             default_message = default_message.replace(f"{{{key}}}", str(value))
     
     return default_message
-
-
-def send_reminder_message(setting_type, **kwargs):
-    """
-    Send a reminder message using system settings
-    
-    Args:
-        setting_type (str): The type of setting to use
-        **kwargs: Placeholder values for the message
-    
-    Returns:
-        str: The formatted message to send
-    """
-    message = get_formatted_message(setting_type, **kwargs)
-    
-    # TODO: Integrate with SMS/email service here
-    # For now, just return the formatted message
-    print(f"Sending {setting_type} message: {message}")
-    
-    return message
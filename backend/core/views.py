@@ -1,30 +1,28 @@
-import csv
 import json
+import logging
+import os
 import re
-from collections import defaultdict
 from datetime import datetime, timedelta
-from io import BytesIO
 
+from django.conf import settings
 from django.contrib import messages
 from django.contrib.auth import update_session_auth_hash, authenticate, login, logout
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.forms import PasswordChangeForm
 from django.contrib.auth.models import User
 from django.core.paginator import Paginator
-from django.db import transaction
-from django.db.models import Avg, Count, Q, Sum
-from django.http import HttpResponse, JsonResponse
+from django.db import IntegrityError, transaction
+from django.db.models import Avg, Count, F, Q, Sum
+from django.http import FileResponse, HttpResponse, JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
+from django.urls import reverse
 from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+from django.views.decorators.cache import cache_page
 from django.views.decorators.csrf import csrf_exempt
-from django.views.decorators.http import (require_GET, require_http_methods,
-                                          require_POST)
-from reportlab.lib import colors
-from reportlab.lib.pagesizes import A4, letter
-from reportlab.lib.styles import ParagraphStyle, getSampleStyleSheet
-from reportlab.lib.units import inch
-from reportlab.platypus import (Paragraph, SimpleDocTemplate, Spacer, Table,
-                                TableStyle)
+from django.views.decorators.http import (condition, require_GET,
+                                          require_http_methods, require_POST)
 from rest_framework.decorators import api_view
 from rest_framework.response import Response
 
@@ -32,33 +30,50 @@ from .forms import (BulkGuilderForm, ChangePINForm, CongregationForm,
                     GuilderForm, NewCongregationForm, PINForm, RoleForm,
                     SearchForm, SundayAttendanceForm)
 from .models import (DISTRICT_EXECUTIVE_POSITIONS, LOCAL_EXECUTIVE_POSITIONS,
-                     BirthdayMessageLog, BulkProfileCart, Congregation,
-                     Guilder, Notification, Role, SundayAttendance, Quiz, QuizSubmission, UserProfile, LoginAttempt)
+                     AttendanceRollup, Backup, BirthdayMessageLog, BulkProfileCart,
+                     Congregation, CongregationQuizStanding, Guilder, Notification, ReportJob, Role, SundayAttendance, Quiz, QuizSubmission, UserProfile, LoginAttempt)
+from .backups import BackupError, create_backup, restore_backup
+from .birthdays import (UPCOMING_DAYS, UPCOMING_MAX_DAYS, birthday_keys, birthday_sms,
+                        upcoming_birthdays)
+from .bucketing import period_start, week_label
+from .caching import cached, stats as cache_stats
+from .exports import (
+    EXPORT_TYPES,
+    attendance_rows,
+    csv_text,
+    export_filename,
+    export_rows,
+    member_detail_rows,
+    streaming_csv_response,
+)
+from .home_stats import current_snapshot
+from .imports import (MAX_ROWS as IMPORT_MAX_ROWS, ImportFileError, import_attendance,
+                      import_profiles, read_sheet)
+from .messaging import queue_messages, queue_welcome_messages
+from .metrics import buffer as metrics_buffer, query_budget
+from .middleware import congregation_for_user, find_congregation
+from .notifications import (INBOX_MAX_PAGE_SIZE, INBOX_PAGE_SIZE, create_notification,
+                            delete_notifications, fan_out, inbox_page, mark_read,
+                            reset_counters as reset_notification_counters, unread_count)
+from .pagination import InvalidCursor, paginate_keyset, parse_page_size
+from .quiz_cache import answer_keys, buffering_enabled, submission_buffer
+from .quiz_feed import current_etag, feed_response_data
+from .quiz_results import (PARTICIPANT_ORDERING, participants, quiz_results,
+                           results_cutoff)
+from .quiz_standings import apply_due_quizzes, retire_quizzes, top_standings
+from .reports import enqueue_report, job_as_json, report_filename
+from .retention import delete_in_batches
+from .rollups import rollups
+from .search import (MAX_SEARCH_RESULTS, SEARCH_RESULT_LIMIT, filter_members,
+                     search_members)
+from .stats import CongregationMemberBreakdown, DashboardStatsService
+from .utils import get_formatted_message
+
+logger = logging.getLogger(__name__)
 
 LOGIN_RATE_LIMIT_ENABLED = True
 
 
-# Utility function to create notifications
-def create_notification(
-    user,
-    congregation,
-    notification_type,
-    title,
-    message,
-    recipient=None,
-    change_details=None,
-):
-    Notification.objects.create(
-        user=user,
-        congregation=congregation,
-        notification_type=notification_type,
-        title=title,
-        message=message,
-        recipient=recipient,
-        change_details=change_details or {},
-    )
-
-
 # Utility functions for login attempt tracking
 def get_client_ip(request):
     """Get the client's IP address"""
@@ -177,14 +192,12 @@ def api_login(request):
             
             # Try to include congregation info
             congregation_info = None
-            try:
-                congregation = Congregation.objects.get(user=user)
+            congregation = congregation_for_user(user)
+            if congregation:
                 congregation_info = {
                     'id': str(congregation.id),
                     'name': congregation.name,
                 }
-            except Congregation.DoesNotExist:
-                pass
             
             return JsonResponse({
                 'success': True,
@@ -318,39 +331,26 @@ def api_logout(request):
 
 
 # Quiz API Views
+def _feed_response(data, etag):
+    response = JsonResponse(data)
+    response['ETag'] = etag
+    # Pollers revalidate with If-None-Match on every request
+    patch_cache_control(response, no_cache=True)
+    return response
+
+
+@query_budget(2)
 @csrf_exempt
 @require_http_methods(["GET"])
+@condition(etag_func=lambda request: current_etag('list'))
 def api_quizzes(request):
     """Get all active quizzes"""
     try:
-        quizzes = Quiz.objects.filter(is_active=True).order_by('-created_at')
-        quiz_data = []
-        
-        for quiz in quizzes:
-            quiz_data.append({
-                'id': quiz.id,
-                'title': quiz.title,
-                'description': quiz.description,
-                'question': quiz.question,
-                'option_a': quiz.option_a,
-                'option_b': quiz.option_b,
-                'option_c': quiz.option_c,
-                'option_d': quiz.option_d,
-                'start_time': quiz.start_time.isoformat(),
-                'end_time': quiz.end_time.isoformat(),
-                'password': quiz.password,
-                'is_currently_active': quiz.is_currently_active,
-                'has_ended': quiz.has_ended,
-                'has_started': quiz.has_started,
-                'submissions_count': quiz.submissions.count(),
-                'correct_submissions_count': quiz.submissions.filter(is_correct=True).count(),
-                'created_at': quiz.created_at.isoformat(),
-            })
-        
-        return JsonResponse({
+        data, etag = feed_response_data('list')
+        return _feed_response({
             'success': True,
-            'quizzes': quiz_data
-        })
+            'quizzes': data['quizzes']
+        }, etag)
     except Exception as e:
         return JsonResponse({
             'success': False,
@@ -692,44 +692,18 @@ def api_quizzes(request):
         return Response({'error': str(e)}, status=500)
 
 
+@query_budget(2)
 @csrf_exempt
 @require_http_methods(["GET"])
+@condition(etag_func=lambda request: current_etag('active'))
 def api_active_quiz(request):
     """Get the currently active quiz"""
     try:
-        now = timezone.now()
-        active_quiz = Quiz.objects.filter(
-            is_active=True,
-            start_time__lte=now,
-            end_time__gte=now
-        ).first()
-        
-        if not active_quiz:
-            return JsonResponse({
-                'success': True,
-                'quiz': None
-            })
-        
-        quiz_data = {
-            'id': active_quiz.id,
-            'title': active_quiz.title,
-            'description': active_quiz.description,
-            'question': active_quiz.question,
-            'option_a': active_quiz.option_a,
-            'option_b': active_quiz.option_b,
-            'option_c': active_quiz.option_c,
-            'option_d': active_quiz.option_d,
-            'start_time': active_quiz.start_time.isoformat(),
-            'end_time': active_quiz.end_time.isoformat(),
-            'password': active_quiz.password,
-            'submissions_count': active_quiz.submissions.count(),
-            'correct_submissions_count': active_quiz.submissions.filter(is_correct=True).count(),
-        }
-        
-        return JsonResponse({
+        data, etag = feed_response_data('active')
+        return _feed_response({
             'success': True,
-            'quiz': quiz_data
-        })
+            'quiz': data['quiz']
+        }, etag)
     except Exception as e:
         return JsonResponse({
             'success': False,
@@ -740,7 +714,13 @@ def api_active_quiz(request):
 @csrf_exempt
 @require_http_methods(["POST"])
 def api_submit_quiz(request):
-    """Submit a quiz answer"""
+    """
+    Submit a quiz answer; 409 if the phone number already answered.
+
+    With QUIZ_SUBMISSION_BUFFER on, the answer is acknowledged before it is
+    written. A duplicate buffered by another worker at the same moment is
+    still acknowledged and then dropped at flush time.
+    """
     try:
         data = json.loads(request.body)
         
@@ -764,36 +744,48 @@ def api_submit_quiz(request):
                 'error': 'Invalid answer choice'
             }, status=400)
         
-        # Get quiz
-        quiz = get_object_or_404(Quiz, id=quiz_id, is_active=True)
+        # Get quiz (answer keys are cached in-process, see core.quiz_cache)
+        try:
+            key = answer_keys.get(int(quiz_id))
+        except (TypeError, ValueError):
+            key = None
+        if key is None:
+            return JsonResponse({
+                'success': False,
+                'error': 'Quiz not found'
+            }, status=404)
         
         # Check if quiz is currently active (temporarily disabled for testing)
-        # if not quiz.is_currently_active:
+        # if not key.start_time <= timezone.now() <= key.end_time:
         #     return JsonResponse({
         #         'success': False,
         #         'error': 'Quiz is not currently active'
         #     }, status=400)
         
-        # Check if phone number already submitted
-        existing_submission = QuizSubmission.objects.filter(
-            quiz=quiz,
-            phone_number=phone_number
-        ).first()
-        
-        if existing_submission:
-            return JsonResponse({
-                'success': False,
-                'error': 'You have already submitted an answer for this quiz'
-            }, status=400)
-        
-        # Create submission
-        submission = QuizSubmission.objects.create(
-            quiz=quiz,
+        submission = QuizSubmission(
+            quiz_id=key.id,
             name=name,
             phone_number=phone_number,
             congregation=congregation,
-            selected_answer=selected_answer
+            selected_answer=selected_answer,
+            is_correct=selected_answer == key.correct_answer
         )
+        already_submitted = JsonResponse({
+            'success': False,
+            'error': 'You have already submitted an answer for this quiz'
+        }, status=409)
+        
+        if buffering_enabled():
+            if not submission_buffer.add(submission):
+                return already_submitted
+        else:
+            # One submission per phone number is enforced by the unique
+            # (quiz, phone_number) constraint rather than a racy pre-check
+            try:
+                with transaction.atomic():
+                    submission.save()
+            except IntegrityError:
+                return already_submitted
         
         return JsonResponse({
             'success': True,
@@ -802,11 +794,6 @@ def api_submit_quiz(request):
             'is_correct': submission.is_correct
         })
         
-    except Quiz.DoesNotExist:
-        return JsonResponse({
-            'success': False,
-            'error': 'Quiz not found'
-        }, status=404)
     except Exception as e:
         return JsonResponse({
             'success': False,
@@ -814,20 +801,20 @@ def api_submit_quiz(request):
         }, status=500)
 
 
+@query_budget(3)
 @csrf_exempt
 @require_http_methods(["GET"])
 def api_quiz_results(request, quiz_id=None):
     """Get quiz results and statistics"""
     try:
-        now = timezone.now()
         # Results are only available 2 hours after quiz ends
-        results_cutoff = now - timedelta(hours=2)
+        cutoff = results_cutoff()
         
         if quiz_id:
             # Get specific quiz results
             quiz = get_object_or_404(Quiz, id=quiz_id)
             # Check if results are available
-            if quiz.end_time > results_cutoff:
+            if quiz.end_time > cutoff:
                 return JsonResponse({
                     'success': False,
                     'error': 'Results are not yet available. Please check back in 2 hours after the quiz ends.'
@@ -837,95 +824,12 @@ def api_quiz_results(request, quiz_id=None):
             # Get all completed quizzes with results available
             quizzes = Quiz.objects.filter(
                 is_active=True,
-                end_time__lt=results_cutoff
+                end_time__lt=cutoff
             ).order_by('-end_time')
         
-        results = []
-        
-        for quiz in quizzes:
-            submissions = quiz.submissions.all()
-            total_participants = submissions.count()
-            correct_answers = submissions.filter(is_correct=True).count()
-            incorrect_answers = submissions.filter(is_correct=False).count()
-            
-            # Get unique congregations
-            congregations = submissions.values('congregation').distinct()
-            congregations_count = congregations.count()
-            
-            # Get leaderboard (top 5)
-            leaderboard = submissions.filter(is_correct=True).order_by('submitted_at')[:5]
-            leaderboard_data = []
-            
-            for i, submission in enumerate(leaderboard):
-                leaderboard_data.append({
-                    'id': submission.id,
-                    'name': submission.name,
-                    'congregation': submission.congregation,
-                    'score': 100,  # All correct answers get 100%
-                    'time_taken': 0,  # We don't track time yet
-                    'rank': i + 1
-                })
-            
-            # Get congregation performance and leaderboard
-            congregations_data = []
-            congregation_leaderboard = []
-            
-            for cong in congregations:
-                cong_name = cong['congregation']
-                cong_submissions = submissions.filter(congregation=cong_name)
-                cong_participants = cong_submissions.count()
-                cong_correct = cong_submissions.filter(is_correct=True).count()
-                cong_average = (cong_correct / cong_participants * 100) if cong_participants > 0 else 0
-                cong_best = 100 if cong_correct > 0 else 0
-                
-                congregations_data.append({
-                    'name': cong_name,
-                    'participants': cong_participants,
-                    'average_score': round(cong_average, 1),
-                    'best_score': cong_best
-                })
-                
-                # Add to leaderboard data
-                congregation_leaderboard.append({
-                    'congregation': cong_name,
-                    'participants': cong_participants,
-                    'correct_answers': cong_correct,
-                    'success_rate': round(cong_average, 1)
-                })
-            
-            # Sort congregation leaderboard by participants (highest first)
-            congregation_leaderboard.sort(key=lambda x: x['participants'], reverse=True)
-            congregation_leaderboard = congregation_leaderboard[:3]  # Top 3
-            
-            # Add ranks to leaderboard
-            for i, item in enumerate(congregation_leaderboard):
-                item['rank'] = i + 1
-            
-            results.append({
-                'id': quiz.id,
-                'quiz_title': quiz.title,
-                'end_date': quiz.end_time.isoformat(),
-                'total_participants': total_participants,
-                'correct_answers': correct_answers,
-                'incorrect_answers': incorrect_answers,
-                'congregations_count': congregations_count,
-                'leaderboard': leaderboard_data,
-                'congregations': congregations_data,
-                'congregation_leaderboard': congregation_leaderboard,
-                'all_participants': [
-                    {
-                        'name': sub.name,
-                        'phone_number': sub.phone_number,
-                        'congregation': sub.congregation,
-                        'is_correct': sub.is_correct,
-                        'submitted_at': sub.submitted_at.isoformat()
-                    } for sub in submissions.order_by('submitted_at')
-                ]
-            })
-        
         return JsonResponse({
             'success': True,
-            'results': results
+            'results': quiz_results(quizzes)
         })
         
     except Exception as e:
@@ -935,6 +839,43 @@ def api_quiz_results(request, quiz_id=None):
         }, status=500)
 
 
+@query_budget(2)
+@csrf_exempt
+@require_http_methods(["GET"])
+def api_quiz_participants(request, quiz_id):
+    """Keyset-paginated participants of a quiz whose results are available"""
+    quiz = get_object_or_404(Quiz, id=quiz_id)
+    if quiz.end_time > results_cutoff():
+        return JsonResponse({
+            'success': False,
+            'error': 'Results are not yet available. Please check back in 2 hours after the quiz ends.'
+        })
+
+    try:
+        rows, next_cursor = paginate_keyset(
+            participants(quiz),
+            PARTICIPANT_ORDERING,
+            cursor=request.GET.get('cursor'),
+            limit=parse_page_size(request.GET.get('limit')),
+        )
+    except InvalidCursor as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=400)
+
+    return JsonResponse({
+        'success': True,
+        'participants': [
+            {
+                'name': row['name'],
+                'phone_number': row['phone_number'],
+                'congregation': row['congregation'],
+                'is_correct': row['is_correct'],
+                'submitted_at': row['submitted_at'].isoformat()
+            } for row in rows
+        ],
+        'next_cursor': next_cursor
+    })
+
+
 @csrf_exempt
 @require_http_methods(["POST"])
 def api_create_quiz(request):
@@ -1064,99 +1005,34 @@ def api_delete_quiz(request, quiz_id):
 @login_required
 def dashboard(request):
     # Check if user is district admin
-    try:
-        user_congregation = Congregation.objects.get(user=request.user)
-        is_district = user_congregation.is_district
-    except Congregation.DoesNotExist:
-        is_district = False
+    user_congregation = request.congregation or None
 
-    if is_district:
-        # District Dashboard - Show all congregations
-        congregations = Congregation.objects.all()
-        total_members = Guilder.objects.count()
-        total_male = Guilder.objects.filter(gender="Male").count()
-        total_female = Guilder.objects.filter(gender="Female").count()
-        active_members = Guilder.objects.filter(membership_status="Active").count()
-        distant_members = Guilder.objects.filter(membership_status="Distant").count()
-        total_congregations = congregations.count()
-
-        # Get executives and members for district view
-        # District executives: those with district or both level
-        district_executives = Guilder.objects.filter(
-            is_executive=True,
-            executive_level__in=["district", "both"]
-        ).order_by("district_executive_position", "first_name")
-
-        # Local executives: those with local or both level
-        local_executives = Guilder.objects.filter(
-            is_executive=True,
-            executive_level__in=["local", "both"]
-        ).order_by("congregation__name", "local_executive_position", "first_name")
-
-        members = Guilder.objects.filter(is_executive=False).order_by(
-            "first_name", "last_name"
-        )
+    stats = DashboardStatsService(user_congregation).get_stats()
 
+    if stats.is_district:
+        congregations = Congregation.objects.all()
     else:
-        # Local Dashboard - Show only user's congregation
-        congregations = [user_congregation]
-        total_members = Guilder.objects.filter(congregation=user_congregation).count()
-        total_male = Guilder.objects.filter(
-            congregation=user_congregation, gender="Male"
-        ).count()
-        total_female = Guilder.objects.filter(
-            congregation=user_congregation, gender="Female"
-        ).count()
-        active_members = Guilder.objects.filter(
-            congregation=user_congregation, membership_status="Active"
-        ).count()
-        distant_members = Guilder.objects.filter(
-            congregation=user_congregation, membership_status="Distant"
-        ).count()
-        total_congregations = 1
-
-        # Get executives and members for local view
-        # Local executives: those with local or both level from this congregation
-        executives = Guilder.objects.filter(
-            congregation=user_congregation,
-            is_executive=True,
-            executive_level__in=["local", "both"]
-        ).order_by("local_executive_position", "first_name")
-
-        members = Guilder.objects.filter(
-            congregation=user_congregation, is_executive=False
-        ).order_by("first_name", "last_name")
+        congregations = [user_congregation] if user_congregation else []
 
     context = {
         "congregations": congregations,
-        "total_members": total_members,
-        "total_male": total_male,
-        "total_female": total_female,
-        "active_members": active_members,
-        "distant_members": distant_members,
-        "total_congregations": total_congregations,
-        "is_district": is_district,
-        "user_congregation": (
-            user_congregation if "user_congregation" in locals() else None
-        ),
+        "total_congregations": stats.total_congregations,
+        "is_district": stats.is_district,
+        "user_congregation": user_congregation,
+        "members": stats.members,
+        **stats.counters(),
     }
 
-    # Add executives and members to context based on dashboard type
-    if is_district:
+    # Add executives to context based on dashboard type
+    if stats.is_district:
         context.update(
             {
-                "district_executives": district_executives,
-                "local_executives": local_executives,
-                "members": members,
+                "district_executives": stats.district_executives,
+                "local_executives": stats.local_executives,
             }
         )
     else:
-        context.update(
-            {
-                "executives": executives,
-                "members": members,
-            }
-        )
+        context["executives"] = stats.local_executives
 
     return render(request, "core/dashboard.html", context)
 
@@ -1166,12 +1042,10 @@ def congregation_dashboard(request, congregation_id):
     congregation = get_object_or_404(Congregation, id=congregation_id)
 
     # Check if user has access to this congregation
-    try:
-        user_congregation = Congregation.objects.get(user=request.user)
-        if not user_congregation.is_district and user_congregation != congregation:
-            messages.error(request, "You don't have access to this congregation.")
-            return redirect("core:dashboard")
-    except Congregation.DoesNotExist:
+    user_congregation = request.congregation
+    if not user_congregation or (
+        not user_congregation.is_district and user_congregation != congregation
+    ):
         messages.error(request, "You don't have access to this congregation.")
         return redirect("core:dashboard")
 
@@ -1200,9 +1074,8 @@ def congregation_dashboard(request, congregation_id):
 # Credential Management Views
 @login_required
 def change_pin(request):
-    try:
-        user_congregation = Congregation.objects.get(user=request.user)
-    except Congregation.DoesNotExist:
+    user_congregation = request.congregation
+    if not user_congregation:
         messages.error(request, "No congregation found for this user.")
         return redirect("core:dashboard")
 
@@ -1214,7 +1087,7 @@ def change_pin(request):
 
             if user_congregation.pin == current_pin:
                 user_congregation.pin = new_pin
-                user_congregation.save()
+                user_congregation.save(update_fields=["pin", "updated_at"])
                 messages.success(request, "PIN changed successfully!")
                 return redirect("core:dashboard")
             else:
@@ -1228,9 +1101,8 @@ def change_pin(request):
 
 @login_required
 def change_password(request):
-    try:
-        user_congregation = Congregation.objects.get(user=request.user)
-    except Congregation.DoesNotExist:
+    user_congregation = request.congregation
+    if not user_congregation:
         messages.error(request, "No congregation found for this user.")
         return redirect("core:dashboard")
 
@@ -1251,16 +1123,15 @@ def change_password(request):
 @login_required
 def create_congregation(request):
     # Only district admins can create congregations
-    try:
-        user_congregation = Congregation.objects.get(user=request.user)
-        if not user_congregation.is_district:
-            messages.error(
-                request, "Only district admins can create new congregations."
-            )
-            return redirect("core:dashboard")
-    except Congregation.DoesNotExist:
+    user_congregation = request.congregation
+    if not user_congregation:
         messages.error(request, "You don't have permission to create congregations.")
         return redirect("core:dashboard")
+    if not user_congregation.is_district:
+        messages.error(
+            request, "Only district admins can create new congregations."
+        )
+        return redirect("core:dashboard")
 
     if request.method == "POST":
         form = NewCongregationForm(request.POST)
@@ -1291,18 +1162,17 @@ def create_congregation(request):
 @login_required
 def update_theme(request):
     if request.method == "POST":
-        try:
-            user_congregation = Congregation.objects.get(user=request.user)
-            background_color = request.POST.get("background_color")
-
-            if background_color:
-                user_congregation.background_color = background_color
-                user_congregation.save()
-                return JsonResponse(
-                    {"success": True, "message": "Theme updated successfully"}
-                )
-        except Congregation.DoesNotExist:
+        user_congregation = request.congregation
+        if not user_congregation:
             return JsonResponse({"success": False, "message": "Congregation not found"})
+        background_color = request.POST.get("background_color")
+
+        if background_color:
+            user_congregation.background_color = background_color
+            user_congregation.save(update_fields=["background_color", "updated_at"])
+            return JsonResponse(
+                {"success": True, "message": "Theme updated successfully"}
+            )
 
     return JsonResponse({"success": False, "message": "Invalid request"})
 
@@ -1314,24 +1184,19 @@ def member_list(request):
     members = Guilder.objects.all()
 
     # Filter by user's congregation if not district admin
-    try:
-        user_congregation = Congregation.objects.get(user=request.user)
-        if not user_congregation.is_district:
-            members = members.filter(congregation=user_congregation)
-    except Congregation.DoesNotExist:
+    user_congregation = request.congregation
+    if not user_congregation:
         messages.error(request, "No congregation found for this user.")
         return redirect("core:dashboard")
+    if not user_congregation.is_district:
+        members = members.filter(congregation=user_congregation)
 
     if search_form.is_valid():
         search = search_form.cleaned_data.get("search")
         congregation = search_form.cleaned_data.get("congregation")
 
         if search:
-            members = members.filter(
-                Q(first_name__icontains=search)
-                | Q(last_name__icontains=search)
-                | Q(phone_number__icontains=search)
-            )
+            members = filter_members(members, search)
 
         if congregation and user_congregation.is_district:
             members = members.filter(congregation=congregation)
@@ -1350,9 +1215,8 @@ def member_list(request):
 @login_required
 @transaction.atomic
 def add_member(request):
-    try:
-        user_congregation = Congregation.objects.get(user=request.user)
-    except Congregation.DoesNotExist:
+    user_congregation = request.congregation
+    if not user_congregation:
         messages.error(request, "No congregation found for this user.")
         return redirect("core:dashboard")
 
@@ -1360,6 +1224,7 @@ def add_member(request):
         form = GuilderForm(request.POST)
         if form.is_valid():
             member = form.save()
+            queue_welcome_messages([member])
             # Notification for district
             create_notification(
                 user=request.user,
@@ -1386,17 +1251,16 @@ def add_member(request):
 @transaction.atomic
 def edit_member(request, member_id):
     member = get_object_or_404(Guilder, id=member_id)
-    try:
-        user_congregation = Congregation.objects.get(user=request.user)
-        if (
-            not user_congregation.is_district
-            and member.congregation != user_congregation
-        ):
-            messages.error(request, "You don't have permission to edit this member.")
-            return redirect("core:member_list")
-    except Congregation.DoesNotExist:
+    user_congregation = request.congregation
+    if not user_congregation:
         messages.error(request, "No congregation found for this user.")
         return redirect("core:dashboard")
+    if (
+        not user_congregation.is_district
+        and member.congregation != user_congregation
+    ):
+        messages.error(request, "You don't have permission to edit this member.")
+        return redirect("core:member_list")
 
     old_data = {
         field: getattr(member, field)
@@ -1421,6 +1285,7 @@ def edit_member(request, member_id):
                     title=f"Edit in {member.congregation.name}",
                     message=f"{member.first_name} {member.last_name} was edited by {request.user.username}.",
                     change_details=changes,
+                    group_key=f"guilder:{member.id}",
                 )
             messages.success(
                 request,
@@ -1439,17 +1304,16 @@ def member_detail(request, member_id):
     member = get_object_or_404(Guilder, id=member_id)
 
     # Check if user has permission to view this member
-    try:
-        user_congregation = Congregation.objects.get(user=request.user)
-        if (
-            not user_congregation.is_district
-            and member.congregation != user_congregation
-        ):
-            messages.error(request, "You don't have permission to view this member.")
-            return redirect("core:member_list")
-    except Congregation.DoesNotExist:
+    user_congregation = request.congregation
+    if not user_congregation:
         messages.error(request, "No congregation found for this user.")
         return redirect("core:dashboard")
+    if (
+        not user_congregation.is_district
+        and member.congregation != user_congregation
+    ):
+        messages.error(request, "You don't have permission to view this member.")
+        return redirect("core:member_list")
 
     context = {"member": member}
     return render(request, "core/member_detail.html", context)
@@ -1459,17 +1323,16 @@ def member_detail(request, member_id):
 @transaction.atomic
 def delete_member(request, member_id):
     member = get_object_or_404(Guilder, id=member_id)
-    try:
-        user_congregation = Congregation.objects.get(user=request.user)
-        if (
-            not user_congregation.is_district
-            and member.congregation != user_congregation
-        ):
-            messages.error(request, "You don't have permission to delete this member.")
-            return redirect("core:member_list")
-    except Congregation.DoesNotExist:
+    user_congregation = request.congregation
+    if not user_congregation:
         messages.error(request, "No congregation found for this user.")
         return redirect("core:dashboard")
+    if (
+        not user_congregation.is_district
+        and member.congregation != user_congregation
+    ):
+        messages.error(request, "You don't have permission to delete this member.")
+        return redirect("core:member_list")
 
     if request.method == "POST":
         pin = request.POST.get("pin")
@@ -1498,15 +1361,14 @@ def attendance_list(request):
     attendance_records = SundayAttendance.objects.all().order_by("-date")
 
     # Filter by user's congregation if not district admin
-    try:
-        user_congregation = Congregation.objects.get(user=request.user)
-        if not user_congregation.is_district:
-            attendance_records = attendance_records.filter(
-                congregation=user_congregation
-            )
-    except Congregation.DoesNotExist:
+    user_congregation = request.congregation
+    if not user_congregation:
         messages.error(request, "No congregation found for this user.")
         return redirect("core:dashboard")
+    if not user_congregation.is_district:
+        attendance_records = attendance_records.filter(
+            congregation=user_congregation
+        )
 
     paginator = Paginator(attendance_records, 20)
     page_number = request.GET.get("page")
@@ -1518,9 +1380,8 @@ def attendance_list(request):
 
 @login_required
 def log_attendance(request):
-    try:
-        user_congregation = Congregation.objects.get(user=request.user)
-    except Congregation.DoesNotExist:
+    user_congregation = request.congregation
+    if not user_congregation:
         messages.error(request, "No congregation found for this user.")
         return redirect("core:dashboard")
 
@@ -1548,13 +1409,12 @@ def attendance_analytics(request):
     congregations = Congregation.objects.all()
 
     # Filter congregations if not district admin
-    try:
-        user_congregation = Congregation.objects.get(user=request.user)
-        if not user_congregation.is_district:
-            congregations = [user_congregation]
-    except Congregation.DoesNotExist:
+    user_congregation = request.congregation
+    if not user_congregation:
         messages.error(request, "No congregation found for this user.")
         return redirect("core:dashboard")
+    if not user_congregation.is_district:
+        congregations = [user_congregation]
 
     today = timezone.now().date()
     last_sunday = today - timedelta(days=today.weekday() + 1)
@@ -1602,9 +1462,8 @@ def analytics_dashboard(request):
 # Bulk Operations
 @login_required
 def bulk_registration(request):
-    try:
-        user_congregation = Congregation.objects.get(user=request.user)
-    except Congregation.DoesNotExist:
+    user_congregation = request.congregation
+    if not user_congregation:
         messages.error(request, "No congregation found for this user.")
         return redirect("core:dashboard")
 
@@ -1650,17 +1509,26 @@ def bulk_cart(request, cart_id):
                 cart.save()
 
         elif action == "submit":
-            for profile_data in cart.profiles:
-                form = GuilderForm(profile_data)
-                if form.is_valid():
-                    form.save()
+            result = import_profiles(cart.profiles, congregation=cart.congregation)
+            if result.created:
+                messages.success(request, f"{result.created} members added successfully!")
+            if not result.errors:
+                cart.submitted = True
+                cart.save()
+                return redirect("core:member_list")
 
-            cart.submitted = True
+            # Keep the rejected profiles in the cart so they can be fixed
+            failed = result.failed_rows
+            cart.profiles = [
+                profile for row, profile in enumerate(cart.profiles, start=1) if row in failed
+            ]
             cart.save()
-            messages.success(
-                request, f"{len(cart.profiles)} members added successfully!"
-            )
-            return redirect("member_list")
+            for error in result.errors:
+                details = "; ".join(
+                    f"{name}: {' '.join(problems)}" for name, problems in error["errors"].items()
+                )
+                messages.error(request, f"Profile {error['row']} was not added ({details})")
+            return redirect("core:bulk_cart", cart.id)
 
     context = {"cart": cart}
     return render(request, "core/bulk_cart.html", context)
@@ -1669,320 +1537,186 @@ def bulk_cart(request, cart_id):
 # Export Views
 @login_required
 def export_members_csv(request):
-    response = HttpResponse(content_type="text/csv")
-    response["Content-Disposition"] = 'attachment; filename="members.csv"'
-
-    writer = csv.writer(response)
-    writer.writerow(
-        [
-            "First Name",
-            "Last Name",
-            "Phone Number",
-            "Email",
-            "Gender",
-            "Date of Birth",
-            "Congregation",
-            "Membership Status",
-            "Position",
-        ]
-    )
-
-    members = Guilder.objects.all()
+    members = Guilder.objects.order_by("first_name", "last_name", "id")
 
     # Filter by user's congregation if not district admin
-    try:
-        user_congregation = Congregation.objects.get(user=request.user)
-        if not user_congregation.is_district:
-            members = members.filter(congregation=user_congregation)
-    except Congregation.DoesNotExist:
-        return response
+    user_congregation = request.congregation
+    if not user_congregation:
+        members = members.none()
+    elif not user_congregation.is_district:
+        members = members.filter(congregation=user_congregation)
 
-    for member in members:
-        writer.writerow(
-            [
-                member.first_name,
-                member.last_name,
-                member.phone_number,
-                member.email,
-                member.gender,
-                member.date_of_birth,
-                member.congregation.name,
-                member.membership_status,
-                member.position,
-            ]
-        )
-
-    return response
+    return streaming_csv_response(member_detail_rows(members), "members.csv")
 
 
 @login_required
 def export_attendance_csv(request):
-    response = HttpResponse(content_type="text/csv")
-    response["Content-Disposition"] = 'attachment; filename="attendance.csv"'
-
-    writer = csv.writer(response)
-    writer.writerow(
-        ["Date", "Congregation", "Male Count", "Female Count", "Total Count"]
-    )
-
     attendance_records = SundayAttendance.objects.all().order_by("-date")
 
     # Filter by user's congregation if not district admin
-    try:
-        user_congregation = Congregation.objects.get(user=request.user)
-        if not user_congregation.is_district:
-            attendance_records = attendance_records.filter(
-                congregation=user_congregation
-            )
-    except Congregation.DoesNotExist:
-        return response
-
-    for record in attendance_records:
-        writer.writerow(
-            [
-                record.date,
-                record.congregation.name,
-                record.male_count,
-                record.female_count,
-                record.total_count,
-            ]
+    user_congregation = request.congregation
+    if not user_congregation:
+        attendance_records = attendance_records.none()
+    elif not user_congregation.is_district:
+        attendance_records = attendance_records.filter(
+            congregation=user_congregation
         )
 
-    return response
-
+    return streaming_csv_response(attendance_rows(attendance_records), "attendance.csv")
 
-@login_required
-def export_members_pdf(request):
-    response = HttpResponse(content_type="application/pdf")
-    response["Content-Disposition"] = 'attachment; filename="members_report.pdf"'
-
-    buffer = BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=A4)
-    elements = []
-
-    styles = getSampleStyleSheet()
-    title_style = ParagraphStyle(
-        "CustomTitle",
-        parent=styles["Heading1"],
-        fontSize=16,
-        spaceAfter=30,
-        alignment=1,
-    )
-
-    # Title
-    title = Paragraph("YPG Members Report", title_style)
-    elements.append(title)
-    elements.append(Spacer(1, 20))
-
-    # Get members data
-    members = Guilder.objects.all().order_by("congregation__name", "first_name")
 
+def _pdf_report_download(request, report_type):
+    """Serve the PDF if it is already built for the current data, else queue it"""
     # Filter by user's congregation if not district admin
-    try:
-        user_congregation = Congregation.objects.get(user=request.user)
-        if not user_congregation.is_district:
-            members = members.filter(congregation=user_congregation)
-    except Congregation.DoesNotExist:
-        return response
+    user_congregation = request.congregation
+    if not user_congregation:
+        messages.error(request, "No congregation is linked to your account.")
+        return redirect("core:dashboard")
 
-    # Prepare table data
-    data = [["Name", "Phone", "Congregation", "Status", "Gender"]]
-
-    for member in members:
-        data.append(
-            [
-                f"{member.first_name} {member.last_name}",
-                member.phone_number,
-                member.congregation.name,
-                member.membership_status,
-                member.gender,
-            ]
+    congregation_id = None if user_congregation.is_district else user_congregation.id
+    job = enqueue_report(report_type, congregation_id, request.user)
+    if job.status == "done":
+        return FileResponse(
+            open(job.file_path, "rb"),
+            as_attachment=True,
+            filename=report_filename(job),
+            content_type="application/pdf",
         )
 
-    # Create table
-    table = Table(data)
-    table.setStyle(
-        TableStyle(
-            [
-                ("BACKGROUND", (0, 0), (-1, 0), colors.grey),
-                ("TEXTCOLOR", (0, 0), (-1, 0), colors.whitesmoke),
-                ("ALIGN", (0, 0), (-1, -1), "CENTER"),
-                ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
-                ("FONTSIZE", (0, 0), (-1, 0), 12),
-                ("BOTTOMPADDING", (0, 0), (-1, 0), 12),
-                ("BACKGROUND", (0, 1), (-1, -1), colors.beige),
-                ("TEXTCOLOR", (0, 1), (-1, -1), colors.black),
-                ("FONTNAME", (0, 1), (-1, -1), "Helvetica"),
-                ("FONTSIZE", (0, 1), (-1, -1), 10),
-                ("GRID", (0, 0), (-1, -1), 1, colors.black),
-                ("ALIGN", (0, 0), (-1, -1), "LEFT"),
-            ]
-        )
+    messages.info(
+        request, "Your report is being prepared. Try the download again in a moment."
     )
+    return redirect("core:dashboard")
 
-    elements.append(table)
-
-    # Build PDF
-    doc.build(elements)
-    pdf = buffer.getvalue()
-    buffer.close()
 
-    response.write(pdf)
-    return response
+@login_required
+def export_members_pdf(request):
+    return _pdf_report_download(request, "members")
 
 
 @login_required
 def export_attendance_pdf(request):
-    response = HttpResponse(content_type="application/pdf")
-    response["Content-Disposition"] = 'attachment; filename="attendance_report.pdf"'
-
-    buffer = BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=A4)
-    elements = []
-
-    styles = getSampleStyleSheet()
-    title_style = ParagraphStyle(
-        "CustomTitle",
-        parent=styles["Heading1"],
-        fontSize=16,
-        spaceAfter=30,
-        alignment=1,
-    )
-
-    # Title
-    title = Paragraph("YPG Attendance Report", title_style)
-    elements.append(title)
-    elements.append(Spacer(1, 20))
-
-    # Get attendance data
-    attendance_records = SundayAttendance.objects.all().order_by("-date")
-
-    # Filter by user's congregation if not district admin
-    try:
-        user_congregation = Congregation.objects.get(user=request.user)
-        if not user_congregation.is_district:
-            attendance_records = attendance_records.filter(
-                congregation=user_congregation
-            )
-    except Congregation.DoesNotExist:
-        return response
-
-    # Prepare table data
-    data = [["Date", "Congregation", "Male", "Female", "Total"]]
-
-    for record in attendance_records:
-        data.append(
-            [
-                record.date.strftime("%Y-%m-%d"),
-                record.congregation.name,
-                str(record.male_count),
-                str(record.female_count),
-                str(record.total_count),
-            ]
-        )
-
-    # Create table
-    table = Table(data)
-    table.setStyle(
-        TableStyle(
-            [
-                ("BACKGROUND", (0, 0), (-1, 0), colors.grey),
-                ("TEXTCOLOR", (0, 0), (-1, 0), colors.whitesmoke),
-                ("ALIGN", (0, 0), (-1, -1), "CENTER"),
-                ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
-                ("FONTSIZE", (0, 0), (-1, 0), 12),
-                ("BOTTOMPADDING", (0, 0), (-1, 0), 12),
-                ("BACKGROUND", (0, 1), (-1, -1), colors.beige),
-                ("TEXTCOLOR", (0, 1), (-1, -1), colors.black),
-                ("FONTNAME", (0, 1), (-1, -1), "Helvetica"),
-                ("FONTSIZE", (0, 1), (-1, -1), 10),
-                ("GRID", (0, 0), (-1, -1), 1, colors.black),
-                ("ALIGN", (0, 0), (-1, -1), "LEFT"),
-            ]
-        )
-    )
-
-    elements.append(table)
-
-    # Build PDF
-    doc.build(elements)
-    pdf = buffer.getvalue()
-    buffer.close()
-
-    response.write(pdf)
-    return response
+    return _pdf_report_download(request, "attendance")
 
 
 # API Views
+MEMBER_API_FIELDS = (
+    "id",
+    "first_name",
+    "last_name",
+    "phone_number",
+    "email",
+    "gender",
+    "congregation",
+    "membership_status",
+    "position",
+    "date_of_birth",
+    "place_of_residence",
+    "residential_address",
+    "hometown",
+    "relative_contact",
+    "profession",
+    "is_baptized",
+    "is_confirmed",
+    "is_communicant",
+    "is_executive",
+    "executive_position",
+    "executive_level",
+    "local_executive_position",
+    "district_executive_position",
+)
+MEMBER_API_ORDERING = ("first_name", "last_name", "id")
+
+
+@query_budget(1)
 @csrf_exempt
 @require_http_methods(["GET"])
 def api_members(request):
+    """
+    Keyset-paginated member list.
+
+    Query parameters: ``congregation`` (id), ``search``, ``gender``,
+    ``membership_status``, ``is_executive``, ``executive_level``,
+    ``fields`` (comma-separated projection), ``limit`` and ``cursor``
+    (the ``next_cursor`` of the previous page).
+    """
     congregation_id = request.GET.get("congregation")
+    if congregation_id:
+        try:
+            congregation_id = int(congregation_id)
+        except ValueError:
+            return JsonResponse({"error": "congregation must be a whole number"}, status=400)
     search = request.GET.get("search")
-    
-    print(f"api_members - congregation_id: {congregation_id}, type: {type(congregation_id)}")
-    print(f"api_members - search: {search}")
+
+    requested = request.GET.get("fields")
+    if requested:
+        fields = [f.strip() for f in requested.split(",") if f.strip()]
+        unknown = [f for f in fields if f not in MEMBER_API_FIELDS]
+        if unknown:
+            return JsonResponse(
+                {"error": f"Unknown fields: {', '.join(unknown)}"}, status=400
+            )
+    else:
+        fields = list(MEMBER_API_FIELDS)
 
     members = Guilder.objects.all()
 
     if congregation_id:
-        print(f"Filtering by congregation_id: {congregation_id}")
-        
-        # Debug: Show all congregations and their IDs
-        from .models import Congregation
-        all_congregations = Congregation.objects.all()
-        print("All congregations in database:")
-        for cong in all_congregations:
-            print(f"  ID: {cong.id}, Name: {cong.name}")
-        
         members = members.filter(congregation_id=congregation_id)
-        print(f"Filtered members count: {members.count()}")
-        
-        # Debug: Show which members were found
-        for member in members:
-            print(f"  Member: {member.first_name} {member.last_name}, Congregation: {member.congregation.name} (ID: {member.congregation.id})")
 
     if search:
-        members = members.filter(
-            Q(first_name__icontains=search)
-            | Q(last_name__icontains=search)
-            | Q(phone_number__icontains=search)
+        members = filter_members(members, search)
+
+    for param in ("gender", "membership_status", "executive_level"):
+        value = request.GET.get(param)
+        if value:
+            members = members.filter(**{param: value})
+
+    is_executive = request.GET.get("is_executive")
+    if is_executive:
+        members = members.filter(is_executive=is_executive.lower() in ("1", "true", "yes"))
+
+    columns = {f for f in fields if f != "congregation"} | set(MEMBER_API_ORDERING)
+    projection = {}
+    if "congregation" in fields:
+        projection["congregation_name"] = F("congregation__name")
+
+    try:
+        rows, next_cursor = paginate_keyset(
+            members.values(*columns, **projection),
+            MEMBER_API_ORDERING,
+            cursor=request.GET.get("cursor"),
+            limit=parse_page_size(request.GET.get("limit")),
         )
+    except InvalidCursor as e:
+        return JsonResponse({"error": str(e)}, status=400)
 
     data = []
-    for member in members:
-        member_data = {
-            "id": member.id,
-            "first_name": member.first_name,
-            "last_name": member.last_name,
-            "phone_number": member.phone_number,
-            "email": member.email,
-            "gender": member.gender,
-            "congregation": member.congregation.name,
-            "membership_status": member.membership_status,
-            "position": member.position,
-            "date_of_birth": member.date_of_birth,
-            "place_of_residence": member.place_of_residence,
-            "residential_address": member.residential_address,
-            "hometown": member.hometown,
-            "relative_contact": member.relative_contact,
-            "profession": member.profession,
-            "is_baptized": member.is_baptized,
-            "is_confirmed": member.is_confirmed,
-            "is_communicant": member.is_communicant,
-            "is_executive": member.is_executive,
-            "executive_position": member.executive_position,
-            "executive_level": member.executive_level,
-            "local_executive_position": member.local_executive_position,
-            "district_executive_position": member.district_executive_position,
-        }
-        data.append(member_data)
-        
-        # Debug: Print first member's data
-        if len(data) == 1:
-            print(f"API Debug - First member data: {member_data}")
+    for row in rows:
+        row["congregation"] = row.pop("congregation_name", None)
+        data.append({field: row[field] for field in fields})
+
+    return JsonResponse({"members": data, "next_cursor": next_cursor})
+
+
+@csrf_exempt
+@require_http_methods(["GET"])
+def api_member_search(request):
+    """Ranked type-ahead member search (``q``, ``congregation``, ``limit``)"""
+    term = request.GET.get("q", "").strip()
+    congregation_id = request.GET.get("congregation")
+
+    try:
+        limit = parse_page_size(
+            request.GET.get("limit"), default=SEARCH_RESULT_LIMIT, maximum=MAX_SEARCH_RESULTS
+        )
+        congregation_id = int(congregation_id) if congregation_id else None
+    except (InvalidCursor, ValueError):
+        return JsonResponse({"error": "Invalid search parameters"}, status=400)
 
-    return JsonResponse({"members": data})
+    return JsonResponse(
+        {"query": term, "results": search_members(term, limit, congregation_id)}
+    )
 
 
 @csrf_exempt
@@ -2011,16 +1745,16 @@ def api_add_member(request):
         data = json.loads(request.body)
         
         # Debug: Print the received data
-        print(f"api_add_member - Received data: {data}")
+        logger.debug("api_add_member - Received data: %s", data)
         
         # Handle congregation name to ID conversion
         if data.get("congregation") and isinstance(data.get("congregation"), str):
             try:
                 congregation = Congregation.objects.get(name=data["congregation"])
                 data["congregation"] = congregation.id
-                print(f"api_add_member - Converted congregation name to ID: {congregation.id}")
+                logger.debug("api_add_member - Converted congregation name to ID: %s", congregation.id)
             except Congregation.DoesNotExist:
-                print(f"api_add_member - Congregation not found: {data['congregation']}")
+                logger.info("api_add_member - Congregation not found: %s", data['congregation'])
                 return JsonResponse({
                     "success": False, 
                     "error": f"Congregation '{data['congregation']}' not found"
@@ -2051,7 +1785,8 @@ def api_add_member(request):
 
         if form.is_valid():
             member = form.save()
-            print(f"api_add_member - Member saved successfully with ID: {member.id}")
+            queue_welcome_messages([member])
+            logger.debug("api_add_member - Member saved successfully with ID: %s", member.id)
             return JsonResponse(
                 {
                     "success": True,
@@ -2060,13 +1795,59 @@ def api_add_member(request):
                 }
             )
         else:
-            print(f"api_add_member - Form validation failed: {form.errors}")
+            logger.warning("api_add_member - Form validation failed: %s", form.errors)
             return JsonResponse({"success": False, "errors": form.errors}, status=400)
 
     except json.JSONDecodeError:
         return JsonResponse({"success": False, "error": "Invalid JSON"}, status=400)
 
 
+@require_http_methods(["POST"])
+def api_import_members(request):
+    """
+    Import members from an uploaded .csv or .xlsx sheet (``file``); the
+    request must carry the CSRF token in X-CSRFToken
+    """
+    user_congregation = request.congregation
+    if not user_congregation:
+        return JsonResponse(
+            {"success": False, "error": "User not associated with any congregation"}, status=400
+        )
+    upload = request.FILES.get("file")
+    if upload is None:
+        return JsonResponse({"success": False, "error": "No file uploaded"}, status=400)
+
+    try:
+        profiles = read_sheet(upload)
+    except ImportFileError as e:
+        return JsonResponse({"success": False, "error": str(e)}, status=400)
+
+    # District accounts import into the congregation named on each row (or
+    # congregation_id); local accounts only into their own
+    if user_congregation.is_district:
+        congregation_id = request.POST.get("congregation_id", "")
+        default = (
+            Congregation.objects.filter(id=congregation_id).first()
+            if congregation_id.isdigit()
+            else None
+        )
+        allowed = None
+    else:
+        default = allowed = user_congregation
+
+    result = import_profiles(
+        profiles,
+        congregation=default,
+        allowed=allowed,
+        dry_run=request.POST.get("dry_run") in ("1", "true"),
+    )
+    logger.info(
+        "api_import_members - %s rows, %s created, %s rejected",
+        result.total, result.created, len(result.failed_rows),
+    )
+    return JsonResponse(result.as_json())
+
+
 @csrf_exempt
 @require_http_methods(["PUT"])
 def api_update_member(request, member_id):
@@ -2074,7 +1855,7 @@ def api_update_member(request, member_id):
         data = json.loads(request.body)
         
         # Debug: Print the received data
-        print(f"api_update_member - Received data for member {member_id}: {data}")
+        logger.debug("api_update_member - Received data for member %s: %s", member_id, data)
         
         # Get the member to update
         try:
@@ -2090,9 +1871,9 @@ def api_update_member(request, member_id):
             try:
                 congregation = Congregation.objects.get(name=data["congregation"])
                 data["congregation"] = congregation.id
-                print(f"api_update_member - Converted congregation name to ID: {congregation.id}")
+                logger.debug("api_update_member - Converted congregation name to ID: %s", congregation.id)
             except Congregation.DoesNotExist:
-                print(f"api_update_member - Congregation not found: {data['congregation']}")
+                logger.info("api_update_member - Congregation not found: %s", data['congregation'])
                 return JsonResponse({
                     "success": False, 
                     "error": f"Congregation '{data['congregation']}' not found"
@@ -2123,7 +1904,7 @@ def api_update_member(request, member_id):
 
         if form.is_valid():
             updated_member = form.save()
-            print(f"api_update_member - Member updated successfully with ID: {updated_member.id}")
+            logger.debug("api_update_member - Member updated successfully with ID: %s", updated_member.id)
             return JsonResponse(
                 {
                     "success": True,
@@ -2132,7 +1913,7 @@ def api_update_member(request, member_id):
                 }
             )
         else:
-            print(f"api_update_member - Form validation failed: {form.errors}")
+            logger.warning("api_update_member - Form validation failed: %s", form.errors)
             return JsonResponse({"success": False, "errors": form.errors}, status=400)
 
     except json.JSONDecodeError:
@@ -2144,7 +1925,7 @@ def api_update_member(request, member_id):
 def api_delete_member(request, member_id):
     """API endpoint for deleting a member"""
     try:
-        print(f"api_delete_member called for member_id: {member_id}")
+        logger.debug("api_delete_member called for member_id: %s", member_id)
         
         # Get the member to delete
         try:
@@ -2183,70 +1964,50 @@ def api_attendance_chart_data(request):
     end_date = timezone.now().date()
     start_date = end_date - timedelta(weeks=weeks)
 
-    if congregation_id:
-        attendance_records = SundayAttendance.objects.filter(
-            congregation_id=congregation_id, date__gte=start_date, date__lte=end_date
-        ).order_by("date")
-    else:
-        attendance_records = SundayAttendance.objects.filter(
-            date__gte=start_date, date__lte=end_date
-        ).order_by("date")
-
-    # Group by date and sum totals
-    attendance_by_date = defaultdict(int)
-    for record in attendance_records:
-        attendance_by_date[record.date.strftime("%Y-%m-%d")] += record.total_count
+    weekly = rollups("week", congregation_id, start_date, end_date).values_list(
+        "period_start", "total_count"
+    )
 
-    dates = sorted(attendance_by_date.keys())
-    totals = [attendance_by_date[date] for date in dates]
+    dates = []
+    totals = []
+    for start, total in weekly:
+        dates.append(week_label(start).strftime("%Y-%m-%d"))
+        totals.append(total)
 
     return JsonResponse({"labels": dates, "data": totals, "weeks": weeks})
 
 
+@query_budget(1)
 @csrf_exempt
 @require_http_methods(["GET"])
 def api_congregation_pie_data(request):
     """API endpoint for congregation distribution pie chart"""
-    congregations = Congregation.objects.all()
-
     labels = []
     data = []
     colors = []
 
-    for congregation in congregations:
-        member_count = Guilder.objects.filter(congregation=congregation).count()
-        if member_count > 0:
-            labels.append(congregation.name)
-            data.append(member_count)
-            colors.append(congregation.background_color)
+    for row in CongregationMemberBreakdown().rows():
+        if row["members"] > 0:
+            labels.append(row["name"])
+            data.append(row["members"])
+            colors.append(row["background_color"])
 
     return JsonResponse({"labels": labels, "data": data, "colors": colors})
 
 
+@query_budget(1)
 @csrf_exempt
 @require_http_methods(["GET"])
 def api_gender_distribution(request):
     """API endpoint for gender distribution histogram"""
-    congregations = Congregation.objects.all()
-
-    labels = []
-    male_data = []
-    female_data = []
-
-    for congregation in congregations:
-        labels.append(congregation.name)
-        male_count = Guilder.objects.filter(
-            congregation=congregation, gender="Male"
-        ).count()
-        female_count = Guilder.objects.filter(
-            congregation=congregation, gender="Female"
-        ).count()
-
-        male_data.append(male_count)
-        female_data.append(female_count)
+    rows = CongregationMemberBreakdown().rows()
 
     return JsonResponse(
-        {"labels": labels, "male_data": male_data, "female_data": female_data}
+        {
+            "labels": [row["name"] for row in rows],
+            "male_data": [row["male"] for row in rows],
+            "female_data": [row["female"] for row in rows],
+        }
     )
 
 
@@ -2260,30 +2021,24 @@ def api_attendance_trends(request):
     end_date = timezone.now().date()
     start_date = end_date - timedelta(days=months * 30)
 
-    if congregation_id:
-        attendance_records = SundayAttendance.objects.filter(
-            congregation_id=congregation_id, date__gte=start_date, date__lte=end_date
-        ).order_by("date")
-    else:
-        attendance_records = SundayAttendance.objects.filter(
-            date__gte=start_date, date__lte=end_date
-        ).order_by("date")
-
-    # Group by month
-    monthly_data = defaultdict(list)
-    for record in attendance_records:
-        month_key = record.date.strftime("%Y-%m")
-        monthly_data[month_key].append(record.total_count)
+    monthly = rollups("month", congregation_id, start_date, end_date).values_list(
+        "period_start", "total_count", "record_count"
+    )
 
-    # Calculate averages
-    months = sorted(monthly_data.keys())
-    averages = [sum(monthly_data[month]) / len(monthly_data[month]) for month in months]
+    # Average attendance per record within each month
+    months = []
+    averages = []
+    for start, total, records in monthly:
+        months.append(start.strftime("%Y-%m"))
+        averages.append(total / records)
 
     return JsonResponse({"labels": months, "data": averages, "months": months})
 
 
+@query_budget(0)
 @csrf_exempt
 @require_http_methods(["GET"])
+@cache_page(60 * 60)
 def api_executive_positions(request):
     """API endpoint for executive positions"""
     return JsonResponse(
@@ -2294,143 +2049,60 @@ def api_executive_positions(request):
     )
 
 
+def _operators_only(request):
+    """A 403 response unless a district or staff account is logged in, else None"""
+    user_congregation = request.congregation
+    if request.user.is_staff or (user_congregation and user_congregation.is_district):
+        return None
+    return JsonResponse({
+        'success': False,
+        'error': 'Only district or staff accounts can view worker statistics'
+    }, status=403)
+
+
+@csrf_exempt
+@require_http_methods(["GET"])
+def api_cache_stats(request):
+    """Cache hit/miss counts and latencies recorded by this worker"""
+    denied = _operators_only(request)
+    if denied:
+        return denied
+    return JsonResponse({
+        'success': True,
+        'backend': settings.CACHES['default']['BACKEND'],
+        'pid': os.getpid(),
+        'stats': cache_stats.snapshot(),
+    })
+
+
+@csrf_exempt
+@require_http_methods(["GET"])
+def api_metrics(request):
+    """Per-endpoint query/latency percentiles recorded by this worker"""
+    denied = _operators_only(request)
+    if denied:
+        return denied
+    return JsonResponse({
+        'success': True,
+        'pid': os.getpid(),
+        'endpoints': metrics_buffer.summary(),
+    })
+
+
+# District accounts also count the congregations
+@query_budget(7)
 @csrf_exempt
 @require_http_methods(["GET"])
 def api_dashboard_stats(request):
     """API endpoint for dashboard statistics"""
-    try:
-        user_congregation = Congregation.objects.get(user=request.user)
-        is_district = user_congregation.is_district
-    except Congregation.DoesNotExist:
+    user_congregation = request.congregation
+    if not user_congregation:
         return JsonResponse(
             {"error": "User not associated with any congregation"}, status=400
         )
 
-    if is_district:
-        # District stats
-        total_members = Guilder.objects.count()
-        total_male = Guilder.objects.filter(gender="Male").count()
-        total_female = Guilder.objects.filter(gender="Female").count()
-        active_members = Guilder.objects.filter(membership_status="Active").count()
-        distant_members = Guilder.objects.filter(membership_status="Distant").count()
-        total_congregations = Congregation.objects.count()
-
-        # Get executives and members for district view
-        # District executives: those with district or both level
-        district_executives = Guilder.objects.filter(
-            is_executive=True,
-            executive_level__in=["district", "both"]
-        ).order_by("district_executive_position", "first_name")
-
-        # Local executives: those with local or both level
-        local_executives = Guilder.objects.filter(
-            is_executive=True,
-            executive_level__in=["local", "both"]
-        ).order_by("congregation__name", "local_executive_position", "first_name")
-
-        members = Guilder.objects.filter(is_executive=False).order_by(
-            "first_name", "last_name"
-        )
-
-        return JsonResponse(
-            {
-                "is_district": True,
-                "stats": {
-                    "total_members": total_members,
-                    "total_male": total_male,
-                    "total_female": total_female,
-                    "active_members": active_members,
-                    "distant_members": distant_members,
-                    "total_congregations": total_congregations,
-                },
-                "district_executives": [
-                    {
-                        "id": exec.id,
-                        "name": f"{exec.first_name} {exec.last_name}",
-                        "position": exec.district_executive_position or exec.executive_position,
-                        "congregation": exec.congregation.name,
-                        "level": exec.executive_level,
-                    }
-                    for exec in district_executives
-                ],
-                "local_executives": [
-                    {
-                        "id": exec.id,
-                        "name": f"{exec.first_name} {exec.last_name}",
-                        "position": exec.local_executive_position or exec.executive_position,
-                        "congregation": exec.congregation.name,
-                        "level": exec.executive_level,
-                    }
-                    for exec in local_executives
-                ],
-                "members": [
-                    {
-                        "id": member.id,
-                        "name": f"{member.first_name} {member.last_name}",
-                        "congregation": member.congregation.name,
-                        "status": member.membership_status,
-                    }
-                    for member in members
-                ],
-            }
-        )
-    else:
-        # Local stats
-        total_members = Guilder.objects.filter(congregation=user_congregation).count()
-        total_male = Guilder.objects.filter(
-            congregation=user_congregation, gender="Male"
-        ).count()
-        total_female = Guilder.objects.filter(
-            congregation=user_congregation, gender="Female"
-        ).count()
-        active_members = Guilder.objects.filter(
-            congregation=user_congregation, membership_status="Active"
-        ).count()
-        distant_members = Guilder.objects.filter(
-            congregation=user_congregation, membership_status="Distant"
-        ).count()
-
-        # Get executives and members
-        # Local executives: those with local or both level from this congregation
-        executives = Guilder.objects.filter(
-            congregation=user_congregation,
-            is_executive=True,
-            executive_level__in=["local", "both"]
-        ).order_by("local_executive_position", "first_name")
-
-        members = Guilder.objects.filter(
-            congregation=user_congregation, is_executive=False
-        ).order_by("first_name", "last_name")
-
-        return JsonResponse(
-            {
-                "is_district": False,
-                "stats": {
-                    "total_members": total_members,
-                    "total_male": total_male,
-                    "total_female": total_female,
-                    "active_members": active_members,
-                    "distant_members": distant_members,
-                },
-                "executives": [
-                    {
-                        "id": exec.id,
-                        "name": f"{exec.first_name} {exec.last_name}",
-                        "position": exec.local_executive_position or exec.executive_position,
-                        "level": exec.executive_level,
-                    }
-                    for exec in executives
-                ],
-                "members": [
-                    {
-                        "id": member.id,
-                        "name": f"{member.first_name} {member.last_name}",
-                        "status": member.membership_status,
-                    }
-                    for member in members
-                ],
-            }
-        )
+    stats = DashboardStatsService(user_congregation).get_stats()
+    return JsonResponse(stats.as_json())
 
 
 # Birthday SMS Views
@@ -2438,42 +2110,99 @@ def api_dashboard_stats(request):
 def birthday_dashboard(request):
     today = timezone.now().date()
     birthdays_today = Guilder.objects.filter(
-        date_of_birth__month=today.month, date_of_birth__day=today.day
-    )
+        birth_month_day__in=birthday_keys(today)
+    ).select_related("congregation")
 
-    sent_messages = BirthdayMessageLog.objects.filter(sent_date=today)
+    sent_messages = BirthdayMessageLog.objects.filter(sent_date=today).select_related("guilder")
 
     context = {"birthdays_today": birthdays_today, "sent_messages": sent_messages}
     return render(request, "core/birthday_dashboard.html", context)
 
 
+@login_required
 def send_birthday_sms(request, guilder_id):
     guilder = get_object_or_404(Guilder, id=guilder_id)
     today = timezone.now().date()
 
-    # Check if message already sent today
-    if BirthdayMessageLog.objects.filter(guilder=guilder, sent_date=today).exists():
-        return JsonResponse({"success": False, "message": "SMS already sent today"})
+    # Local accounts only message their own members
+    user_congregation = request.congregation
+    if not user_congregation or (
+        not user_congregation.is_district and guilder.congregation_id != user_congregation.pk
+    ):
+        return JsonResponse(
+            {"success": False, "message": "You can only message members of your congregation"}, status=403
+        )
 
-    # TODO: Integrate with Twilio or SMS provider
-    message = (
-        f"Happy Birthday {guilder.first_name}! May God bless you abundantly. - YPG"
-    )
+    message = get_formatted_message("birthday_message", name=guilder.first_name)
 
-    # Log the message
-    BirthdayMessageLog.objects.create(guilder=guilder, sent_date=today, message=message)
+    # Log the message and queue it for the message worker; the unique
+    # (guilder, sent_date) log makes it one per member a day
+    with transaction.atomic():
+        log, created = BirthdayMessageLog.objects.get_or_create(
+            guilder=guilder, sent_date=today, defaults={"message": message}
+        )
+        if not created:
+            return JsonResponse({"success": False, "message": "SMS already sent today"})
+        queue_messages([birthday_sms(log)])
+
+    return JsonResponse({"success": True, "message": "Birthday SMS queued for sending"})
+
+
+@csrf_exempt
+@require_http_methods(["GET"])
+@query_budget(4)
+def api_upcoming_birthdays(request):
+    """Members with a birthday in the next ``days`` days (default 7), soonest first"""
+    user_congregation = request.congregation
+    if not user_congregation:
+        return JsonResponse(
+            {"success": False, "error": "User not associated with any congregation"}, status=400
+        )
+    try:
+        days = int(request.GET.get("days", UPCOMING_DAYS))
+    except ValueError:
+        return JsonResponse({"success": False, "error": "days must be a whole number"}, status=400)
+    days = max(0, min(days, UPCOMING_MAX_DAYS))
 
-    return JsonResponse({"success": True, "message": "Birthday SMS sent successfully"})
+    # Local accounts only see their own congregation
+    congregation = None if user_congregation.is_district else user_congregation
+    today = timezone.now().date()
+    return JsonResponse({
+        "success": True,
+        "today": today.isoformat(),
+        "days": days,
+        "birthdays": upcoming_birthdays(today, days, congregation),
+    })
 
 
 # --- Notification API Endpoints ---
+# Four queries per poll; the budget covers the first read, which locks and seeds the counter
+@query_budget(10)
 @require_GET
 def api_notifications(request):
-    # For now, return empty notifications to prevent errors
-    # This can be implemented later when notification system is needed
+    """One page of the account's inbox, newest first, with its unread total"""
+    user_congregation = request.congregation
+    if not user_congregation:
+        return JsonResponse({"notifications": [], "unseen_count": 0, "next_cursor": None})
+
+    try:
+        limit = parse_page_size(
+            request.GET.get("limit"), default=INBOX_PAGE_SIZE, maximum=INBOX_MAX_PAGE_SIZE
+        )
+        notifications, next_cursor = inbox_page(
+            request.user,
+            user_congregation,
+            cursor=request.GET.get("cursor"),
+            limit=limit,
+            unread_only=request.GET.get("unread") in ("1", "true"),
+        )
+    except InvalidCursor as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
     return JsonResponse({
-        "notifications": [], 
-        "unseen_count": 0
+        "notifications": notifications,
+        "unseen_count": unread_count(request.user, user_congregation),
+        "next_cursor": next_cursor,
     })
 
 
@@ -2481,23 +2210,17 @@ def api_notifications(request):
 def api_mark_notification_read(request):
     notif_id = request.POST.get("id")
     congregation_name = request.POST.get("congregation")
-    
-    try:
-        # Filter by congregation if specified
-        if congregation_name:
-            notif = Notification.objects.get(
-                id=notif_id, 
-                congregation__name=congregation_name
-            )
-        else:
-            notif = Notification.objects.get(id=notif_id)
-            
-        notif.is_read = True
-        notif.save()
-        return JsonResponse({"success": True})
-    except Notification.DoesNotExist:
+
+    notifications = Notification.objects.filter(id=notif_id)
+    # Filter by congregation if specified
+    if congregation_name:
+        notifications = notifications.filter(congregation__name=congregation_name)
+    if not notifications.exists():
         return JsonResponse({"success": False, "error": "Notification not found"})
 
+    mark_read(notifications)
+    return JsonResponse({"success": True})
+
 
 @require_POST
 def api_clear_notifications(request):
@@ -2505,13 +2228,17 @@ def api_clear_notifications(request):
     
     try:
         # Filter by congregation if specified
+        # In batches, so no single transaction locks the whole table
         if congregation_name:
-            Notification.objects.filter(
-                congregation__name=congregation_name
-            ).delete()
+            delete_in_batches(
+                Notification.objects.filter(congregation__name=congregation_name),
+                delete_notifications,
+            )
         else:
-            # Clear all notifications if no congregation specified
-            Notification.objects.all().delete()
+            # Clear all notifications if no congregation specified; every
+            # counter would drop to zero, so they are recounted instead
+            delete_in_batches(Notification.objects.all())
+            reset_notification_counters()
             
         return JsonResponse({"success": True})
     except Exception as e:
@@ -2529,6 +2256,12 @@ def api_send_manual_notification(request):
 
         # Create a system notification
         try:
+            if target == "all":
+                # One copy in every congregation account's inbox
+                targets = Congregation.objects.exclude(user=None).values_list("id", "user_id")
+                fan_out(None, targets, "manual", title, message)
+                return JsonResponse({"success": True, "message": "Notification sent successfully"})
+
             if congregation_name:
                 congregation = Congregation.objects.get(name=congregation_name)
             else:
@@ -2743,57 +2476,10 @@ def api_get_current_pin(request):
         congregation_id = request.GET.get('congregation_id')
         congregation_name = request.GET.get('congregation_name')
         
-        print(f"Get current PIN request - Congregation ID: {congregation_id}, Congregation Name: {congregation_name}")
-        
-        # Try to get congregation - prioritize frontend-provided info
-        congregation = None
-        
-        # First, try to get congregation using ID from frontend
-        if congregation_id:
-            try:
-                # Handle special case where district ID might be "district" string
-                if congregation_id == "district":
-                    congregation = Congregation.objects.get(name="District Admin")
-                    print(f"Found district congregation by name: {congregation.name}")
-                else:
-                    congregation = Congregation.objects.get(id=congregation_id)
-                    print(f"Found congregation by ID from frontend: {congregation.name}")
-            except Congregation.DoesNotExist:
-                print(f"Congregation with ID {congregation_id} not found")
-        
-        # If not found by ID, try by name from frontend
-        if not congregation and congregation_name:
-            try:
-                congregation = Congregation.objects.get(name=congregation_name)
-                print(f"Found congregation by name from frontend: {congregation.name}")
-            except Congregation.DoesNotExist:
-                print(f"Congregation '{congregation_name}' not found in database")
-        
-        # If still not found, try authenticated user
-        if not congregation and request.user.is_authenticated:
-            try:
-                congregation = Congregation.objects.get(user=request.user)
-                print(f"Found authenticated congregation: {congregation.name}")
-            except Congregation.DoesNotExist:
-                print("No congregation found for authenticated user")
-        
-        # If still not found, try session
-        if not congregation:
-            session_congregation_id = request.session.get('congregation_id')
-            if session_congregation_id:
-                try:
-                    congregation = Congregation.objects.get(id=session_congregation_id)
-                    print(f"Found congregation from session: {congregation.name}")
-                except Congregation.DoesNotExist:
-                    print("Congregation from session not found")
+        logger.debug("Get current PIN request - Congregation ID: %s, Congregation Name: %s", congregation_id, congregation_name)
         
-        # Last resort - use first available congregation
-        if not congregation:
-            try:
-                congregation = Congregation.objects.first()
-                print(f"Using first available congregation: {congregation.name if congregation else 'None'}")
-            except:
-                print("No congregations available")
+        # Frontend-provided id/name first, then the account, session, any
+        congregation = find_congregation(request, congregation_id, congregation_name)
         
         if congregation:
             return JsonResponse({
@@ -2826,7 +2512,7 @@ def api_validate_pin(request):
         congregation_id = data.get('congregation_id')
         congregation_name = data.get('congregation_name')
         
-        print(f"PIN validation request - PIN: {pin}, Congregation ID: {congregation_id}, Congregation Name: {congregation_name}")
+        logger.debug("PIN validation request - Congregation ID: %s, Congregation Name: %s", congregation_id, congregation_name)
         
         if not pin:
             return JsonResponse({
@@ -2834,66 +2520,19 @@ def api_validate_pin(request):
                 'error': 'PIN is required'
             }, status=400)
         
-        # Try to get congregation - prioritize frontend-provided info
-        congregation = None
-        
-        # First, try to get congregation using ID from frontend
-        if congregation_id:
-            try:
-                # Handle special case where district ID might be "district" string
-                if congregation_id == "district":
-                    congregation = Congregation.objects.get(name="District Admin")
-                    print(f"Found district congregation by name: {congregation.name}")
-                else:
-                    congregation = Congregation.objects.get(id=congregation_id)
-                    print(f"Found congregation by ID from frontend: {congregation.name}")
-            except Congregation.DoesNotExist:
-                print(f"Congregation with ID {congregation_id} not found")
-        
-        # If not found by ID, try by name from frontend
-        if not congregation and congregation_name:
-            try:
-                congregation = Congregation.objects.get(name=congregation_name)
-                print(f"Found congregation by name from frontend: {congregation.name}")
-            except Congregation.DoesNotExist:
-                print(f"Congregation '{congregation_name}' not found in database")
-        
-        # If still not found, try authenticated user
-        if not congregation and request.user.is_authenticated:
-            try:
-                congregation = Congregation.objects.get(user=request.user)
-                print(f"Found authenticated congregation: {congregation.name}")
-            except Congregation.DoesNotExist:
-                print("No congregation found for authenticated user")
-        
-        # If still not found, try session
-        if not congregation:
-            session_congregation_id = request.session.get('congregation_id')
-            if session_congregation_id:
-                try:
-                    congregation = Congregation.objects.get(id=session_congregation_id)
-                    print(f"Found congregation from session: {congregation.name}")
-                except Congregation.DoesNotExist:
-                    print("Congregation from session not found")
-        
-        # Last resort - use first available congregation
-        if not congregation:
-            try:
-                congregation = Congregation.objects.first()
-                print(f"Using first available congregation: {congregation.name if congregation else 'None'}")
-            except:
-                print("No congregations available")
+        # Frontend-provided id/name first, then the account, session, any
+        congregation = find_congregation(request, congregation_id, congregation_name)
         
         if congregation:
-            print(f"Validating PIN for congregation {congregation.name}: stored PIN = '{congregation.pin}', provided PIN = '{pin}'")
+            logger.debug("Validating PIN for congregation %s", congregation.name)
             if congregation.pin == pin:
-                print("PIN validation successful")
+                logger.debug("PIN validation successful")
                 return JsonResponse({
                     'success': True,
                     'message': 'PIN is valid'
                 })
             else:
-                print("PIN validation failed - PINs don't match")
+                logger.info("PIN validation failed - PINs don't match")
                 return JsonResponse({
                     'success': False,
                     'error': 'Invalid PIN'
@@ -2901,15 +2540,15 @@ def api_validate_pin(request):
         else:
             # Fallback to session PIN or default
             session_pin = request.session.get('new_pin', '1234')
-            print(f"Using session PIN: '{session_pin}', provided PIN: '{pin}'")
+            logger.debug("Validating against the session PIN")
             if session_pin == pin:
-                print("Session PIN validation successful")
+                logger.debug("Session PIN validation successful")
                 return JsonResponse({
                     'success': True,
                     'message': 'PIN is valid'
                 })
             else:
-                print("Session PIN validation failed")
+                logger.info("Session PIN validation failed")
                 return JsonResponse({
                     'success': False,
                     'error': 'Invalid PIN'
@@ -3116,7 +2755,7 @@ def api_settings_security(request):
             
             # Handle PIN change
             if data.get('newPin'):
-                print(f"PIN change request - Current PIN: {data.get('currentPin')}, New PIN: {data.get('newPin')}")
+                logger.debug("PIN change request")
                 
                 if not re.match(r'^\d{4}$', data['newPin']):
                     return JsonResponse({
@@ -3142,7 +2781,7 @@ def api_settings_security(request):
                     congregation_id = data.get('congregation_id')
                     congregation_name = data.get('congregation_name')
                     
-                    print(f"PIN change - Congregation ID: {congregation_id}, Congregation Name: {congregation_name}")
+                    logger.debug("PIN change - Congregation ID: %s, Congregation Name: %s", congregation_id, congregation_name)
                     
                     # Try to get congregation - prioritize frontend-provided info
                     congregation = None
@@ -3153,46 +2792,45 @@ def api_settings_security(request):
                             # Handle special case where district ID might be "district" string
                             if congregation_id == "district":
                                 congregation = Congregation.objects.get(name="District Admin")
-                                print(f"Found district congregation by name for PIN change: {congregation.name}")
+                                logger.debug("Found district congregation by name for PIN change: %s", congregation.name)
                             else:
                                 congregation = Congregation.objects.get(id=congregation_id)
-                                print(f"Found congregation by ID for PIN change: {congregation.name}")
+                                logger.debug("Found congregation by ID for PIN change: %s", congregation.name)
                         except Congregation.DoesNotExist:
-                            print(f"Congregation with ID {congregation_id} not found for PIN change")
+                            logger.info("Congregation with ID %s not found for PIN change", congregation_id)
                     
                     # If not found by ID, try by name from frontend
                     if not congregation and congregation_name:
                         try:
                             congregation = Congregation.objects.get(name=congregation_name)
-                            print(f"Found congregation by name for PIN change: {congregation.name}")
+                            logger.debug("Found congregation by name for PIN change: %s", congregation.name)
                         except Congregation.DoesNotExist:
-                            print(f"Congregation '{congregation_name}' not found for PIN change")
+                            logger.info("Congregation '%s' not found for PIN change", congregation_name)
                     
                     # If still not found, try authenticated user
                     if not congregation and request.user.is_authenticated:
-                        try:
-                            congregation = Congregation.objects.get(user=request.user)
-                            print(f"Found authenticated congregation for PIN change: {congregation.name}")
-                        except Congregation.DoesNotExist:
-                            print("No congregation found for authenticated user for PIN change")
+                        congregation = request.congregation or None
+                        if congregation:
+                            logger.debug("Found authenticated congregation for PIN change: %s", congregation.name)
+                        else:
+                            logger.debug("No congregation found for authenticated user for PIN change")
                     
                     if congregation:
                         # Verify current PIN before updating
                         if data.get('currentPin') and congregation.pin != data['currentPin']:
-                            print(f"Current PIN verification failed - stored: '{congregation.pin}', provided: '{data['currentPin']}'")
+                            logger.info("Current PIN verification failed for congregation %s", congregation.name)
                             return JsonResponse({
                                 'success': False,
                                 'error': 'Current PIN is incorrect'
                             }, status=400)
                         
                         # Update PIN in database
-                        print(f"Updating PIN for congregation {congregation.name} from {congregation.pin} to {data['newPin']}")
+                        logger.info("Updating PIN for congregation %s", congregation.name)
                         congregation.pin = data['newPin']
-                        congregation.save()
+                        congregation.save(update_fields=['pin', 'updated_at'])
                         
                         # Verify the PIN was saved
                         congregation.refresh_from_db()
-                        print(f"PIN after save: {congregation.pin}")
                         
                         return JsonResponse({
                             'success': True,
@@ -3205,7 +2843,7 @@ def api_settings_security(request):
                         }, status=404)
                         
                 except Exception as e:
-                    print(f"Error updating PIN: {str(e)}")
+                    logger.warning("Error updating PIN: %s", str(e))
                     return JsonResponse({
                         'success': False,
                         'error': f'Failed to update PIN: {str(e)}'
@@ -3305,10 +2943,8 @@ def api_cleanup_expired_quizzes(request):
             is_active=True
         )
         
-        cleanup_count = expired_quizzes.count()
-        
         # Deactivate expired quizzes
-        expired_quizzes.update(is_active=False)
+        cleanup_count = retire_quizzes(expired_quizzes)
         
         return JsonResponse({
             'success': True,
@@ -3328,72 +2964,26 @@ def api_cleanup_expired_quizzes(request):
 def api_congregation_quiz_stats(request):
     """Get congregation-specific quiz statistics and leaderboard"""
     try:
-        now = timezone.now()
-        results_cutoff = now - timedelta(hours=2)
-        
-        # Get all completed quizzes with results available
-        quizzes = Quiz.objects.filter(
-            is_active=True,
-            end_time__lt=results_cutoff
-        ).order_by('-end_time')
-        
-        # Aggregate congregation statistics across all quizzes
-        congregation_stats = {}
-        
-        for quiz in quizzes:
-            submissions = quiz.submissions.all()
-            
-            for submission in submissions:
-                cong_name = submission.congregation
-                
-                if cong_name not in congregation_stats:
-                    congregation_stats[cong_name] = {
-                        'name': cong_name,
-                        'total_quizzes': 0,
-                        'total_participants': 0,
-                        'total_correct_answers': 0,
-                        'quiz_participation': []
-                    }
-                
-                # Count this quiz participation
-                if quiz.id not in [q['quiz_id'] for q in congregation_stats[cong_name]['quiz_participation']]:
-                    congregation_stats[cong_name]['total_quizzes'] += 1
-                    congregation_stats[cong_name]['quiz_participation'].append({
-                        'quiz_id': quiz.id,
-                        'quiz_title': quiz.title,
-                        'participants': submissions.filter(congregation=cong_name).count(),
-                        'correct_answers': submissions.filter(congregation=cong_name, is_correct=True).count()
-                    })
-                
-                congregation_stats[cong_name]['total_participants'] += 1
-                if submission.is_correct:
-                    congregation_stats[cong_name]['total_correct_answers'] += 1
-        
-        # Calculate success rates and create leaderboard
+        # Fold in quizzes whose results became available since the last call
+        apply_due_quizzes()
+
         leaderboard = []
-        for cong_name, stats in congregation_stats.items():
-            success_rate = (stats['total_correct_answers'] / stats['total_participants'] * 100) if stats['total_participants'] > 0 else 0
-            
+        for rank, standing in enumerate(top_standings(), 1):
+            success_rate = (standing.total_correct_answers / standing.total_participants * 100) if standing.total_participants > 0 else 0
             leaderboard.append({
-                'name': cong_name,
-                'total_quizzes': stats['total_quizzes'],
-                'total_participants': stats['total_participants'],
-                'total_correct_answers': stats['total_correct_answers'],
+                'name': standing.congregation,
+                'total_quizzes': standing.total_quizzes,
+                'total_participants': standing.total_participants,
+                'total_correct_answers': standing.total_correct_answers,
                 'success_rate': round(success_rate, 1),
-                'quiz_participation': stats['quiz_participation']
+                'quiz_participation': standing.quiz_participation,
+                'rank': rank
             })
         
-        # Sort by total participants (highest first)
-        leaderboard.sort(key=lambda x: x['total_participants'], reverse=True)
-        
-        # Add ranks
-        for i, item in enumerate(leaderboard):
-            item['rank'] = i + 1
-        
         return JsonResponse({
             'success': True,
-            'leaderboard': leaderboard[:10],  # Top 10 congregations
-            'total_congregations': len(leaderboard)
+            'leaderboard': leaderboard,  # Top 10 congregations
+            'total_congregations': CongregationQuizStanding.objects.count()
         })
         
     except Exception as e:
@@ -3403,129 +2993,26 @@ def api_congregation_quiz_stats(request):
         }, status=500)
 
 
+# Served from one query; the budget covers the request that rebuilds the snapshot
+@query_budget(11)
 @csrf_exempt
 @require_http_methods(["GET"])
 def api_home_stats(request):
     """API endpoint for home page statistics - provides real data for core metrics"""
     try:
-        # Get real data from database
-        total_members = Guilder.objects.count()
-        active_members = Guilder.objects.filter(membership_status="Active").count()
-        total_male = Guilder.objects.filter(gender="Male").count()
-        total_female = Guilder.objects.filter(gender="Female").count()
-        total_congregations = Congregation.objects.filter(is_district=False).count()
-        executive_members = Guilder.objects.filter(is_executive=True).count()
-        
-        # Calculate Sunday attendance (average of recent records)
-        recent_attendance = SundayAttendance.objects.filter(
-            date__gte=timezone.now().date() - timedelta(days=30)
-        ).aggregate(
-            avg_total=Avg('total_count'),
-            total_records=Count('id')
+        snapshot = current_snapshot()
+        not_modified = get_conditional_response(
+            request, etag=snapshot.etag, last_modified=snapshot.generated_at.timestamp()
         )
-        
-        sunday_attendance = int(recent_attendance['avg_total'] or 0)
-        
-        # Calculate this week's attendance - use the most recent week with data
-        # Get the most recent attendance record to determine the current week
-        latest_attendance = SundayAttendance.objects.order_by('-date').first()
-        if latest_attendance:
-            # Calculate week start for the most recent attendance date
-            latest_date = latest_attendance.date
-            week_start = latest_date - timedelta(days=latest_date.weekday())
-            this_week_attendance = SundayAttendance.objects.filter(
-                date__gte=week_start
-            ).aggregate(
-                total=Sum('total_count')
-            )['total'] or 0
-        else:
-            this_week_attendance = 0
-        
-        # Calculate this month's attendance - use the most recent month with data
-        if latest_attendance:
-            # Calculate month start for the most recent attendance date
-            latest_date = latest_attendance.date
-            month_start = latest_date.replace(day=1)
-            this_month_attendance = SundayAttendance.objects.filter(
-                date__gte=month_start
-            ).aggregate(
-                total=Sum('total_count')
-            )['total'] or 0
-        else:
-            this_month_attendance = 0
-        
-        # Calculate growth rate (comparing last 2 weeks)
-        growth_rate = 0
-        if latest_attendance:
-            # Get the week before the most recent week
-            latest_date = latest_attendance.date
-            current_week_start = latest_date - timedelta(days=latest_date.weekday())
-            last_week_start = current_week_start - timedelta(days=7)
-            last_week_attendance = SundayAttendance.objects.filter(
-                date__gte=last_week_start,
-                date__lt=current_week_start
-            ).aggregate(
-                total=Sum('total_count')
-            )['total'] or 0
-            
-            if last_week_attendance > 0:
-                growth_rate = ((this_week_attendance - last_week_attendance) / last_week_attendance) * 100
-        
-        # Get leaderboard data (top 3 congregations by recent attendance)
-        leaderboard_data = []
-        recent_attendance_by_congregation = SundayAttendance.objects.filter(
-            date__gte=timezone.now().date() - timedelta(days=30)
-        ).values('congregation__name').annotate(
-            total_attendance=Sum('total_count'),
-            avg_attendance=Avg('total_count')
-        ).order_by('-avg_attendance')[:3]
-        
-        for i, item in enumerate(recent_attendance_by_congregation, 1):
-            leaderboard_data.append({
-                'rank': i,
-                'congregation': item['congregation__name'],
-                'total_count': int(item['avg_attendance'] or 0),
-                'male_count': 0,  # Would need to calculate from individual records
-                'female_count': 0,  # Would need to calculate from individual records
-            })
-        
-        # Get congregation list for dropdown (exclude district)
-        congregations = list(Congregation.objects.filter(is_district=False).values_list('name', flat=True).order_by('name'))
-        
-        return JsonResponse({
-            'success': True,
-            'data': {
-                # Real data
-                'totalMembers': total_members,
-                'activeMembers': active_members,
-                'totalMale': total_male,
-                'totalFemale': total_female,
-                'totalCongregations': total_congregations,
-                'sundayAttendance': sunday_attendance,
-                'executiveMembers': executive_members,
-                'thisWeekAttendance': this_week_attendance,
-                'thisMonthAttendance': this_month_attendance,
-                'growthRate': round(growth_rate, 1),
-                'leaderboardTop': leaderboard_data,
-                'congregations': congregations,
-                
-                # Hybrid data (keep as mock for now)
-                'weeklyQuiz': 35,  # Mock data
-                'totalEvents': 12,  # Mock data
-                'volunteerHours': 1850,  # Mock data
-                'bibleStudyGroups': 18,  # Mock data
-                'communityOutreach': 150,  # Mock data
-                'prayerRequests': 45,  # Mock data
-                'digitalEngagement': 85,  # Mock data
-                'leadershipTraining': 28,  # Mock data
-                'worshipTeams': 8,  # Mock data
-                'missionTrips': 3,  # Mock data
-                'smallGroups': 15,  # Mock data
-                'discipleship': 65,  # Mock data
-                'innovationScore': "A+",  # Mock data
-            }
-        })
-        
+        if not_modified is not None:
+            return not_modified
+
+        response = HttpResponse(snapshot.payload, content_type='application/json')
+        response['ETag'] = snapshot.etag
+        response['Last-Modified'] = http_date(snapshot.generated_at.timestamp())
+        patch_cache_control(response, no_cache=True)
+        return response
+
     except Exception as e:
         return JsonResponse({
             'success': False,
@@ -3854,6 +3341,59 @@ def api_log_attendance(request):
         }, status=500)
 
 
+@require_http_methods(["POST"])
+def api_bulk_attendance(request):
+    """
+    Create or update many attendance records at once, from a JSON list of
+    {congregation, date, male_count, female_count} (bare or under
+    "records") or an uploaded .csv/.xlsx ``file`` with those columns. The
+    request must carry the CSRF token in X-CSRFToken
+    """
+    user_congregation = request.congregation
+    if not user_congregation:
+        return JsonResponse(
+            {"success": False, "error": "User not associated with any congregation"}, status=400
+        )
+
+    options = request.POST
+    if request.FILES.get("file"):
+        try:
+            rows = read_sheet(request.FILES["file"])
+        except ImportFileError as e:
+            return JsonResponse({"success": False, "error": str(e)}, status=400)
+    else:
+        try:
+            data = json.loads(request.body)
+        except json.JSONDecodeError:
+            return JsonResponse({"success": False, "error": "Invalid JSON data"}, status=400)
+        options = data if isinstance(data, dict) else {}
+        rows = data.get("records") if isinstance(data, dict) else data
+        if not isinstance(rows, list) or not all(isinstance(row, dict) for row in rows):
+            return JsonResponse(
+                {"success": False, "error": "Send a list of attendance records"}, status=400
+            )
+        if len(rows) > IMPORT_MAX_ROWS:
+            return JsonResponse(
+                {"success": False, "error": f"At most {IMPORT_MAX_ROWS} records can be sent at a time"},
+                status=400,
+            )
+
+    # Same rule as the member import: local accounts only write their own
+    # congregation, which is also the default for rows that name none
+    allowed = None if user_congregation.is_district else user_congregation
+    result = import_attendance(
+        rows,
+        congregation=allowed,
+        allowed=allowed,
+        dry_run=str(options.get("dry_run", "")).lower() in ("1", "true"),
+    )
+    logger.info(
+        "api_bulk_attendance - %s rows, %s created, %s updated, %s rejected",
+        result.total, result.created, result.updated, len(result.failed_rows),
+    )
+    return JsonResponse(result.as_json())
+
+
 @csrf_exempt
 @require_http_methods(["GET"])
 def api_attendance_records(request):
@@ -3977,28 +3517,52 @@ def api_update_attendance(request, attendance_id):
 
 # ==================== DATA MANAGEMENT API ENDPOINTS ====================
 
+def _not_logged_in():
+    return JsonResponse({
+        'success': False,
+        'error': 'Log in with a congregation account first'
+    }, status=403)
+
+
+def _unknown_export_type(export_type):
+    return JsonResponse({
+        'success': False,
+        'error': f'Unknown export type: {export_type}'
+    }, status=400)
+
+
 @csrf_exempt
-@require_http_methods(["POST"])
+@require_http_methods(["GET", "POST"])
 def api_export_csv(request):
-    """API endpoint for exporting data as CSV"""
+    """
+    API endpoint for exporting data as CSV.
+
+    GET streams the file as a download (``?type=members|attendance|analytics|all``);
+    POST keeps returning the CSV inside JSON for the data management page.
+    Local accounts only export their own congregation.
+    """
+    user_congregation = request.congregation
+    if not user_congregation:
+        return _not_logged_in()
+    congregation = None if user_congregation.is_district else user_congregation
     try:
+        if request.method == "GET":
+            export_type = request.GET.get('type', 'all')
+            if export_type not in EXPORT_TYPES:
+                return _unknown_export_type(export_type)
+            return streaming_csv_response(
+                export_rows(export_type, congregation), export_filename(export_type)
+            )
+
         data = json.loads(request.body)
         export_type = data.get('type', 'all')  # all, members, attendance, analytics
-        
-        # Generate CSV data based on type
-        if export_type == 'members':
-            csv_data = generate_members_csv()
-        elif export_type == 'attendance':
-            csv_data = generate_attendance_csv()
-        elif export_type == 'analytics':
-            csv_data = generate_analytics_csv()
-        else:  # all
-            csv_data = generate_all_data_csv()
-        
+        if export_type not in EXPORT_TYPES:
+            return _unknown_export_type(export_type)
+
         return JsonResponse({
             'success': True,
-            'data': csv_data,
-            'filename': f'ypg_data_{export_type}_{timezone.now().strftime("%Y%m%d_%H%M%S")}.csv'
+            'data': csv_text(export_rows(export_type, congregation)),
+            'filename': export_filename(export_type)
         })
         
     except Exception as e:
@@ -4012,24 +3576,21 @@ def api_export_csv(request):
 @require_http_methods(["POST"])
 def api_export_excel(request):
     """API endpoint for exporting data as Excel"""
+    user_congregation = request.congregation
+    if not user_congregation:
+        return _not_logged_in()
+    congregation = None if user_congregation.is_district else user_congregation
     try:
         data = json.loads(request.body)
         export_type = data.get('type', 'all')
+        if export_type not in EXPORT_TYPES:
+            return _unknown_export_type(export_type)
         
         # For now, return CSV data (Excel export would require additional libraries)
-        if export_type == 'members':
-            csv_data = generate_members_csv()
-        elif export_type == 'attendance':
-            csv_data = generate_attendance_csv()
-        elif export_type == 'analytics':
-            csv_data = generate_analytics_csv()
-        else:
-            csv_data = generate_all_data_csv()
-        
         return JsonResponse({
             'success': True,
-            'data': csv_data,
-            'filename': f'ypg_data_{export_type}_{timezone.now().strftime("%Y%m%d_%H%M%S")}.csv',
+            'data': csv_text(export_rows(export_type, congregation)),
+            'filename': export_filename(export_type),
             'note': 'Excel export not yet implemented, returning CSV format'
         })
         
@@ -4043,18 +3604,34 @@ def api_export_excel(request):
 @csrf_exempt
 @require_http_methods(["POST"])
 def api_export_pdf(request):
-    """API endpoint for exporting data as PDF"""
+    """API endpoint for queueing a PDF report; poll the job until it is done"""
+    user_congregation = request.congregation
+    if not user_congregation:
+        return _not_logged_in()
     try:
         data = json.loads(request.body)
         export_type = data.get('type', 'all')
-        
-        # For now, return a message (PDF export would require additional libraries)
+        if export_type not in dict(ReportJob.REPORT_TYPES):
+            return JsonResponse({
+                'success': False,
+                'error': f'Unknown report type: {export_type}'
+            }, status=400)
+
+        # Local accounts only report on their own congregation
+        if user_congregation.is_district:
+            congregation_id = data.get('congregation_id') or None
+        else:
+            congregation_id = user_congregation.pk
+        job = enqueue_report(export_type, congregation_id, request.user)
+        ready = job.status == 'done'
         return JsonResponse({
             'success': True,
-            'message': f'PDF export for {export_type} data is not yet implemented',
-            'note': 'PDF export requires additional libraries like reportlab or weasyprint'
-        })
-        
+            'message': 'PDF report is ready' if ready else 'PDF report queued, it will be ready shortly',
+            'job': job_as_json(job),
+            'status_url': reverse('core:api_report_job_status', args=[job.id]),
+            'download_url': reverse('core:api_report_job_download', args=[job.id]),
+        }, status=200 if ready else 202)
+
     except Exception as e:
         return JsonResponse({
             'success': False,
@@ -4062,34 +3639,75 @@ def api_export_pdf(request):
         }, status=500)
 
 
+def _visible_report_jobs(request):
+    """Jobs the caller requested or that cover their congregation; district accounts see all"""
+    user_congregation = request.congregation
+    if user_congregation.is_district:
+        return ReportJob.objects.all()
+    return ReportJob.objects.filter(Q(requested_by=request.user) | Q(congregation=user_congregation))
+
+
+@require_GET
+def api_report_job_status(request, job_id):
+    """API endpoint for polling a queued PDF report"""
+    if not request.congregation:
+        return _not_logged_in()
+    job = get_object_or_404(_visible_report_jobs(request), id=job_id)
+    return JsonResponse({'success': True, 'job': job_as_json(job)})
+
+
+@require_GET
+def api_report_job_download(request, job_id):
+    """API endpoint for downloading a finished PDF report"""
+    if not request.congregation:
+        return _not_logged_in()
+    job = get_object_or_404(_visible_report_jobs(request), id=job_id)
+    if job.status != 'done' or not os.path.exists(job.file_path):
+        return JsonResponse({
+            'success': False,
+            'error': f'Report is not ready (status: {job.status})',
+            'job': job_as_json(job)
+        }, status=409)
+
+    return FileResponse(
+        open(job.file_path, 'rb'),
+        as_attachment=True,
+        filename=report_filename(job),
+        content_type='application/pdf',
+    )
+
+
+def _district_only(request):
+    """A 403 response unless a district account is logged in, else None"""
+    user_congregation = request.congregation
+    if not user_congregation or not user_congregation.is_district:
+        return JsonResponse({
+            'success': False,
+            'error': 'Only district accounts can manage backups'
+        }, status=403)
+    return None
+
+
 @csrf_exempt
 @require_http_methods(["POST"])
 def api_create_backup(request):
     """API endpoint for creating data backup"""
+    denied = _district_only(request)
+    if denied:
+        return denied
     try:
-        # Create backup data
-        backup_data = {
-            'timestamp': timezone.now().isoformat(),
-            'members': list(Guilder.objects.values()),
-            'attendance': list(SundayAttendance.objects.values()),
-            'congregations': list(Congregation.objects.values()),
-            'backup_type': 'manual',
-            'created_by': 'district_admin'
-        }
-        
-        # In a real implementation, this would be stored in a Backup model or file
-        # For now, we'll store it in session as a demo
-        request.session['backup_data'] = backup_data
-        request.session['backup_created_at'] = timezone.now().isoformat()
-        
+        backup = create_backup('manual', created_by=request.user.username)
+
         return JsonResponse({
             'success': True,
             'message': 'Backup created successfully',
             'backup_info': {
-                'timestamp': backup_data['timestamp'],
-                'members_count': len(backup_data['members']),
-                'attendance_count': len(backup_data['attendance']),
-                'congregations_count': len(backup_data['congregations'])
+                'id': backup.id,
+                'timestamp': backup.created_at.isoformat(),
+                'size_bytes': backup.size_bytes,
+                'members_count': backup.counts['members'],
+                'attendance_count': backup.counts['attendance'],
+                'congregations_count': backup.counts['congregations']
             }
         })
         
@@ -4100,32 +3718,42 @@ def api_create_backup(request):
         }, status=500)
 
 
-@csrf_exempt
 @require_http_methods(["POST"])
 def api_restore_backup(request):
-    """API endpoint for restoring data from backup"""
+    """API endpoint for restoring data from backup (latest unless backup_id is given)"""
+    denied = _district_only(request)
+    if denied:
+        return denied
     try:
-        # Check if backup exists
-        backup_data = request.session.get('backup_data')
-        if not backup_data:
+        data = json.loads(request.body) if request.body else {}
+        backups = Backup.objects.filter(status='complete')
+        if data.get('backup_id'):
+            backups = backups.filter(id=data['backup_id'])
+        backup = backups.first()
+        if backup is None:
             return JsonResponse({
                 'success': False,
                 'error': 'No backup found to restore'
             }, status=404)
-        
-        # In a real implementation, this would restore data from the backup
-        # For now, just return success message
+
+        restore_backup(backup)
         return JsonResponse({
             'success': True,
             'message': 'Backup restored successfully',
             'restored_info': {
-                'timestamp': backup_data['timestamp'],
-                'members_count': len(backup_data.get('members', [])),
-                'attendance_count': len(backup_data.get('attendance', [])),
-                'congregations_count': len(backup_data.get('congregations', []))
+                'id': backup.id,
+                'timestamp': backup.created_at.isoformat(),
+                'members_count': backup.counts['members'],
+                'attendance_count': backup.counts['attendance'],
+                'congregations_count': backup.counts['congregations']
             }
         })
-        
+
+    except BackupError as e:
+        return JsonResponse({
+            'success': False,
+            'error': str(e)
+        }, status=409)
     except Exception as e:
         return JsonResponse({
             'success': False,
@@ -4165,142 +3793,111 @@ def api_clear_data(request):
 
 # ==================== ANALYTICS API ====================
 
+def _analytics_data(weeks_back, months_back, years_back, end_date):
+    """Attendance trends and member breakdowns for the analytics page"""
+    # Calculate date ranges
+    weeks_start = end_date - timedelta(weeks=weeks_back)
+    months_start = end_date - timedelta(days=months_back * 30)
+    years_start = end_date - timedelta(days=years_back * 365)
+
+    # Weekly trend data (per congregation)
+    weekly_trend = []
+    weekly_attendance = AttendanceRollup.objects.filter(
+        period='week',
+        congregation__isnull=False,
+        period_start__gte=period_start(weeks_start, 'week'),
+        period_start__lte=end_date
+    ).values(
+        'period_start', 'male_count', 'female_count', 'total_count', 'congregation__name'
+    ).order_by('period_start', 'congregation__name')
+
+    for record in weekly_attendance:
+        weekly_trend.append({
+            'date': week_label(record['period_start']).strftime('%Y-%m-%d'),
+            'male': record['male_count'],
+            'female': record['female_count'],
+            'total': record['total_count'],
+            'congregation': record['congregation__name']
+        })
+
+    # Monthly trend data (district-wide)
+    monthly_trend = []
+    for record in rollups('month', start=months_start, end=end_date):
+        monthly_trend.append({
+            'date': record.period_start.strftime('%Y-%m'),
+            'male': record.male_count,
+            'female': record.female_count,
+            'total': record.total_count,
+            'congregation': 'All Congregations'
+        })
+
+    # Yearly trend data (district-wide)
+    yearly_trend = []
+    for record in rollups('year', start=years_start, end=end_date):
+        yearly_trend.append({
+            'date': str(record.period_start.year),
+            'male': record.male_count,
+            'female': record.female_count,
+            'total': record.total_count,
+            'congregation': 'All Congregations'
+        })
+
+    breakdown = CongregationMemberBreakdown(
+        Congregation.objects.filter(is_district=False)
+    ).rows()
+
+    # Gender distribution by congregation
+    gender_distribution = []
+    for row in breakdown:
+        gender_distribution.append({
+            'congregation': row['name'],
+            'male': row['male'],
+            'female': row['female'],
+            'total': row['male'] + row['female']
+        })
+
+    # Congregation member counts with active/inactive breakdown
+    congregation_data = []
+    for row in breakdown:
+        congregation_data.append({
+            'name': row['name'],
+            'members': row['members'],
+            'active_members': row['active'],
+            'inactive_members': row['distant'],
+            'color': row['background_color'] or '#4CAF50'
+        })
+
+    return {
+        'weeklyTrend': weekly_trend,
+        'monthlyTrend': monthly_trend,
+        'yearlyTrend': yearly_trend,
+        'genderDistribution': gender_distribution,
+        'congregations': congregation_data
+    }
+
+
+@query_budget(4)
 @csrf_exempt
 @require_http_methods(["GET"])
 def api_analytics_detailed(request):
     """API endpoint for detailed analytics data including trends"""
     try:
-        from datetime import datetime, timedelta
-        from django.db.models import Sum, Avg, Count
-        
         # Get date range parameters
         weeks_back = int(request.GET.get('weeks', 12))  # Default 12 weeks
         months_back = int(request.GET.get('months', 12))  # Default 12 months
         years_back = int(request.GET.get('years', 2))  # Default 2 years
         
-        # Calculate date ranges
         end_date = timezone.now().date()
-        weeks_start = end_date - timedelta(weeks=weeks_back)
-        months_start = end_date - timedelta(days=months_back * 30)
-        years_start = end_date - timedelta(days=years_back * 365)
-        
-        # Weekly trend data
-        weekly_trend = []
-        weekly_attendance = SundayAttendance.objects.filter(
-            date__gte=weeks_start,
-            date__lte=end_date
-        ).values('date', 'congregation__name').annotate(
-            male=Sum('male_count'),
-            female=Sum('female_count'),
-            total=Sum('total_count')
-        ).order_by('date')
-        
-        for record in weekly_attendance:
-            weekly_trend.append({
-                'date': record['date'].strftime('%Y-%m-%d'),
-                'male': record['male'] or 0,
-                'female': record['female'] or 0,
-                'total': record['total'] or 0,
-                'congregation': record['congregation__name']
-            })
-        
-        # Monthly trend data (aggregate by month)
-        monthly_trend = []
-        monthly_attendance = SundayAttendance.objects.filter(
-            date__gte=months_start,
-            date__lte=end_date
-        ).extra(
-            select={'year_month': "DATE_TRUNC('month', date)"}
-        ).values('year_month').annotate(
-            male=Sum('male_count'),
-            female=Sum('female_count'),
-            total=Sum('total_count')
-        ).order_by('year_month')
-        
-        for record in monthly_attendance:
-            monthly_trend.append({
-                'date': record['year_month'].strftime('%Y-%m'),
-                'male': record['male'] or 0,
-                'female': record['female'] or 0,
-                'total': record['total'] or 0,
-                'congregation': 'All Congregations'
-            })
-        
-        # Yearly trend data (aggregate by year)
-        yearly_trend = []
-        yearly_attendance = SundayAttendance.objects.filter(
-            date__gte=years_start,
-            date__lte=end_date
-        ).extra(
-            select={'year': "EXTRACT(year FROM date)"}
-        ).values('year').annotate(
-            male=Sum('male_count'),
-            female=Sum('female_count'),
-            total=Sum('total_count')
-        ).order_by('year')
-        
-        for record in yearly_attendance:
-            yearly_trend.append({
-                'date': str(int(record['year'])),
-                'male': record['male'] or 0,
-                'female': record['female'] or 0,
-                'total': record['total'] or 0,
-                'congregation': 'All Congregations'
-            })
-        
-        # Gender distribution by congregation
-        gender_distribution = []
-        congregations = Congregation.objects.filter(is_district=False)
-        
-        for congregation in congregations:
-            male_count = Guilder.objects.filter(
-                congregation=congregation,
-                gender='Male'
-            ).count()
-            female_count = Guilder.objects.filter(
-                congregation=congregation,
-                gender='Female'
-            ).count()
-            
-            gender_distribution.append({
-                'congregation': congregation.name,
-                'male': male_count,
-                'female': female_count,
-                'total': male_count + female_count
-            })
-        
-        # Congregation member counts with active/inactive breakdown
-        congregation_data = []
-        for congregation in congregations:
-            total_members = Guilder.objects.filter(congregation=congregation).count()
-            active_members = Guilder.objects.filter(
-                congregation=congregation,
-                membership_status='Active'
-            ).count()
-            inactive_members = Guilder.objects.filter(
-                congregation=congregation,
-                membership_status='Distant'
-            ).count()
-            
-            congregation_data.append({
-                'name': congregation.name,
-                'members': total_members,
-                'active_members': active_members,
-                'inactive_members': inactive_members,
-                'color': congregation.background_color or '#4CAF50'
-            })
-        
+        data = cached(
+            'analytics_detailed', ('members', 'attendance'),
+            lambda: _analytics_data(weeks_back, months_back, years_back, end_date),
+            key=f'{weeks_back}:{months_back}:{years_back}:{end_date}'
+        )
         return JsonResponse({
             'success': True,
-            'data': {
-                'weeklyTrend': weekly_trend,
-                'monthlyTrend': monthly_trend,
-                'yearlyTrend': yearly_trend,
-                'genderDistribution': gender_distribution,
-                'congregations': congregation_data
-            }
+            'data': data
         })
-        
+
     except Exception as e:
         return JsonResponse({
             'success': False,
@@ -4371,59 +3968,3 @@ def api_reminder_settings(request):
             'success': False,
             'error': str(e)
         }, status=500)
-
-
-# ==================== HELPER FUNCTIONS FOR DATA EXPORT ====================
-
-def generate_members_csv():
-    """Generate CSV data for members"""
-    members = Guilder.objects.all()
-    csv_lines = ['Name,Gender,Date of Birth,Congregation,Phone,Email,Position,Membership Status,Date Added']
-    
-    for member in members:
-        # Calculate age from date of birth
-        age = (timezone.now().date() - member.date_of_birth).days // 365
-        position = member.get_primary_executive_position() or member.position or "Member"
-        
-        csv_lines.append(f'"{member.first_name} {member.last_name}","{member.gender}","{member.date_of_birth}","{member.congregation.name}","{member.phone_number}","{member.email}","{position}","{member.membership_status}","{member.created_at.strftime("%Y-%m-%d")}"')
-    
-    return '\n'.join(csv_lines)
-
-
-def generate_attendance_csv():
-    """Generate CSV data for attendance"""
-    attendance_records = SundayAttendance.objects.all()
-    csv_lines = ['Date,Congregation,Male Count,Female Count,Total Count']
-    
-    for record in attendance_records:
-        csv_lines.append(f'"{record.date.strftime("%Y-%m-%d")}","{record.congregation.name}","{record.male_count}","{record.female_count}","{record.total_count}"')
-    
-    return '\n'.join(csv_lines)
-
-
-def generate_analytics_csv():
-    """Generate CSV data for analytics"""
-    # Get analytics data
-    total_members = Guilder.objects.count()
-    total_attendance = SundayAttendance.objects.count()
-    total_congregations = Congregation.objects.count()
-    
-    csv_lines = [
-        'Metric,Value',
-        f'Total Members,{total_members}',
-        f'Total Attendance Records,{total_attendance}',
-        f'Total Congregations,{total_congregations}',
-        f'Export Date,{timezone.now().strftime("%Y-%m-%d %H:%M:%S")}'
-    ]
-    
-    return '\n'.join(csv_lines)
-
-
-def generate_all_data_csv():
-    """Generate CSV data for all data"""
-    # Combine all data types
-    members_csv = generate_members_csv()
-    attendance_csv = generate_attendance_csv()
-    analytics_csv = generate_analytics_csv()
-    
-    return f"=== MEMBERS DATA ===\n{members_csv}\n\n=== ATTENDANCE DATA ===\n{attendance_csv}\n\n=== ANALYTICS DATA ===\n{analytics_csv}"
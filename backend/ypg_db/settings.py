@@ -82,6 +82,9 @@ MIDDLEWARE = [
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "core.middleware.CongregationMiddleware",
+    "core.metrics.ProfilingMiddleware",
+    "core.notifications.NotificationBatchMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
@@ -119,6 +122,46 @@ DATABASES = {
     )
 }
 
+# Production connects through a PgBouncer pooler in transaction mode, which
+# cannot keep the server-side cursors that .iterator() opens for streamed
+# exports, reports and backups; set to False on a direct connection.
+if DATABASES["default"].get("ENGINE") == "django.db.backends.postgresql":
+    DATABASES["default"]["DISABLE_SERVER_SIDE_CURSORS"] = (
+        os.getenv('DISABLE_SERVER_SIDE_CURSORS', 'True').lower() == 'true'
+    )
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# CACHE_URL picks the backend: locmem:// (default, per process),
+# file:///path/to/dir (shared by workers on one host) or
+# redis://host:6379/0 (shared by every host; needs the redis package)
+
+CACHE_URL = os.getenv('CACHE_URL', 'locmem://')
+
+if CACHE_URL.startswith(('redis://', 'rediss://')):
+    _cache_backend = {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": CACHE_URL,
+    }
+elif CACHE_URL.startswith('file://'):
+    _cache_backend = {
+        "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+        "LOCATION": CACHE_URL[len('file://'):],
+    }
+else:
+    _cache_backend = {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "ypg-db",
+    }
+
+CACHES = {
+    "default": {
+        **_cache_backend,
+        "KEY_PREFIX": os.getenv('CACHE_KEY_PREFIX', 'ypg'),
+        "TIMEOUT": 300,
+    }
+}
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -163,6 +206,58 @@ STATICFILES_DIRS = [
 # WhiteNoise static files storage
 STATICFILES_STORAGE = "whitenoise.storage.CompressedManifestStaticFilesStorage"
 
+# Generated PDF reports (written by the run_report_worker command)
+REPORTS_ROOT = Path(os.getenv('REPORTS_ROOT', BASE_DIR / "backend" / "reports"))
+
+# Snapshot archives written by the backup command and API
+BACKUP_ROOT = Path(os.getenv('BACKUP_ROOT', BASE_DIR / "backend" / "backups"))
+
+# Write quiz submissions in batches during live bursts (see core.quiz_cache)
+QUIZ_SUBMISSION_BUFFER = os.getenv('QUIZ_SUBMISSION_BUFFER', 'False').lower() == 'true'
+
+# Per-endpoint query counts and timings (see core.metrics and /api/_metrics/)
+REQUEST_METRICS_ENABLED = os.getenv('REQUEST_METRICS_ENABLED', 'True').lower() == 'true'
+REQUEST_METRICS_BUFFER_SIZE = int(os.getenv('REQUEST_METRICS_BUFFER_SIZE', '5000'))
+# Also store samples in RequestMetric, written in batches of FLUSH_EVERY
+REQUEST_METRICS_PERSIST = os.getenv('REQUEST_METRICS_PERSIST', 'False').lower() == 'true'
+REQUEST_METRICS_FLUSH_EVERY = 100
+
+# Repeated edits to one member within this many seconds share a single
+# unread notification (see core.notifications); 0 turns merging off
+NOTIFICATION_COALESCE_SECONDS = int(os.getenv('NOTIFICATION_COALESCE_SECONDS', '300'))
+
+# Outbound SMS, sent by the run_message_worker command (see core.messaging).
+# Each provider names its BACKEND class and the most messages per second it
+# accepts; MESSAGING_PROVIDER picks the one new messages are queued for.
+# "console" only logs messages. "http" posts them as JSON to URL; the
+# run_fake_sms_server command serves a local stand-in for it.
+MESSAGING_PROVIDERS = {
+    'console': {
+        'BACKEND': 'core.messaging.ConsoleProvider',
+        'RATE': 50,
+    },
+    'http': {
+        'BACKEND': 'core.messaging.HTTPProvider',
+        'URL': os.getenv('MESSAGING_HTTP_URL', 'http://127.0.0.1:8025/messages'),
+        'TOKEN': os.getenv('MESSAGING_HTTP_TOKEN', ''),
+        'SENDER': os.getenv('MESSAGING_SENDER_ID', 'YPG'),
+        'RATE': float(os.getenv('MESSAGING_HTTP_RATE', '10')),
+    },
+}
+MESSAGING_PROVIDER = os.getenv('MESSAGING_PROVIDER', 'console')
+
+# Days of history the compact_data command keeps per table (see
+# core.retention); 0 keeps everything. Sessions count from their expiry.
+DATA_RETENTION_DAYS = {
+    'sessions': int(os.getenv('RETENTION_SESSIONS_DAYS', '1')),
+    'login_attempts': int(os.getenv('RETENTION_LOGIN_ATTEMPTS_DAYS', '30')),
+    'notifications': int(os.getenv('RETENTION_NOTIFICATIONS_DAYS', '180')),
+    'birthday_messages': int(os.getenv('RETENTION_BIRTHDAY_MESSAGES_DAYS', '400')),
+    'bulk_carts': int(os.getenv('RETENTION_BULK_CARTS_DAYS', '30')),
+    'request_metrics': int(os.getenv('RETENTION_REQUEST_METRICS_DAYS', '14')),
+    'outbound_messages': int(os.getenv('RETENTION_OUTBOUND_MESSAGES_DAYS', '90')),
+}
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
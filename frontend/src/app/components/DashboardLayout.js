@@ -621,6 +621,7 @@ export default function DashboardLayout({
           headers: {
             "Content-Type": "application/json",
           },
+          credentials: "include",
           body: JSON.stringify({ type }),
         }
       );
@@ -832,6 +832,7 @@ export default function LocalDashboardLayout({
           headers: {
             "Content-Type": "application/json",
           },
+          credentials: "include",
           body: JSON.stringify({
             type: "all", // Export all data
           }),
@@ -869,6 +870,14 @@ export default function LocalDashboardLayout({
     }
   };
 
+  // Function to get CSRF token from cookies
+  const getCookie = (name) => {
+    const value = `; ${document.cookie}`;
+    const parts = value.split(`; ${name}=`);
+    if (parts.length === 2) return parts.pop().split(";").shift();
+    return "";
+  };
+
   const handleCreateBackup = async () => {
     try {
       setDataManagementLoading(true);
@@ -880,6 +889,7 @@ export default function LocalDashboardLayout({
           headers: {
             "Content-Type": "application/json",
           },
+          credentials: "include",
         }
       );
 
@@ -911,7 +921,9 @@ export default function LocalDashboardLayout({
           method: "POST",
           headers: {
             "Content-Type": "application/json",
+            "X-CSRFToken": getCookie("csrftoken"),
           },
+          credentials: "include",
         }
       );
 
@@ -15,6 +15,32 @@ export const apiFetch = async (path, options = {}) => {
   });
 };
 
+// Django's CSRF token, set as a cookie on login
+export const getCookie = (name) => {
+  if (typeof document === "undefined") return "";
+  const value = `; ${document.cookie}`;
+  const parts = value.split(`; ${name}=`);
+  if (parts.length === 2) return parts.pop().split(";").shift();
+  return "";
+};
+
+// Members API functions
+export const memberAPI = {
+  // Import members from a .csv or .xlsx file; the browser sets the
+  // multipart Content-Type itself
+  importMembers: (file, { congregationId, dryRun } = {}) => {
+    const formData = new FormData();
+    formData.append("file", file);
+    if (congregationId) formData.append("congregation_id", congregationId);
+    if (dryRun) formData.append("dry_run", "1");
+    return apiFetch("/api/members/import/", {
+      method: "POST",
+      headers: { "X-CSRFToken": getCookie("csrftoken") },
+      body: formData,
+    });
+  },
+};
+
 // Quiz API functions
 export const quizAPI = {
   // Get active quiz
@@ -53,6 +79,21 @@ export const quizAPI = {
     }),
 };
 
+// Attendance API functions
+export const attendanceAPI = {
+  // Create or update many {congregation, date, male_count, female_count}
+  // records at once
+  bulkAttendance: (records) =>
+    apiFetch("/api/attendance/bulk/", {
+      method: "POST",
+      headers: {
+        "Content-Type": "application/json",
+        "X-CSRFToken": getCookie("csrftoken"),
+      },
+      body: JSON.stringify({ records }),
+    }),
+};
+
 // Events API functions
 export const eventAPI = {
   getEvents: () => apiFetch("/api/events/"),
@@ -325,7 +325,7 @@ class DataStore {
   async getMembers(filters = {}) {
     try {
       // Try to get from API first
-      let url = `${process.env.NEXT_PUBLIC_API_BASE_URL}/api/members/`;
+      const url = `${process.env.NEXT_PUBLIC_API_BASE_URL}/api/members/`;
       const params = new URLSearchParams();
 
       // API expects congregation_id, so we need to convert congregation name to ID
@@ -344,20 +344,31 @@ class DataStore {
         params.append("search", filters.search);
       }
 
-      if (params.toString()) {
-        url += "?" + params.toString();
-      }
-
-      const response = await fetch(url);
+      // The API returns one page at a time; follow next_cursor to the end
+      params.append("limit", "500");
+      const data = { members: [] };
+      let cursor = null;
+      do {
+        if (cursor) {
+          params.set("cursor", cursor);
+        }
+        const response = await fetch(url + "?" + params.toString());
 
-      if (!response.ok) {
-        console.warn(
-          `API request failed with status ${response.status}, falling back to local data`
-        );
-        return this.getLocalMembers(filters);
-      }
+        if (!response.ok) {
+          console.warn(
+            `API request failed with status ${response.status}, falling back to local data`
+          );
+          return this.getLocalMembers(filters);
+        }
 
-      const data = await response.json();
+        const page = await response.json();
+        if (!Array.isArray(page.members)) {
+          data.members = null;
+          break;
+        }
+        data.members.push(...page.members);
+        cursor = page.next_cursor;
+      } while (cursor);
 
       if (data.members && Array.isArray(data.members)) {
         // Update local storage with API data